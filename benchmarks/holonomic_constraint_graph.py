@@ -0,0 +1,63 @@
+"""
+Size and evaluation time of the holonomic constraints of one node evaluated at all its collocation points, built with
+a python loop (one call of the model per point, as constraint_holonomic used to) or with one mapped Function (as
+constraint_holonomic does now).
+"""
+
+import time
+
+from casadi import Function, MX, horzcat, vertcat
+import numpy as np
+
+from pianoptim.models.constant import FINGER_TIP_ON_KEY_RELAXED
+from pianoptim.models.pianist_holonomic import HolonomicPianist
+from pianoptim.ocp.spec import PIANIST_AND_KEY_MODEL_PATH
+from pianoptim.utils.torque_derivative_holonomic_driven import map_over_points
+
+N_EVALUATIONS = 1000
+
+
+def looped(model: HolonomicPianist, q_u: list[MX], q_v: list[MX]) -> MX:
+    constraints = []
+    for q_u_point, q_v_point in zip(q_u, q_v):
+        constraints.append(model.holonomic_constraints(model.state_from_partition(q_u_point, q_v_point)))
+    return vertcat(*constraints)
+
+
+def mapped(model: HolonomicPianist, q_u: list[MX], q_v: list[MX]) -> MX:
+    q_u_sym = MX.sym("q_u", model.nb_independent_joints, 1)
+    q_v_sym = MX.sym("q_v", model.nb_dependent_joints, 1)
+    q = model.state_from_partition(q_u_sym, q_v_sym)
+    point_function = Function("holonomic_constraints_at_point", [q_u_sym, q_v_sym], [model.holonomic_constraints(q)])
+    return map_over_points(point_function, horzcat(*q_u), horzcat(*q_v))
+
+
+def measure(model: HolonomicPianist, build, n_points: int) -> tuple[int, float]:
+    """
+    The number of nodes of the graph and the time of one evaluation
+    """
+    q_u = [MX.sym(f"q_u_{i}", model.nb_independent_joints, 1) for i in range(n_points)]
+    q_v = [MX.sym(f"q_v_{i}", model.nb_dependent_joints, 1) for i in range(n_points)]
+    func = Function("constraints", [vertcat(*q_u), vertcat(*q_v)], [build(model, q_u, q_v)])
+
+    q_u_values = np.tile(FINGER_TIP_ON_KEY_RELAXED[model.independent_joint_index], n_points)
+    q_v_values = np.tile(FINGER_TIP_ON_KEY_RELAXED[model.dependent_joint_index], n_points)
+    func(q_u_values, q_v_values)
+    tic = time.perf_counter()
+    for _ in range(N_EVALUATIONS):
+        func(q_u_values, q_v_values)
+    return func.n_nodes(), (time.perf_counter() - tic) / N_EVALUATIONS
+
+
+def main():
+    model = HolonomicPianist(PIANIST_AND_KEY_MODEL_PATH)
+    print("points | loop nodes | map nodes | loop time (us) | map time (us)")
+    for degree in (3, 6, 9):
+        n_points = degree + 1
+        loop_nodes, loop_time = measure(model, looped, n_points)
+        map_nodes, map_time = measure(model, mapped, n_points)
+        print(f"{n_points:6d} | {loop_nodes:10d} | {map_nodes:9d} | {loop_time * 1e6:14.1f} | {map_time * 1e6:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmarks of the press play problems of examples/ocp_progression. Each preset is reduced (fewer shooting nodes, low
+degree collocations, a bounded number of iterations) so the suite runs in minutes, and each case is solved in its own
+process so its peak memory is measured alone.
+
+Usage:
+    python benchmarks/press_play_suite.py                      # run all the cases, write results.json
+    python benchmarks/press_play_suite.py --save-baseline      # run and store the results as the new baseline
+    python benchmarks/press_play_suite.py --threshold 0.1      # fail if a metric is 10% worse than the baseline
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import bioptim
+import casadi
+
+from pianoptim.ocp.builder import build_ocp
+from pianoptim.ocp.nlp_cache import CompiledNlp
+from pianoptim.ocp.spec import PRESETS, ProblemSpec
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCHMARKS_FOLDER, "results.json")
+BASELINE_PATH = os.path.join(BENCHMARKS_FOLDER, "baseline.json")
+
+MAX_SHOOTING = 5
+POLYNOMIAL_DEGREE = 3
+MAX_ITERATIONS = 100
+N_THREADS = 4
+
+# The IPOPT timers reported by nlpsol, f: objective, g: constraints, grad_f: gradient, jac_g: jacobian of the
+# constraints, hess_l: hessian of the lagrangian
+NLP_TIMERS = ("nlp_f", "nlp_g", "nlp_grad_f", "nlp_jac_g", "nlp_hess_l")
+
+# The metrics compared to the baseline, the lower the better
+COMPARED_METRICS = ("build_time", "time_per_iteration", "peak_rss_mb") + tuple(f"t_wall_{t}" for t in NLP_TIMERS)
+
+
+def reduced_spec(spec: ProblemSpec) -> ProblemSpec:
+    """
+    A smaller version of a problem: at most MAX_SHOOTING nodes and POLYNOMIAL_DEGREE collocations in each phase
+    """
+    phases = tuple(
+        replace(phase, n_shooting=min(phase.n_shooting, MAX_SHOOTING), polynomial_degree=POLYNOMIAL_DEGREE)
+        for phase in spec.phases
+    )
+    return replace(spec, phases=phases, n_threads=N_THREADS)
+
+
+def peak_rss_mb() -> float:
+    """
+    The peak resident memory of the current process, in MB
+    """
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+CASES = {name: (lambda preset=preset: reduced_spec(preset())) for name, preset in PRESETS.items()}
+
+
+def run_case(name: str, linear_solver: str = "mumps") -> dict:
+    """
+    Build and solve one case, meant to be run in a fresh process
+
+    Parameters
+    ----------
+    name: str
+        The name of the case (a key of CASES)
+    linear_solver: str
+        The linear solver of IPOPT
+
+    Returns
+    -------
+    The metrics of the case
+    """
+    spec = CASES[name]()
+
+    tic = time.perf_counter()
+    nlp = CompiledNlp.from_ocp(build_ocp(spec))
+    build_time = time.perf_counter() - tic
+
+    options = {
+        "ipopt.max_iter": MAX_ITERATIONS,
+        "ipopt.print_level": 0,
+        "ipopt.linear_solver": linear_solver,
+        "print_time": False,
+    }
+    solution = nlp.solve(options=options)
+    stats = solution["stats"]
+    iterations = stats["iter_count"]
+
+    result = {
+        "nx": nlp.nx,
+        "ng": nlp.ng,
+        "build_time": build_time,
+        "solve_time": solution["real_time_to_optimize"],
+        "iterations": iterations,
+        "time_per_iteration": solution["real_time_to_optimize"] / max(iterations, 1),
+        "return_status": stats["return_status"],
+        "objective": float(solution["f"][0]),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    for timer in NLP_TIMERS:
+        result[f"t_wall_{timer}"] = stats.get(f"t_wall_{timer}", 0.0)
+        result[f"n_call_{timer}"] = stats.get(f"n_call_{timer}", 0)
+    return result
+
+
+def run_suite(names: list[str], linear_solver: str = "mumps") -> dict:
+    """
+    Run the cases one after the other, each in its own process
+
+    Returns
+    -------
+    The metrics of each case and the environment they were measured in
+    """
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "casadi": casadi.__version__,
+            "bioptim": bioptim.__version__,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "cases": {},
+    }
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results["cases"][name] = executor.submit(run_case, name, linear_solver).result()
+        case = results["cases"][name]
+        print(
+            f"{name}: build {case['build_time']:.1f} s, {case['iterations']} iterations, "
+            f"{case['time_per_iteration'] * 1e3:.1f} ms per iteration, {case['peak_rss_mb']:.0f} MB"
+        )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    The metrics of the results that are worse than the baseline by more than the threshold
+
+    Parameters
+    ----------
+    results: dict
+        The results of run_suite
+    baseline: dict
+        The stored results to compare to
+    threshold: float
+        The relative increase above which a metric is a regression, e.g. 0.2 for 20%
+
+    Returns
+    -------
+    A description of each regression
+    """
+    regressions = []
+    for name, case in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        reference = baseline["cases"][name]
+        if case["iterations"] > reference["iterations"]:
+            print(f"{name}: {case['iterations']} iterations instead of {reference['iterations']}")
+        for metric in COMPARED_METRICS:
+            if reference.get(metric, 0) <= 0:
+                continue
+            ratio = case[metric] / reference[metric]
+            if ratio > 1 + threshold:
+                regressions.append(f"{name}.{metric}: {reference[metric]:.4g} -> {case[metric]:.4g} ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", default=list(CASES.keys()), choices=list(CASES.keys()))
+    parser.add_argument("--linear-solver", default="mumps")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run_suite(args.cases, args.linear_solver)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Size, evaluation time and fit of the spring laws of the key bed: the analytic laws identified on the measures
+(exponential decay, cubic) and the B-splines fitted on the same measures (see pianoptim.logistic_springs.spline).
+The force, its first and second derivatives are evaluated on all the nodes of a problem at once.
+"""
+
+import time
+
+from casadi import Function, MX, jacobian
+import numpy as np
+
+from pianoptim.logistic_springs.spline import SPLINE_SPRING_PRESSING, SPLINE_SPRING_RELEASE
+from pianoptim.logistic_springs.springs import SPRING_FUNCTIONS
+from pianoptim.models.constant import MAX_BED_DEPTH
+
+N_EVALUATIONS = 1000
+N_NODES = 100
+
+
+def derivatives(law: callable) -> Function:
+    displacement = MX.sym("displacement", 1, 1)
+    force = law(displacement)
+    first = jacobian(force, displacement)
+    return Function("derivatives", [displacement], [force, first, jacobian(first, displacement)])
+
+
+def measure(law: callable) -> tuple[int, float]:
+    """
+    The number of nodes of the graph and the time of one evaluation on N_NODES displacements
+    """
+    func = derivatives(law).map(N_NODES)
+    displacements = np.linspace(MAX_BED_DEPTH, 0, N_NODES)
+    func(displacements)
+    tic = time.perf_counter()
+    for _ in range(N_EVALUATIONS):
+        func(displacements)
+    return derivatives(law).n_nodes(), (time.perf_counter() - tic) / N_EVALUATIONS
+
+
+def rms_error(law: callable, displacement: np.ndarray, force: np.ndarray) -> float:
+    x = MX.sym("x", 1, 1)
+    modeled = np.array(Function("law", [x], [law(x)]).map(displacement.size)(displacement))
+    return float(np.sqrt(np.mean((modeled.reshape(-1) - force) ** 2)))
+
+
+def main():
+    measures = {
+        "pressing": SPLINE_SPRING_PRESSING.measures(),
+        "release": SPLINE_SPRING_RELEASE.measures(),
+    }
+    print("law               | nodes | time (us) | rms pressing (N) | rms release (N)")
+    for name, law in SPRING_FUNCTIONS.items():
+        nodes, duration = measure(law)
+        errors = [rms_error(law, *measures[kind]) for kind in ("pressing", "release")]
+        print(f"{name:17s} | {nodes:5d} | {duration * 1e6:9.1f} | {errors[0]:16.3f} | {errors[1]:15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare the MX holonomic functions of HolonomicPianist with their SX-expanded versions: the time to evaluate the
+forward dynamics alone, and the time per IPOPT iteration of the press play problem built with use_sx=False and
+use_sx=True.
+"""
+
+from dataclasses import replace
+import time
+
+from bioptim import Solver
+import numpy as np
+
+from pianoptim.models.constant import FINGER_TIP_ON_KEY_RELAXED
+from pianoptim.models.pianist_holonomic import HolonomicPianist
+from pianoptim.ocp.builder import build_ocp
+from pianoptim.ocp.spec import PIANIST_AND_KEY_MODEL_PATH, press_play_spec
+
+N_EVALUATIONS = 1000
+MAX_ITERATIONS = 50
+
+
+def time_forward_dynamics(model: HolonomicPianist) -> float:
+    """
+    The mean time of one evaluation of the partitioned forward dynamics, in seconds
+    """
+    func = model.partitioned_forward_dynamics_with_qv()
+    q_u = FINGER_TIP_ON_KEY_RELAXED[model.independent_joint_index]
+    q_v = FINGER_TIP_ON_KEY_RELAXED[model.dependent_joint_index]
+    qdot_u = np.zeros(model.nb_independent_joints)
+    tau = np.zeros(model.nb_tau)
+
+    func(q_u, q_v, qdot_u, tau)
+    tic = time.perf_counter()
+    for _ in range(N_EVALUATIONS):
+        func(q_u, q_v, qdot_u, tau)
+    return (time.perf_counter() - tic) / N_EVALUATIONS
+
+
+def time_per_iteration(use_sx: bool) -> tuple[float, float, int]:
+    """
+    The time to build the press play program, the mean time per IPOPT iteration and the number of iterations
+    """
+    spec = replace(press_play_spec(), use_sx=use_sx)
+
+    tic = time.perf_counter()
+    ocp = build_ocp(spec)
+    build_time = time.perf_counter() - tic
+
+    solver = Solver.IPOPT(show_online_optim=False)
+    solver.set_maximum_iterations(MAX_ITERATIONS)
+    solver.set_print_level(0)
+    sol = ocp.solve(solver)
+    return build_time, sol.real_time_to_optimize / max(sol.iterations, 1), sol.iterations
+
+
+def main():
+    mx_time = time_forward_dynamics(HolonomicPianist(PIANIST_AND_KEY_MODEL_PATH))
+    sx_time = time_forward_dynamics(HolonomicPianist(PIANIST_AND_KEY_MODEL_PATH, expanded=True))
+    print(f"Forward dynamics: MX {mx_time * 1e6:.1f} us, SX {sx_time * 1e6:.1f} us ({mx_time / sx_time:.1f}x)")
+
+    for use_sx in (False, True):
+        build_time, iteration_time, iterations = time_per_iteration(use_sx)
+        print(
+            f"use_sx={use_sx}: build {build_time:.1f} s, {iteration_time * 1e3:.1f} ms per iteration "
+            f"({iterations} iterations)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+The full loop solved from coarse to fine: a third of the shooting nodes with cubic collocations, then two thirds with
+degree 5, then the full discretization, each level starting from the interpolated solution of the previous one.
+"""
+
+from pianoptim.ocp.continuation import solve_continuation
+from pianoptim.ocp.spec import full_loop_spec
+from pianoptim.ocp.sweep import SolverSettings
+
+
+def main():
+    sol, levels = solve_continuation(full_loop_spec(), settings=SolverSettings(max_iterations=10000), verbose=True)
+    print(levels)
+    print(f"Total time: {levels['build_time'].sum() + levels['real_time_to_optimize'].sum():.1f} s")
+    sol.print_cost()
+
+
+if __name__ == "__main__":
+    main()
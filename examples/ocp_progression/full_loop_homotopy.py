@@ -0,0 +1,24 @@
+"""
+The full loop solved by homotopy on its bounds: the velocities at the boundaries and the derivative of the torques
+start 4 times looser and are tightened at each stage down to the ones of the spec.
+"""
+
+from pianoptim.ocp.homotopy import relaxation_schedule, solve_homotopy
+from pianoptim.ocp.spec import full_loop_spec
+from pianoptim.ocp.sweep import SolverSettings
+
+
+def main():
+    sol, stages = solve_homotopy(
+        full_loop_spec(),
+        relaxations=relaxation_schedule(initial_relaxation=4.0, n_stages=4),
+        settings=SolverSettings(max_iterations=10000),
+        stage_settings=SolverSettings(max_iterations=3000, tolerance=1e-4),
+        verbose=True,
+    )
+    print(stages)
+    sol.print_cost()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+The full loop for several coefficients of restitution of the impact of the finger on the key. The restitution is a
+parameter of the NLP, compiled once, each value only changes its bounds and starts from the previous solution.
+"""
+
+import os
+
+import numpy as np
+
+from pianoptim.ocp.spec import full_loop_spec
+from pianoptim.ocp.sweep import restitution_sweep
+
+
+def main():
+    results = restitution_sweep(
+        full_loop_spec(),
+        values=np.linspace(0, 0.5, 6).tolist(),
+        options={"ipopt.linear_solver": "ma57", "ipopt.max_iter": 3000},
+        verbose=True,
+    )
+    print(results)
+    results.to_csv(os.path.join(os.path.dirname(__file__), "full_loop_restitution_sweep.csv"), index=False)
+
+
+if __name__ == "__main__":
+    main()
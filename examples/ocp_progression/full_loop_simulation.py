@@ -0,0 +1,40 @@
+"""
+Solve the full loop and integrate its controls again with cvodes, phase by phase and through the impact of the
+finger on the key, to measure how far the collocation states are from the integrated dynamics.
+The same Simulator checks the other runs of this spec exported in the trajectory folder, over a process pool.
+"""
+
+import glob
+import os
+
+from bioptim import Solver
+import pandas as pd
+
+from pianoptim.ocp.builder import build_ocp
+from pianoptim.ocp.simulation import Simulator, simulate_archive
+from pianoptim.ocp.spec import full_loop_spec, spec_hash
+from pianoptim.ocp.trajectories import EXTENSION, export_solution
+from pianoptim.utils.cache import cache_folder
+
+
+def main():
+    spec = full_loop_spec()
+    ocp = build_ocp(spec)
+
+    solv = Solver.IPOPT(show_online_optim=False)
+    solv.set_maximum_iterations(10000)
+    solv.set_linear_solver("ma57")
+    sol = ocp.solve(solv)
+
+    simulator = Simulator.from_ocp(ocp, cyclic=spec.cyclic)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(simulator.simulate_solution(sol, restitution=spec.restitution))
+
+    folder = cache_folder("trajectories", spec_hash(spec))
+    export_solution(sol, os.path.join(folder, f"{sol.real_time_to_optimize:.0f}{EXTENSION}"))
+    runs = simulate_archive(simulator, sorted(glob.glob(os.path.join(folder, f"*{EXTENSION}"))))
+    print(runs.groupby("phase", sort=False)[["max_defect", "max_drift"]].max())
+
+
+if __name__ == "__main__":
+    main()
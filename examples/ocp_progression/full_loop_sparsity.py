@@ -0,0 +1,23 @@
+"""
+The structure of the full loop NLP: density of the jacobian of the constraints and of the hessian of the lagrangian by
+phase, and the couplings or penalties that are dense (e.g. the collision that links the last phase to the first one).
+"""
+
+import pandas as pd
+
+from pianoptim.ocp.builder import build_ocp
+from pianoptim.ocp.spec import full_loop_spec
+from pianoptim.utils.sparsity import print_sparsity_report, sparsity_report
+
+
+def main():
+    ocp = build_ocp(full_loop_spec())
+    report = sparsity_report(ocp)
+
+    print_sparsity_report(report)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(report["penalties"].sort_values("density", ascending=False).head(20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Solve a press play problem through the on-disk NLP cache. The first run builds the OptimalControlProgram and stores
+its NLP, the following runs with the same spec (and the same bioMod files) load it back in seconds.
+"""
+
+from pianoptim.ocp.nlp_cache import NlpCache
+from pianoptim.ocp.spec import full_loop_spec
+
+
+def main():
+    spec = full_loop_spec()
+    nlp = NlpCache().get_or_build(spec)
+
+    sol = nlp.solve(options={"ipopt.max_iter": 10000, "ipopt.linear_solver": "ma57"})
+    print(f"Solved in {sol['real_time_to_optimize']:.1f} s, status: {sol['stats']['return_status']}")
+    print(f"Phase times: {nlp.phase_dt(sol['x']) * spec.n_shooting}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Solve the full loop with checkpoints: the current iterate is written every 50 iterations or 10 minutes. Kill the run
+and start it again, it resumes from the last checkpoint instead of the initial guess.
+"""
+
+from pianoptim.ocp.checkpoint import solve_with_checkpoints
+from pianoptim.ocp.nlp_cache import NlpCache
+from pianoptim.ocp.spec import full_loop_spec
+from pianoptim.utils.cache import cache_folder
+
+
+def main():
+    spec = full_loop_spec()
+    cache = NlpCache()
+    nlp = cache.get_or_build(spec)
+
+    sol = solve_with_checkpoints(
+        nlp,
+        cache_folder("checkpoints", cache.key(spec)),
+        every_iterations=50,
+        every_seconds=600,
+        options={"ipopt.max_iter": 10000, "ipopt.linear_solver": "ma57"},
+    )
+    print(f"Solved in {sol['real_time_to_optimize']:.1f} s (resumed after {sol['resumed_from']} iterations)")
+    print(f"Status: {sol['stats']['return_status']}")
+    print(f"Phase times: {nlp.phase_dt(sol['x']) * spec.n_shooting}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+The press play problems of this folder, built from their declarative description (see pianoptim.ocp.spec).
+Change PRESET to any key of PRESETS to build another variant, or edit the phases of the spec to try a new one.
+Each solution is kept in the SolutionStore, the next runs start from the closest problem solved so far.
+"""
+
+from bioptim import CostType, Solver
+
+from pianoptim.ocp.builder import build_ocp
+from pianoptim.ocp.reconstruction import full_q
+from pianoptim.ocp.spec import PRESETS
+from pianoptim.ocp.warm_start import SolutionStore
+
+PRESET = "full_loop"
+
+
+def main():
+    spec = PRESETS[PRESET]()
+    ocp = build_ocp(spec)
+    ocp.add_plot_penalty(CostType.OBJECTIVES)
+
+    solv = Solver.IPOPT(show_options={"show_bounds": True, "automatically_organize": False})
+    solv.set_maximum_iterations(10000)
+    solv.set_linear_solver("ma57")
+
+    store = SolutionStore()
+    warm_start = store.warm_start(spec)
+    if warm_start is not None:
+        warm_start.apply(ocp, solv)
+
+    sol = ocp.solve(solv)
+    store.save(spec, sol)
+
+    print(sol.real_time_to_optimize)
+    sol.print_cost()
+
+    from pyorerun import BiorbdModel as PyorerunBiorbdModel, MultiPhaseRerun
+
+    pyomodel = PyorerunBiorbdModel(spec.model_path)
+    frames = full_q(sol, nb_q=pyomodel.nb_q)
+
+    mprr = MultiPhaseRerun()
+    for phase in range(len(spec.phases)):
+        mprr.add_phase(t_span=frames.time[frames.phase(phase)], phase=phase)
+        mprr.add_animated_model(pyomodel, frames.q[:, frames.phase(phase)], phase=phase)
+    mprr.rerun()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Where does the time go? The full loop is built with the custom functions of pianoptim wrapped in timing shims, then
+solved for a few iterations and the share of the solve time of each penalty of each phase is estimated.
+"""
+
+from dataclasses import replace
+
+import pandas as pd
+
+import pianoptim.ocp.builder
+from pianoptim.ocp.builder import build_ocp
+from pianoptim.ocp.nlp_cache import CompiledNlp
+from pianoptim.ocp.spec import full_loop_spec
+from pianoptim.utils.profiling import BuildProfiler, evaluation_profile, phase_summary
+
+MAX_ITERATIONS = 20
+
+
+def main():
+    spec = replace(full_loop_spec(), n_threads=1)
+
+    profiler = BuildProfiler()
+    with profiler.instrument(pianoptim.ocp.builder):
+        ocp = build_ocp(spec)
+
+    nlp = CompiledNlp.from_ocp(ocp)
+    solution = nlp.solve(options={"ipopt.max_iter": MAX_ITERATIONS, "ipopt.linear_solver": "ma57"})
+    profile = evaluation_profile(ocp, stats=solution["stats"])
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print("Building")
+        print(profiler.table())
+        print("\nSolving, by penalty (estimated)")
+        print(profile)
+        print("\nSolving, by phase (estimated)")
+        print(phase_summary(profile))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+A sweep of the press play problem over the friction of the finger, the bound on the derivative of the torques and
+the time of the key bed. The cases are solved in parallel and the table of results is written next to this file,
+with the trajectories of each case in the press_play_sweep folder (see pianoptim.ocp.trajectories).
+"""
+
+import os
+
+from pianoptim.models.pianist import Pianist
+from pianoptim.ocp.spec import press_play_spec
+from pianoptim.ocp.sweep import SolverSettings, expand_grid, run_sweep
+from pianoptim.ocp.trajectories import scan_trajectories
+from pianoptim.utils.physics import archive_energy, segment_flows
+
+
+def main():
+    cases = expand_grid(
+        press_play_spec(),
+        friction_coefficient=[0.01, 0.05, 0.1],
+        taudot_max=[2500, 5000],
+        **{"bed.time": [(0.04, 0.05), (0.045, 0.055), (0.05, 0.06)]},
+    )
+
+    trajectory_folder = os.path.join(os.path.dirname(__file__), "press_play_sweep")
+    results = run_sweep(
+        cases,
+        n_workers=4,
+        settings=SolverSettings(max_iterations=3000),
+        trajectory_folder=trajectory_folder,
+        verbose=True,
+    )
+    print(results.drop(columns=["error", "spec_hash"]))
+    results.to_csv(os.path.join(os.path.dirname(__file__), "press_play_sweep.csv"), index=False)
+
+    # Only the lagrange multipliers of the bed are read from the archive
+    for _, metadata, arrays in scan_trajectories(trajectory_folder, ["lagrange_multipliers/2/lambdas"]):
+        print(metadata["parameters"], f"max |lambda|: {abs(arrays['lagrange_multipliers/2/lambdas']).max():.2f}")
+
+    # The work of the trunk, the arm and the hand of all the cases, phase by phase
+    energy = archive_energy(trajectory_folder, Pianist(cases[0].spec.free_model_path))
+    print(segment_flows(energy))
+
+
+if __name__ == "__main__":
+    main()
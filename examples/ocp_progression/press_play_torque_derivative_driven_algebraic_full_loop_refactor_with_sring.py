@@ -35,6 +35,7 @@ from bioptim import DynamicsFcn
 
 import numpy as np
 
+from pianoptim.ocp.reconstruction import full_q
 from pianoptim.models.pianist_holonomic import HolonomicPianist
 from pianoptim.models.pianist_holonomic_with_spring import HolonomicPianistWithSpring
 from pianoptim.models.constant import FINGER_TIP_ON_KEY_RELAXED, KEY_TOP_PRESSED, KEY_TOP_UNPRESSED, ELEVATED_FINGER_TIP
@@ -531,33 +532,12 @@ def main():
     from pyorerun import BiorbdModel as PyorerunBiorbdModel, MultiPhaseRerun
 
     pyomodel = PyorerunBiorbdModel(model_path)
-    stepwise_time = sol.stepwise_time(to_merge=SolutionMerge.NODES, time_alignment=TimeAlignment.STATES)
-    stepwise_states = sol.stepwise_states(to_merge=SolutionMerge.NODES)
-    stepwise_astates = sol.decision_algebraic_states(to_merge=SolutionMerge.NODES)
-
-    q = [np.zeros((pyomodel.nb_q, len(stepwise_time[phase]))) for phase in range(4)]
-    for phase in range(4):
-        q_u = stepwise_states[phase]["q_u"]
-        q_v = stepwise_astates[phase]["q_v"]
-        q[phase] = ocp.nlp[phase].model.state_from_partition(q_u, q_v).toarray()
+    frames = full_q(sol, nb_q=pyomodel.nb_q)
 
     mprr = MultiPhaseRerun()
-    mprr.add_phase(t_span=stepwise_time[0], phase=0)
-    mprr.add_phase(t_span=stepwise_time[1], phase=1)
-    mprr.add_phase(t_span=stepwise_time[2], phase=2)
-    mprr.add_phase(t_span=stepwise_time[3], phase=3)
-    mprr.add_phase(t_span=stepwise_time[4], phase=4)
-
-    mprr.add_animated_model(pyomodel, q[0], phase=0)
-    mprr.add_animated_model(pyomodel, q[1], phase=1)
-    mprr.add_animated_model(pyomodel, q[2], phase=2)
-
-    # add 1 row of zeros under last phase q
-    for p in range(3, 5):
-        qtemp = stepwise_states[p]["q"]
-        nb_steps = len(stepwise_time[p])
-        q.append(np.vstack((qtemp, np.zeros((1, nb_steps)))))
-        mprr.add_animated_model(pyomodel, q[p], phase=p)
+    for phase in range(ocp.n_phases):
+        mprr.add_phase(t_span=frames.time[frames.phase(phase)], phase=phase)
+        mprr.add_animated_model(pyomodel, frames.q[:, frames.phase(phase)], phase=phase)
 
     mprr.rerun()
     sol.print_cost()
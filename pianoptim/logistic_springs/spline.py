@@ -0,0 +1,178 @@
+"""
+Data driven spring laws of the key bed. The displacement-force curves measured on the piano (pressing_data_45.csv,
+release_data_45.csv) are smoothed on a regular grid of displacements and interpolated with a cubic B-spline
+(casadi.interpolant), so the force and its exact derivatives come from a single casadi Function call in the dynamics
+instead of an expression expanded at each node. The smoothed grid is cached on disk, keyed by the content of the
+data file and the fitting settings.
+"""
+
+from functools import cached_property
+import os
+
+from casadi import Function, MX, fmax, fmin, interpolant, jacobian
+import numpy as np
+import pandas as pd
+
+from ..utils.cache import atomic_write, cache_folder, file_hash
+
+local_path = os.path.dirname(os.path.abspath(__file__))
+
+PRESSING_DATA_PATH = os.path.join(local_path, "pressing_data_45.csv")
+RELEASE_DATA_PATH = os.path.join(local_path, "release_data_45.csv")
+
+
+def smooth_on_grid(
+    displacement: np.ndarray, force: np.ndarray, n_points: int = 40, smoothing: float = 1.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The force on a regular grid of displacements that best fits the measures, penalized by its second differences
+    (a Whittaker smoother), which tames the noise and the scattered measures of the release
+
+    Parameters
+    ----------
+    displacement: np.ndarray
+        The displacement of the key of each measure
+    force: np.ndarray
+        The force of each measure
+    n_points: int
+        The number of points of the grid
+    smoothing: float
+        The weight of the second differences
+
+    Returns
+    -------
+    The grid and the smoothed force on it
+    """
+    order = np.argsort(displacement)
+    x, y = np.asarray(displacement, dtype=float)[order], np.asarray(force, dtype=float)[order]
+    grid = np.linspace(x[0], x[-1], n_points)
+
+    # The force at each measure is the linear interpolation of the values on the grid
+    interpolation = np.array([np.interp(x, grid, column) for column in np.eye(n_points)]).T
+    second_differences = np.diff(np.eye(n_points), n=2, axis=0)
+    normal_matrix = interpolation.T @ interpolation + smoothing * second_differences.T @ second_differences
+    return grid, np.linalg.solve(normal_matrix, interpolation.T @ y)
+
+
+class SplineSpring:
+    """
+    A spring law fitted on a displacement-force data file, callable on a casadi expression of the key displacement
+    like the analytic laws of SPRING_FUNCTIONS. The displacement is clamped to the measured range.
+
+    Attributes
+    ----------
+    name: str
+        The name of the law
+    data_path: str
+        The csv of the measures
+    displacement_column, force_column: str
+        The columns of the displacement and of the force in the csv
+    max_displacement: float | None
+        The measures above this displacement are left out (e.g. the key bouncing above its rest position)
+    n_points: int
+        The number of points of the grid
+    smoothing: float
+        The weight of the second differences (see smooth_on_grid)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        data_path: str,
+        displacement_column: str = "displacement",
+        force_column: str = "force",
+        max_displacement: float | None = 0.0,
+        n_points: int = 40,
+        smoothing: float = 1.0,
+    ):
+        self.name = name
+        self.data_path = data_path
+        self.displacement_column = displacement_column
+        self.force_column = force_column
+        self.max_displacement = max_displacement
+        self.n_points = n_points
+        self.smoothing = smoothing
+
+    @property
+    def cache_path(self) -> str:
+        key = "_".join(
+            str(value)
+            for value in (
+                file_hash(self.data_path)[:16],
+                self.displacement_column,
+                self.force_column,
+                self.max_displacement,
+                self.n_points,
+                self.smoothing,
+            )
+        )
+        return os.path.join(cache_folder("springs"), f"{self.name}_{key}.npz")
+
+    def measures(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The displacement and the force of the measures that are fitted
+        """
+        data = pd.read_csv(self.data_path)
+        displacement = data[self.displacement_column].to_numpy()
+        force = data[self.force_column].to_numpy()
+        if self.max_displacement is not None:
+            kept = displacement <= self.max_displacement
+            displacement, force = displacement[kept], force[kept]
+        return displacement, force
+
+    @cached_property
+    def grid(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The smoothed force on the grid of displacements, fitted once and read from the cache afterwards
+        """
+        path = self.cache_path
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return cached["grid"], cached["values"]
+
+        grid, values = smooth_on_grid(*self.measures(), n_points=self.n_points, smoothing=self.smoothing)
+        atomic_write(path, lambda temporary_path: np.savez(temporary_path, grid=grid, values=values), suffix=".npz")
+        return grid, values
+
+    @cached_property
+    def function(self) -> Function:
+        """
+        The casadi Function force = f(displacement)
+        """
+        grid, values = self.grid
+        spline = interpolant(f"{self.name}_bspline", "bspline", [grid.tolist()], values.tolist())
+        displacement = MX.sym("displacement", 1, 1)
+        clamped = fmin(fmax(displacement, grid[0]), grid[-1])
+        return Function(self.name, [displacement], [spline(clamped)], ["displacement"], ["force"])
+
+    @cached_property
+    def derivatives(self) -> Function:
+        """
+        The casadi Function (force, dforce, ddforce) = f(displacement), the derivatives are the exact ones of the
+        spline
+        """
+        displacement = MX.sym("displacement", 1, 1)
+        force = self.function(displacement)
+        first = jacobian(force, displacement)
+        second = jacobian(first, displacement)
+        return Function(
+            f"{self.name}_derivatives",
+            [displacement],
+            [force, first, second],
+            ["displacement"],
+            ["force", "dforce", "ddforce"],
+        )
+
+    def __call__(self, x):
+        return self.function(x)
+
+    def __getstate__(self) -> dict:
+        # The casadi Functions are rebuilt from the cached grid rather than pickled
+        state = dict(self.__dict__)
+        state.pop("function", None)
+        state.pop("derivatives", None)
+        return state
+
+
+SPLINE_SPRING_PRESSING = SplineSpring("spline_pressing", PRESSING_DATA_PATH)
+SPLINE_SPRING_RELEASE = SplineSpring("spline_release", RELEASE_DATA_PATH)
@@ -1,5 +1,6 @@
 from functools import partial
 import pandas as pd
+from .spline import SPLINE_SPRING_PRESSING, SPLINE_SPRING_RELEASE
 from .utils import model_exponential_decay, model_cubic
 
 import os
@@ -21,3 +22,11 @@ SPRING_FUNCTION_CUBIC_INCREASE = partial(
         IDENTIFICATION_RESULTS["d"],
     ],
 )
+
+SPRING_FUNCTIONS = {
+    "exponential_decay": SPRING_FUNCTION_EXPONENTIAL_DECAY,
+    "cubic_increase": SPRING_FUNCTION_CUBIC_INCREASE,
+    # Fitted on the first call (or read from the cache), see spline.py
+    "spline_pressing": SPLINE_SPRING_PRESSING,
+    "spline_release": SPLINE_SPRING_RELEASE,
+}
@@ -26,3 +26,5 @@ KEY_TOP_PRESSED = np.array([[-0.185, -0.4756114196777344, 0.184-0.01]]).T
 
 ELEVATED_FINGER_TIP = np.array([-0.185, -0.4756114196777344, 0.30])
 
+
+MAX_BED_DEPTH = -0.01097137890753636  # ~1.1 cm
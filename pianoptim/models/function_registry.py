@@ -0,0 +1,161 @@
+import os
+from collections import OrderedDict
+from typing import Callable, Hashable
+import warnings
+
+from casadi import Function
+import numpy as np
+
+
+class FunctionRegistry:
+    """
+    A memoization of casadi Functions with a least recently used eviction policy. It is meant to back the DM
+    interfaces of the models so the symbolic graphs are built once per model instead of once per call.
+    """
+
+    def __init__(self, max_size: int = 64):
+        """
+        Parameters
+        ----------
+        max_size: int
+            The maximum number of functions kept in the registry before the least recently used is evicted
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be strictly positive")
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._functions: OrderedDict[Hashable, Function] = OrderedDict()
+
+    def get(self, key: Hashable, builder: Callable[[], Function]) -> Function:
+        """
+        Get the function stored at key, building it if it is not in the registry
+
+        Parameters
+        ----------
+        key: Hashable
+            The key of the function, e.g. (kind, marker_name, zero_name, mu)
+        builder: Callable[[], Function]
+            The function to call to build the casadi Function if it is missing
+
+        Returns
+        -------
+        The casadi Function
+        """
+        if key in self._functions:
+            self.hits += 1
+            self._functions.move_to_end(key)
+            return self._functions[key]
+
+        self.misses += 1
+        function = builder()
+        self._functions[key] = function
+        if len(self._functions) > self.max_size:
+            self._functions.popitem(last=False)
+        return function
+
+    def get_mapped(
+        self,
+        key: Hashable,
+        function: Function,
+        n_frames: int,
+        parallelization: str = "thread",
+        n_threads: int | None = None,
+    ) -> Function:
+        """
+        Get the function stored at key mapped over n_frames columns with Function.map, building the map if it is
+        not in the registry
+
+        Parameters
+        ----------
+        key: Hashable
+            The key of the function, e.g. (kind, marker_name, zero_name, mu)
+        function: Function
+            The function stored at key
+        n_frames: int
+            The number of columns to evaluate in one call
+        parallelization: str
+            The parallelization of the map ("serial", "unroll", "thread" or "openmp")
+        n_threads: int | None
+            The maximum number of threads of the map, all the cpus if None
+
+        Returns
+        -------
+        The mapped casadi Function
+        """
+        if n_threads is None:
+            n_threads = os.cpu_count()
+        return self.get(
+            ("map", key, n_frames, parallelization, n_threads),
+            lambda: function.map(n_frames, parallelization, n_threads),
+        )
+
+    def clear(self) -> None:
+        """
+        Remove all the functions and reset the counters
+        """
+        self._functions.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        The hit and miss counters of the registry
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._functions), "max_size": self.max_size}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._functions
+
+    def __len__(self) -> int:
+        return len(self._functions)
+
+
+def as_frames(values: np.ndarray, n_rows: int, name: str) -> np.ndarray:
+    """
+    Make sure values are a float (n_rows, n_frames) matrix, a single frame can be sent as a vector
+
+    Parameters
+    ----------
+    values: np.ndarray
+        The values to check
+    n_rows: int
+        The expected number of rows
+    name: str
+        The name of the values, for the error message
+
+    Returns
+    -------
+    The values as a 2d array
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    if values.ndim != 2 or values.shape[0] != n_rows:
+        raise ValueError(f"{name} must be of shape ({n_rows}, n_frames), got {values.shape}")
+    return values
+
+
+def expand_function(function: Function) -> Function:
+    """
+    Expand a MX Function into a SX Function (faster to evaluate and differentiate). The MX Function is returned if
+    some of its nodes cannot be expanded
+
+    Parameters
+    ----------
+    function: Function
+        The function to expand
+
+    Returns
+    -------
+    The expanded function, or the function itself if the expansion failed
+    """
+    if function.is_a("SXFunction"):
+        return function
+    try:
+        return function.expand()
+    except RuntimeError as error:
+        warnings.warn(f"The function {function.name()} cannot be expanded, it is kept as MX: {error}")
+        return function
@@ -0,0 +1,73 @@
+import os
+
+from bioptim import BiorbdModel
+from casadi import MX, nlpsol, Function
+import numpy as np
+
+from ..utils.cache import cache_folder, file_hash, atomic_write
+
+# The IPOPT solvers are shared by all the models of the process that are built from the same bioMod file
+_IK_SOLVERS: dict[tuple[str, str, str], Function] = {}
+
+
+def model_hash(model: BiorbdModel) -> str | None:
+    """
+    The hash of the bioMod file the model was built from, or None if the file cannot be read (e.g. the model was
+    built from a biorbd.Model in memory)
+    """
+    try:
+        return file_hash(model.path)
+    except (AttributeError, OSError, TypeError):
+        return None
+
+
+def _finger_on_marker_solver(model: BiorbdModel, finger_marker: str, target_marker: str) -> Function:
+    """
+    Build the IPOPT problem that superimposes the finger marker on the target marker
+    """
+    q = MX.sym("q", model.nb_q, 1)
+
+    target = model.marker(model.marker_names.index(target_marker), None)(q, model.parameters)
+    finger = model.marker(model.marker_names.index(finger_marker), None)(q, model.parameters)
+
+    return nlpsol("sol", "ipopt", {"x": q, "g": finger - target}, {"ipopt.hessian_approximation": "limited-memory"})
+
+
+def finger_on_marker(model: BiorbdModel, target_marker: str, finger_marker: str = "finger_marker") -> np.ndarray:
+    """
+    This runs the inverse kinematics to get the body position for the finger over a target marker.
+    The solved poses are stored on disk and the IPOPT solvers are kept for the whole process, both keyed by the hash
+    of the bioMod file and the marker pair, so identical models never solve the same inverse kinematics twice
+
+    Parameters
+    ----------
+    model: BiorbdModel
+        The model to solve the inverse kinematics for
+    target_marker: str
+        The name of the marker to reach
+    finger_marker: str
+        The name of the marker that must reach the target
+
+    Returns
+    -------
+    The generalized coordinates of the pose
+    """
+    hash_value = model_hash(model)
+    if hash_value is None:
+        solver = _finger_on_marker_solver(model, finger_marker, target_marker)
+        return np.array(solver(x0=np.zeros(model.nb_q), lbg=np.zeros(3), ubg=np.zeros(3))["x"])[:, 0]
+
+    file_path = os.path.join(cache_folder("inverse_kinematics"), f"{hash_value}_{finger_marker}_{target_marker}.npy")
+    if os.path.exists(file_path):
+        return np.load(file_path)
+
+    key = (hash_value, finger_marker, target_marker)
+    if key not in _IK_SOLVERS:
+        _IK_SOLVERS[key] = _finger_on_marker_solver(model, finger_marker, target_marker)
+    solver = _IK_SOLVERS[key]
+
+    q = np.array(solver(x0=np.zeros(model.nb_q), lbg=np.zeros(3), ubg=np.zeros(3))["x"])[:, 0]
+    if solver.stats()["success"]:
+        # Failed solves are not stored, so they are retried the next time instead of being served forever
+        atomic_write(file_path, lambda path: np.save(path, q), suffix=".npy")
+    return q
@@ -1,9 +1,12 @@
 from functools import cached_property
 
 from bioptim import BiorbdModel, Bounds
-from casadi import MX, SX, vertcat, if_else, nlpsol, DM, Function
+from casadi import MX, SX, vertcat, if_else, DM, Function
 import numpy as np
 
+from .function_registry import FunctionRegistry, as_frames
+from .inverse_kinematics import finger_on_marker
+
 
 class Pianist(BiorbdModel):
 
@@ -35,33 +38,91 @@ class Pianist(BiorbdModel):
     @cached_property
     def q_hand_on_keyboard(self) -> np.array:
         """
-        This runs the inverse kinematics to get the body position for the hand over the keyboard
+        This runs the inverse kinematics to get the body position for the hand over the keyboard.
+        The solution is shared with every model built from the same bioMod file (see inverse_kinematics)
         """
-        q = MX.sym("q", self.nb_q, 1)
-
-        target = self.marker(self.marker_names.index("Key1_Top"), None)(q, self.parameters)
-        finger = self.marker(self.marker_names.index("finger_marker"), None)(q, self.parameters)
-
-        s = nlpsol("sol", "ipopt", {"x": q, "g": finger - target}, {"ipopt.hessian_approximation": "limited-memory"})
-        return np.array(s(x0=np.zeros(self.nb_q), lbg=np.zeros(3), ubg=np.zeros(3))["x"])[:, 0]
+        return finger_on_marker(self, target_marker="Key1_Top")
 
     @cached_property
     def q_hand_above_keyboard(self) -> np.array:
         """
-        This runs the inverse kinematics to get the body position for the hand over the keyboard
+        This runs the inverse kinematics to get the body position for the hand over the keyboard.
+        The solution is shared with every model built from the same bioMod file (see inverse_kinematics)
         """
-        q = MX.sym("q", self.nb_q, 1)
-
-        target = self.marker(self.marker_names.index("key1_above"), None)(q, self.parameters)
-        finger = self.marker(self.marker_names.index("finger_marker"), None)(q, self.parameters)
-
-        s = nlpsol("sol", "ipopt", {"x": q, "g": finger - target}, {"ipopt.hessian_approximation": "limited-memory"})
-        return np.array(s(x0=np.zeros(self.nb_q), lbg=np.zeros(3), ubg=np.zeros(3))["x"])[:, 0]
+        return finger_on_marker(self, target_marker="key1_above")
 
     @property
     def joint_torque_bounds(self) -> Bounds:
         return Bounds(min_bound=[-40] * self.nb_tau, max_bound=[40] * self.nb_tau, key="tau")
 
+    @cached_property
+    def dm_functions(self) -> FunctionRegistry:
+        """
+        The memoized casadi functions behind the *_dm interfaces, keyed by (kind, marker_name, zero_name, mu)
+        """
+        return FunctionRegistry()
+
+    def marker_function(self, marker_name: str, zero_name: str | None = None) -> Function:
+        """
+        The function of q that computes the position of a marker, taken from the registry
+
+        Parameters
+        ----------
+        marker_name: str
+            The name of the marker to compute
+        zero_name: str | None
+            The name of the marker to substract to the marker
+
+        Returns
+        -------
+        The casadi Function
+        """
+
+        def build() -> Function:
+            q_sym = MX.sym("q", self.nb_q, 1)
+            marker = self.marker(self.marker_names.index(marker_name), None)(q_sym, self.parameters)
+            if zero_name is not None:
+                zero = self.marker(self.marker_names.index(zero_name), None)(q_sym, self.parameters)
+                marker = marker - zero
+            return Function("marker", [q_sym], [marker])
+
+        return self.dm_functions.get(("marker", marker_name, zero_name, None), build)
+
+    def key_reaction_forces_function(self) -> Function:
+        """
+        The function of q that computes the key reaction forces, taken from the registry
+        """
+
+        def build() -> Function:
+            q_sym = MX.sym("q", self.nb_q, 1)
+            return Function("forces", [q_sym], [self.compute_key_reaction_forces(q_sym)])
+
+        return self.dm_functions.get(("forces", None, None, None), build)
+
+    def normalized_friction_force_function(self, mu: float) -> Function:
+        """
+        The function of (q, qdot, tau) that computes the normalized friction force, taken from the registry
+
+        Parameters
+        ----------
+        mu: float
+            The friction coefficient
+
+        Returns
+        -------
+        The casadi Function
+        """
+
+        def build() -> Function:
+            q_sym = MX.sym("q", self.nb_q, 1)
+            qdot_sym = MX.sym("qdot", self.nb_q, 1)
+            tau_sym = MX.sym("tau", self.nb_tau, 1)
+            return Function(
+                "friction", [q_sym, qdot_sym, tau_sym], [self.normalized_friction_force(q_sym, qdot_sym, tau_sym, mu)]
+            )
+
+        return self.dm_functions.get(("friction", None, None, float(mu)), build)
+
     def compute_marker_from_dm(self, q: DM, marker_name: str, zero_name: str | None = None) -> DM:
         """
         Compute the position of a marker given the generalized coordinates
@@ -79,14 +140,37 @@ class Pianist(BiorbdModel):
         -------
         The position of the marker
         """
-        q_sym = MX.sym("q", self.nb_q, 1)
-        marker = self.marker(self.marker_names.index(marker_name), None)(q_sym, self.parameters)
-        if zero_name is not None:
-            # zero = self.marker(q_sym, self.marker_names.index(zero_name))
-            zero = self.marker(self.marker_names.index(zero_name), None)(q_sym, self.parameters)
-            marker = marker - zero
-        func = Function("marker", [q_sym], [marker])
-        return func(q)
+        return self.marker_function(marker_name, zero_name)(q)
+
+    def compute_marker_from_dm_batch(
+        self, q: np.ndarray, marker_name: str, zero_name: str | None = None, n_threads: int | None = None
+    ) -> np.ndarray:
+        """
+        Compute the position of a marker for all the frames of q in one call
+
+        Parameters
+        ----------
+        q: np.ndarray
+            The generalized coordinates of the system, of shape (nb_q, n_frames)
+        marker_name: str
+            The name of the marker to compute
+        zero_name: str | None
+            The name of the marker to substract to the marker
+        n_threads: int | None
+            The maximum number of threads to evaluate the frames with, all the cpus if None
+
+        Returns
+        -------
+        The position of the marker, of shape (3, n_frames)
+        """
+        q = as_frames(q, self.nb_q, "q")
+        func = self.dm_functions.get_mapped(
+            ("marker", marker_name, zero_name, None),
+            self.marker_function(marker_name, zero_name),
+            q.shape[1],
+            n_threads=n_threads,
+        )
+        return np.array(func(q))
 
     def compute_key_reaction_forces(self, q: MX | SX) -> MX | SX:
         """
@@ -130,9 +214,28 @@ class Pianist(BiorbdModel):
         Interface to compute_key_reaction_forces for DM
         """
 
-        q_sym = MX.sym("q", self.nb_q, 1)
-        func = Function("forces", [q_sym], [self.compute_key_reaction_forces(q_sym)])
-        return func(q)
+        return self.key_reaction_forces_function()(q)
+
+    def compute_key_reaction_forces_dm_batch(self, q: np.ndarray, n_threads: int | None = None) -> np.ndarray:
+        """
+        Interface to compute_key_reaction_forces for all the frames of q in one call
+
+        Parameters
+        ----------
+        q: np.ndarray
+            The generalized coordinates of the system, of shape (nb_q, n_frames)
+        n_threads: int | None
+            The maximum number of threads to evaluate the frames with, all the cpus if None
+
+        Returns
+        -------
+        The external forces, of shape (6, n_frames)
+        """
+        q = as_frames(q, self.nb_q, "q")
+        func = self.dm_functions.get_mapped(
+            ("forces", None, None, None), self.key_reaction_forces_function(), q.shape[1], n_threads=n_threads
+        )
+        return np.array(func(q))
 
     def normalized_friction_force(self, q: MX | SX, qdot: MX | SX, tau: MX | SX, mu: float) -> MX | SX:
         """
@@ -166,10 +269,41 @@ class Pianist(BiorbdModel):
         """
         Interface to normalize_friction_force_on_key for DM
         """
-        q_sym = MX.sym("q", self.nb_q, 1)
-        qdot_sym = MX.sym("qdot", self.nb_q, 1)
-        tau_sym = MX.sym("tau", self.nb_tau, 1)
-        func = Function(
-            "forces", [q_sym, qdot_sym, tau_sym], [self.normalized_friction_force(q_sym, qdot_sym, tau_sym, mu)]
+        return self.normalized_friction_force_function(mu)(q, qdot, tau)
+
+    def normalized_friction_force_dm_batch(
+        self, q: np.ndarray, qdot: np.ndarray, tau: np.ndarray, mu: float, n_threads: int | None = None
+    ) -> np.ndarray:
+        """
+        Interface to normalize_friction_force_on_key for all the frames of q, qdot and tau in one call
+
+        Parameters
+        ----------
+        q: np.ndarray
+            The generalized coordinates of the system, of shape (nb_q, n_frames)
+        qdot: np.ndarray
+            The generalized velocities of the system, of shape (nb_q, n_frames)
+        tau: np.ndarray
+            The generalized forces of the system, of shape (nb_tau, n_frames)
+        mu: float
+            The friction coefficient
+        n_threads: int | None
+            The maximum number of threads to evaluate the frames with, all the cpus if None
+
+        Returns
+        -------
+        The normalized friction force, of shape (1, n_frames)
+        """
+        q = as_frames(q, self.nb_q, "q")
+        qdot = as_frames(qdot, self.nb_q, "qdot")
+        tau = as_frames(tau, self.nb_tau, "tau")
+        if not q.shape[1] == qdot.shape[1] == tau.shape[1]:
+            raise ValueError("q, qdot and tau must have the same number of frames")
+
+        func = self.dm_functions.get_mapped(
+            ("friction", None, None, float(mu)),
+            self.normalized_friction_force_function(mu),
+            q.shape[1],
+            n_threads=n_threads,
         )
-        return func(q, qdot, tau)
+        return np.array(func(q, qdot, tau))
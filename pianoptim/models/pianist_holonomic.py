@@ -1,14 +1,70 @@
+from contextlib import contextmanager
 from functools import cached_property
+from typing import Callable
 
 from bioptim import Bounds, HolonomicConstraintsList, HolonomicConstraintsFcn
-from casadi import MX, SX, vertcat, if_else, nlpsol, DM, Function
+from casadi import (
+    MX,
+    SX,
+    vertcat,
+    if_else,
+    DM,
+    Function,
+    solve,
+    asin,
+    atan2,
+    cos,
+    sin,
+    sqrt,
+    fmax,
+    fmin,
+    norm_2,
+    logic_and,
+    mmax,
+    mmin,
+    sumsqr,
+)
 import numpy as np
 
 from pianoptim.models.biorbd_model_holonomic_for_collocation import HolonomicBiorbdModelForCollocation
+from pianoptim.models.function_registry import FunctionRegistry, as_frames, expand_function
+from pianoptim.models.inverse_kinematics import finger_on_marker
+from pianoptim.utils.codegen import compile_function
+
+# The holonomic constraints residual under which the closed form q_v is accepted (otherwise Newton takes over)
+Q_V_RESIDUAL_TOLERANCE = 1e-8
+# The rotation about z of the shoulder ball joint (independent), the rotations about x and y being dependent
+SHOULDER_ROTATION_Z_INDEX = 7
+
+
+def _wrap_angle(angle: MX) -> MX:
+    """
+    The angle wrapped into [-pi, pi]
+    """
+    return atan2(sin(angle), cos(angle))
 
 
 class HolonomicPianist(HolonomicBiorbdModelForCollocation):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self, *args, compiled: bool = False, expanded: bool = False, closed_form_q_v: bool = False, **kwargs
+    ):
+        """
+        Parameters
+        ----------
+        compiled: bool
+            If the holonomic functions used by the dynamics (partitioned forward dynamics, lagrange multipliers and
+            holonomic constraints) are exported to C and evaluated from a compiled shared library
+        expanded: bool
+            If these functions (and the coupling matrix) are expanded to SX, which is needed to build the program
+            with use_sx=True or expanded dynamics
+        closed_form_q_v: bool
+            If the dependent coordinates are computed with the closed form solution of the finger on the key (see
+            compute_q_v_closed_form) instead of Newton iterations
+        """
+        # The configuration of the model is done with the symbolic functions
+        self.compiled = False
+        self.expanded = False
+        self.closed_form_q_v = False
         super().__init__(*args, **kwargs)
 
         holonomic_constraints = HolonomicConstraintsList()
@@ -28,6 +84,309 @@ class HolonomicPianist(HolonomicBiorbdModelForCollocation):
             independent_joint_index=sorted([3, 4, 2, 1, 7, 8, 9, 10, 11, 0]),
             dependent_joint_index=sorted([12, 6, 5]),
         )
+        self.compiled = compiled
+        self.expanded = expanded
+        self.closed_form_q_v = closed_form_q_v
+
+    @cached_property
+    def holonomic_functions(self) -> FunctionRegistry:
+        """
+        The expanded and/or compiled versions of the holonomic functions, keyed by the name of the method they replace
+        """
+        return FunctionRegistry()
+
+    def _holonomic_function(self, name: str, builder: Callable[[], Function]) -> Function:
+        """
+        The function built by builder, expanded and compiled according to the options of the model, cached per model
+        """
+        if not (self.compiled or self.expanded):
+            return builder()
+
+        def build() -> Function:
+            with self._symbolic():
+                function = builder()
+            if self.expanded:
+                function = expand_function(function)
+            if self.compiled:
+                function = compile_function(function)
+            return function
+
+        return self.holonomic_functions.get(name, build)
+
+    @contextmanager
+    def _symbolic(self):
+        """
+        Build with the symbolic implementations only, so a function that is then expanded or compiled never calls
+        another compiled (external) function, whose symbols its own shared library would not define
+        """
+        compiled, expanded = self.compiled, self.expanded
+        self.compiled = self.expanded = False
+        try:
+            yield
+        finally:
+            self.compiled, self.expanded = compiled, expanded
+
+    def _symbolic_function(self, name: str, builder: Callable[[], Function]) -> Function:
+        """
+        The function built by builder from the symbolic implementations, cached per model
+        """
+
+        def build() -> Function:
+            with self._symbolic():
+                return builder()
+
+        return self.holonomic_functions.get(name, build)
+
+    @cached_property
+    def dependent_joint_ranges(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The lower and upper bounds of the dependent coordinates, from the ranges of the bioMod
+        """
+        ranges = self.ranges_from_model("q")
+        return (
+            np.array([ranges[i].min() for i in self.dependent_joint_index]),
+            np.array([ranges[i].max() for i in self.dependent_joint_index]),
+        )
+
+    def _function_of_q(self, name: str, method: Callable[[MX], MX]) -> Function:
+        q_sym = MX.sym("q", self.nb_q, 1)
+        return Function(name, [q_sym], [method(q_sym)])
+
+    def partitioned_forward_dynamics_with_qv(self) -> Function:
+        """
+        The forward dynamics of the independent coordinates as a function of (q_u, q_v, qdot_u, tau)
+        """
+        return self._holonomic_function(
+            "partitioned_forward_dynamics_with_qv", super().partitioned_forward_dynamics_with_qv
+        )
+
+    def compute_the_lagrangian_multipliers(self) -> Function:
+        """
+        The lagrange multipliers as a function of (q_u, qdot_u, q_v_init, tau)
+        """
+        if not self.closed_form_q_v:
+            return self._holonomic_function(
+                "compute_the_lagrangian_multipliers", super().compute_the_lagrangian_multipliers
+            )
+
+        def build() -> Function:
+            q_u = MX.sym("q_u", self.nb_independent_joints, 1)
+            qdot_u = MX.sym("qdot_u", self.nb_independent_joints, 1)
+            q_v_init = MX.sym("q_v_init", self.nb_dependent_joints, 1)
+            tau = MX.sym("tau", self.nb_tau, 1)
+            q_v = self.compute_q_v_explicit()(q_u, q_v_init)
+            _, lambdas = self.partitioned_forward_dynamics_and_lagrange_multipliers_with_qv()(q_u, q_v, qdot_u, tau)
+            return Function("compute_the_lagrangian_multipliers", [q_u, qdot_u, q_v_init, tau], [lambdas])
+
+        return self._holonomic_function("compute_the_lagrangian_multipliers", build)
+
+    def partitioned_forward_dynamics(self) -> Function:
+        """
+        The forward dynamics of the independent coordinates as a function of (q_u, qdot_u, q_v_init, tau), q_v being
+        computed from q_u
+        """
+        if not self.closed_form_q_v:
+            return self._holonomic_function("partitioned_forward_dynamics", super().partitioned_forward_dynamics)
+
+        def build() -> Function:
+            q_u = MX.sym("q_u", self.nb_independent_joints, 1)
+            qdot_u = MX.sym("qdot_u", self.nb_independent_joints, 1)
+            q_v_init = MX.sym("q_v_init", self.nb_dependent_joints, 1)
+            tau = MX.sym("tau", self.nb_tau, 1)
+            q_v = self.compute_q_v_explicit()(q_u, q_v_init)
+            qddot_u = self.partitioned_forward_dynamics_with_qv()(q_u, q_v, qdot_u, tau)
+            return Function("partitioned_forward_dynamics", [q_u, qdot_u, q_v_init, tau], [qddot_u])
+
+        return self._holonomic_function("partitioned_forward_dynamics", build)
+
+    def compute_q_v_closed_form(self) -> Function:
+        """
+        The dependent coordinates (shoulder flexion, shoulder abduction and key translation) that put the finger on
+        the key, as a function of q_u. The shoulder is a xyz ball joint: the distance between the shoulder and the
+        finger does not depend on its first two rotations, so the finger lies on a sphere centered on the shoulder.
+        The key only translates vertically, so the finger must lie on the vertical line through the key: their
+        (lower) intersection is the finger position, from which the two rotations are solved analytically, and the
+        key translation is the height of the finger relative to the unpressed key. The rotations have two solutions,
+        the arm and the arm flipped about the shoulder-finger axis, the one closest to q_v_init is returned.
+
+        Returns
+        -------
+        The casadi Function q_v = f(q_u, q_v_init)
+        """
+
+        def build() -> Function:
+            q_u = MX.sym("q_u", self.nb_independent_joints, 1)
+            q_v_init = MX.sym("q_v_init", self.nb_dependent_joints, 1)
+            q = self.state_from_partition(q_u, MX.zeros(self.nb_dependent_joints, 1))
+
+            # The frame of the shoulder before its own rotations: biorbd composes the ball joint as
+            # R_parent Rx Ry Rz, so the frame of the upper arm also contains Rz(q_z) unless q_z is zeroed as well
+            shoulder_z = np.zeros((self.nb_independent_joints, 1))
+            shoulder_z[list(self.independent_joint_index).index(SHOULDER_ROTATION_Z_INDEX)] = 1
+            q_at_rest = self.state_from_partition(q_u * DM(1 - shoulder_z), MX.zeros(self.nb_dependent_joints, 1))
+            shoulder_frame = self.homogeneous_matrices_in_global(self.segment_index("RightUpperArm"))(
+                q_at_rest, self.parameters
+            )
+            rotation, origin = shoulder_frame[:3, :3], shoulder_frame[:3, 3]
+
+            # The finger in the parent frame of the shoulder, after the rotation about z (independent), before the x
+            # and y ones: w = Rz(q_z) p, and the constraint is Rx(q_x) Ry(q_y) w = v
+            finger = self.marker(self.marker_names.index("contact_finger"), None)(q, self.parameters)
+            w = rotation.T @ (finger - origin)
+            key = self.marker(self.marker_names.index("Key1_Top_in_Key1"), None)(q, self.parameters)
+
+            # Intersection of the sphere of radius |w| centered on the shoulder and the vertical line of the key
+            horizontal_distance_squared = (key[0] - origin[0]) ** 2 + (key[1] - origin[1]) ** 2
+            height = sqrt(fmax(w.T @ w - horizontal_distance_squared, 0))
+            target = vertcat(key[0], key[1], origin[2] - height)
+            v = rotation.T @ (target - origin)
+
+            # Rx(q_x) Ry(q_y) w = v, Ry first: its first component v_x = w_x cos(q_y) + w_z sin(q_y) = r sin(q_y + phi)
+            # is solved by q_y = asin(v_x / r) - phi and by q_y = pi - asin(v_x / r) - phi
+            radius = sqrt(w[0] ** 2 + w[2] ** 2)
+            arcsine = asin(fmin(fmax(v[0] / radius, -1), 1))
+            phi = atan2(w[0], w[2])
+            branches = []
+            for shoulder_y in (_wrap_angle(arcsine - phi), _wrap_angle(np.pi - arcsine - phi)):
+                u_z = -w[0] * sin(shoulder_y) + w[2] * cos(shoulder_y)
+                # then Rx maps (w_y, u_z) onto (v_y, v_z)
+                shoulder_x = _wrap_angle(atan2(v[2], v[1]) - atan2(u_z, w[1]))
+                branches.append(vertcat(shoulder_x, shoulder_y))
+            distances = [sumsqr(_wrap_angle(branch - q_v_init[:2])) for branch in branches]
+            rotations = if_else(distances[0] <= distances[1], branches[0], branches[1])
+
+            key_translation = target[2] - key[2]
+
+            # In the order of dependent_joint_index (5, 6, 12)
+            q_v = vertcat(rotations, key_translation)
+            return Function("compute_q_v_closed_form", [q_u, q_v_init], [q_v])
+
+        return self._symbolic_function("compute_q_v_closed_form", build)
+
+    def compute_q_v_explicit(self) -> Function:
+        """
+        The dependent coordinates as a function of (q_u, q_v_init): the closed form solution closest to q_v_init if
+        it satisfies the holonomic constraints (e.g. the key is reachable) within the ranges of the joints, Newton
+        iterations from q_v_init otherwise. The Newton iterations are only evaluated when needed (short-circuiting
+        if_else).
+
+        Returns
+        -------
+        The casadi Function q_v = f(q_u, q_v_init)
+        """
+
+        def build() -> Function:
+            q_u = MX.sym("q_u", self.nb_independent_joints, 1)
+            q_v_init = MX.sym("q_v_init", self.nb_dependent_joints, 1)
+            q_v_closed_form = self.compute_q_v_closed_form()(q_u, q_v_init)
+            residual = norm_2(self.holonomic_constraints(self.state_from_partition(q_u, q_v_closed_form)))
+            lower, upper = self.dependent_joint_ranges
+            in_ranges = logic_and(mmin(q_v_closed_form - lower) >= 0, mmax(q_v_closed_form - upper) <= 0)
+            q_v = if_else(
+                logic_and(residual < Q_V_RESIDUAL_TOLERANCE, in_ranges),
+                q_v_closed_form,
+                self.compute_q_v()(q_u, q_v_init),
+                True,
+            )
+            return Function("compute_q_v_explicit", [q_u, q_v_init], [q_v])
+
+        return self._symbolic_function("compute_q_v_explicit", build)
+
+    def compute_v_from_u_explicit_symbolic(self, q_u: MX) -> MX:
+        """
+        The dependent coordinates of q_u, from the closed form solution closest to the zero pose (Newton iterations
+        from the zero pose if it does not satisfy the constraints)
+        """
+        if not self.closed_form_q_v:
+            return super().compute_v_from_u_explicit_symbolic(q_u)
+        return self.compute_q_v_explicit()(q_u, MX.zeros(self.nb_dependent_joints, 1))
+
+    def holonomic_constraints(self, q: MX | SX) -> MX | SX:
+        """
+        The holonomic constraints evaluated at q
+        """
+        if not (self.compiled or self.expanded):
+            return super().holonomic_constraints(q)
+        parent = super()
+        return self._holonomic_function(
+            "holonomic_constraints", lambda: self._function_of_q("holonomic_constraints", parent.holonomic_constraints)
+        )(q)
+
+    def coupling_matrix(self, q: MX | SX) -> MX | SX:
+        """
+        The coupling matrix (dq_v/dq_u) evaluated at q
+        """
+        if not (self.compiled or self.expanded):
+            return super().coupling_matrix(q)
+        parent = super()
+        return self._holonomic_function(
+            "coupling_matrix", lambda: self._function_of_q("coupling_matrix", parent.coupling_matrix)
+        )(q)
+
+    def partitioned_forward_dynamics_and_lagrange_multipliers_with_qv(self) -> Function:
+        """
+        The forward dynamics of the independent coordinates and the lagrange multipliers as a function of
+        (q_u, q_v, qdot_u, tau). Both are computed from the same evaluation of the mass matrix and of the non linear
+        effects, where calling partitioned_forward_dynamics_with_qv and _compute_the_lagrangian_multipliers would
+        evaluate them twice.
+
+        Returns
+        -------
+        The casadi Function with the outputs "qddot_u" and "lambdas"
+        """
+
+        def build() -> Function:
+            q_u = MX.sym("q_u", self.nb_independent_joints, 1)
+            q_v = MX.sym("q_v", self.nb_dependent_joints, 1)
+            qdot_u = MX.sym("qdot_u", self.nb_independent_joints, 1)
+            tau = MX.sym("tau", self.nb_tau, 1)
+            n_u = self.nb_independent_joints
+
+            q = self.state_from_partition(q_u, q_v)
+            qdot = self.compute_qdot()(q, qdot_u)
+            coupling_matrix = self.coupling_matrix(q)
+            biais_vector = self.biais_vector(q, qdot)
+
+            mass_matrix = self.partitioned_mass_matrix(q)
+            m_uu, m_uv = mass_matrix[:n_u, :n_u], mass_matrix[:n_u, n_u:]
+            m_vu, m_vv = mass_matrix[n_u:, :n_u], mass_matrix[n_u:, n_u:]
+            non_linear_effect = self.partitioned_non_linear_effect(q, qdot)
+            non_linear_effect_u, non_linear_effect_v = non_linear_effect[:n_u], non_linear_effect[n_u:]
+            partitioned_tau = self.partitioned_tau(tau)
+            tau_u, tau_v = partitioned_tau[:n_u], partitioned_tau[n_u:]
+
+            # Dynamics of the independent coordinates, the dependent ones being driven by the holonomic constraints
+            modified_mass_matrix = (
+                m_uu + m_uv @ coupling_matrix + coupling_matrix.T @ m_vu + coupling_matrix.T @ m_vv @ coupling_matrix
+            )
+            second_term = m_uv + coupling_matrix.T @ m_vv
+            modified_generalized_forces = (
+                tau_u
+                + coupling_matrix.T @ tau_v
+                - non_linear_effect_u
+                - coupling_matrix.T @ non_linear_effect_v
+                - second_term @ biais_vector
+            )
+            qddot_u = solve(modified_mass_matrix, modified_generalized_forces, "symbolicqr")
+            qddot_v = coupling_matrix @ qddot_u + biais_vector
+
+            # The equations of the dependent coordinates give the forces of the constraints
+            constraints_jacobian_v = self.holonomic_constraints_jacobian(q)[:, self.dependent_joint_index]
+            lambdas = solve(
+                constraints_jacobian_v.T,
+                m_vu @ qddot_u + m_vv @ qddot_v + non_linear_effect_v - tau_v,
+                "symbolicqr",
+            )
+
+            return Function(
+                "partitioned_forward_dynamics_and_lagrange_multipliers_with_qv",
+                [q_u, q_v, qdot_u, tau],
+                [qddot_u, lambdas],
+                ["q_u", "q_v", "qdot_u", "tau"],
+                ["qddot_u", "lambdas"],
+            )
+
+        return self._holonomic_function("partitioned_forward_dynamics_and_lagrange_multipliers_with_qv", build)
 
     @property
     def trunk_dof(self) -> list[int]:
@@ -46,33 +405,91 @@ class HolonomicPianist(HolonomicBiorbdModelForCollocation):
     @cached_property
     def q_hand_on_keyboard(self) -> np.array:
         """
-        This runs the inverse kinematics to get the body position for the hand over the keyboard
+        This runs the inverse kinematics to get the body position for the hand over the keyboard.
+        The solution is shared with every model built from the same bioMod file (see inverse_kinematics)
         """
-        q = MX.sym("q", self.nb_q, 1)
-
-        target = self.marker(self.marker_names.index("Key1_Top"), None)(q, self.parameters)
-        finger = self.marker(self.marker_names.index("finger_marker"), None)(q, self.parameters)
-
-        s = nlpsol("sol", "ipopt", {"x": q, "g": finger - target}, {"ipopt.hessian_approximation": "limited-memory"})
-        return np.array(s(x0=np.zeros(self.nb_q), lbg=np.zeros(3), ubg=np.zeros(3))["x"])[:, 0]
+        return finger_on_marker(self, target_marker="Key1_Top")
 
     @cached_property
     def q_hand_above_keyboard(self) -> np.array:
         """
-        This runs the inverse kinematics to get the body position for the hand over the keyboard
+        This runs the inverse kinematics to get the body position for the hand over the keyboard.
+        The solution is shared with every model built from the same bioMod file (see inverse_kinematics)
         """
-        q = MX.sym("q", self.nb_q, 1)
-
-        target = self.marker(self.marker_names.index("key1_above"), None)(q, self.parameters)
-        finger = self.marker(self.marker_names.index("finger_marker"), None)(q, self.parameters)
-
-        s = nlpsol("sol", "ipopt", {"x": q, "g": finger - target}, {"ipopt.hessian_approximation": "limited-memory"})
-        return np.array(s(x0=np.zeros(self.nb_q), lbg=np.zeros(3), ubg=np.zeros(3))["x"])[:, 0]
+        return finger_on_marker(self, target_marker="key1_above")
 
     @property
     def joint_torque_bounds(self) -> Bounds:
         return Bounds(min_bound=[-40] * self.nb_tau, max_bound=[40] * self.nb_tau, key="tau")
 
+    @cached_property
+    def dm_functions(self) -> FunctionRegistry:
+        """
+        The memoized casadi functions behind the *_dm interfaces, keyed by (kind, marker_name, zero_name, mu)
+        """
+        return FunctionRegistry()
+
+    def marker_function(self, marker_name: str, zero_name: str | None = None) -> Function:
+        """
+        The function of q that computes the position of a marker, taken from the registry
+
+        Parameters
+        ----------
+        marker_name: str
+            The name of the marker to compute
+        zero_name: str | None
+            The name of the marker to substract to the marker
+
+        Returns
+        -------
+        The casadi Function
+        """
+
+        def build() -> Function:
+            q_sym = MX.sym("q", self.nb_q, 1)
+            marker = self.marker(self.marker_names.index(marker_name), None)(q_sym, self.parameters)
+            if zero_name is not None:
+                zero = self.marker(self.marker_names.index(zero_name), None)(q_sym, self.parameters)
+                marker = marker - zero
+            return Function("marker", [q_sym], [marker])
+
+        return self.dm_functions.get(("marker", marker_name, zero_name, None), build)
+
+    def key_reaction_forces_function(self) -> Function:
+        """
+        The function of q that computes the key reaction forces, taken from the registry
+        """
+
+        def build() -> Function:
+            q_sym = MX.sym("q", self.nb_q, 1)
+            return Function("forces", [q_sym], [self.compute_key_reaction_forces(q_sym)])
+
+        return self.dm_functions.get(("forces", None, None, None), build)
+
+    def normalized_friction_force_function(self, mu: float) -> Function:
+        """
+        The function of (q, qdot, tau) that computes the normalized friction force, taken from the registry
+
+        Parameters
+        ----------
+        mu: float
+            The friction coefficient
+
+        Returns
+        -------
+        The casadi Function
+        """
+
+        def build() -> Function:
+            q_sym = MX.sym("q", self.nb_q, 1)
+            qdot_sym = MX.sym("qdot", self.nb_q, 1)
+            tau_sym = MX.sym("tau", self.nb_tau, 1)
+            return Function(
+                "friction", [q_sym, qdot_sym, tau_sym], [self.normalized_friction_force(q_sym, qdot_sym, tau_sym, mu)]
+            )
+
+        return self.dm_functions.get(("friction", None, None, float(mu)), build)
+
     def compute_marker_from_dm(self, q: DM, marker_name: str, zero_name: str | None = None) -> DM:
         """
         Compute the position of a marker given the generalized coordinates
@@ -90,14 +507,37 @@ class HolonomicPianist(HolonomicBiorbdModelForCollocation):
         -------
         The position of the marker
         """
-        q_sym = MX.sym("q", self.nb_q, 1)
-        marker = self.marker(self.marker_names.index(marker_name), None)(q_sym, self.parameters)
-        if zero_name is not None:
-            # zero = self.marker(q_sym, self.marker_names.index(zero_name))
-            zero = self.marker(self.marker_names.index(zero_name), None)(q_sym, self.parameters)
-            marker = marker - zero
-        func = Function("marker", [q_sym], [marker])
-        return func(q)
+        return self.marker_function(marker_name, zero_name)(q)
+
+    def compute_marker_from_dm_batch(
+        self, q: np.ndarray, marker_name: str, zero_name: str | None = None, n_threads: int | None = None
+    ) -> np.ndarray:
+        """
+        Compute the position of a marker for all the frames of q in one call
+
+        Parameters
+        ----------
+        q: np.ndarray
+            The generalized coordinates of the system, of shape (nb_q, n_frames)
+        marker_name: str
+            The name of the marker to compute
+        zero_name: str | None
+            The name of the marker to substract to the marker
+        n_threads: int | None
+            The maximum number of threads to evaluate the frames with, all the cpus if None
+
+        Returns
+        -------
+        The position of the marker, of shape (3, n_frames)
+        """
+        q = as_frames(q, self.nb_q, "q")
+        func = self.dm_functions.get_mapped(
+            ("marker", marker_name, zero_name, None),
+            self.marker_function(marker_name, zero_name),
+            q.shape[1],
+            n_threads=n_threads,
+        )
+        return np.array(func(q))
 
     def compute_key_reaction_forces(self, q: MX | SX) -> MX | SX:
         """
@@ -141,9 +581,28 @@ class HolonomicPianist(HolonomicBiorbdModelForCollocation):
         Interface to compute_key_reaction_forces for DM
         """
 
-        q_sym = MX.sym("q", self.nb_q, 1)
-        func = Function("forces", [q_sym], [self.compute_key_reaction_forces(q_sym)])
-        return func(q)
+        return self.key_reaction_forces_function()(q)
+
+    def compute_key_reaction_forces_dm_batch(self, q: np.ndarray, n_threads: int | None = None) -> np.ndarray:
+        """
+        Interface to compute_key_reaction_forces for all the frames of q in one call
+
+        Parameters
+        ----------
+        q: np.ndarray
+            The generalized coordinates of the system, of shape (nb_q, n_frames)
+        n_threads: int | None
+            The maximum number of threads to evaluate the frames with, all the cpus if None
+
+        Returns
+        -------
+        The external forces, of shape (6, n_frames)
+        """
+        q = as_frames(q, self.nb_q, "q")
+        func = self.dm_functions.get_mapped(
+            ("forces", None, None, None), self.key_reaction_forces_function(), q.shape[1], n_threads=n_threads
+        )
+        return np.array(func(q))
 
     def normalized_friction_force(self, q: MX | SX, qdot: MX | SX, tau: MX | SX, mu: float) -> MX | SX:
         """
@@ -177,10 +636,41 @@ class HolonomicPianist(HolonomicBiorbdModelForCollocation):
         """
         Interface to normalize_friction_force_on_key for DM
         """
-        q_sym = MX.sym("q", self.nb_q, 1)
-        qdot_sym = MX.sym("qdot", self.nb_q, 1)
-        tau_sym = MX.sym("tau", self.nb_tau, 1)
-        func = Function(
-            "forces", [q_sym, qdot_sym, tau_sym], [self.normalized_friction_force(q_sym, qdot_sym, tau_sym, mu)]
+        return self.normalized_friction_force_function(mu)(q, qdot, tau)
+
+    def normalized_friction_force_dm_batch(
+        self, q: np.ndarray, qdot: np.ndarray, tau: np.ndarray, mu: float, n_threads: int | None = None
+    ) -> np.ndarray:
+        """
+        Interface to normalize_friction_force_on_key for all the frames of q, qdot and tau in one call
+
+        Parameters
+        ----------
+        q: np.ndarray
+            The generalized coordinates of the system, of shape (nb_q, n_frames)
+        qdot: np.ndarray
+            The generalized velocities of the system, of shape (nb_q, n_frames)
+        tau: np.ndarray
+            The generalized forces of the system, of shape (nb_tau, n_frames)
+        mu: float
+            The friction coefficient
+        n_threads: int | None
+            The maximum number of threads to evaluate the frames with, all the cpus if None
+
+        Returns
+        -------
+        The normalized friction force, of shape (1, n_frames)
+        """
+        q = as_frames(q, self.nb_q, "q")
+        qdot = as_frames(qdot, self.nb_q, "qdot")
+        tau = as_frames(tau, self.nb_tau, "tau")
+        if not q.shape[1] == qdot.shape[1] == tau.shape[1]:
+            raise ValueError("q, qdot and tau must have the same number of frames")
+
+        func = self.dm_functions.get_mapped(
+            ("friction", None, None, float(mu)),
+            self.normalized_friction_force_function(mu),
+            q.shape[1],
+            n_threads=n_threads,
         )
-        return func(q, qdot, tau)
+        return np.array(func(q, qdot, tau))
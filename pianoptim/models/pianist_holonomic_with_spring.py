@@ -28,7 +28,7 @@ class HolonomicPianistWithSpring(HolonomicPianist):
             "max_value": max_value,
         }
 
-    def compute_spring_force(self, q: np.array, qdot: np.array) -> np.array:
+    def compute_spring_force(self, q: np.array, qdot: np.array = None) -> np.array:
         """
         Compute the spring force
 
@@ -37,7 +37,7 @@ class HolonomicPianistWithSpring(HolonomicPianist):
         q: np.array
             The generalized coordinates
         qdot: np.array
-            The generalized velocities
+            The generalized velocities (not used by the current springs)
 
         Returns
         -------
@@ -0,0 +1,466 @@
+"""
+Assemble the press play OptimalControlProgram from a ProblemSpec. The phases are built following
+press_play_torque_derivative_driven_algebraic_full_loop_refactor: torque derivative driven dynamics, holonomic phases
+where the finger is attached to the key (q_v as algebraic states) and free phases where it is not.
+"""
+
+from bioptim import (
+    BiMappingList,
+    BiorbdModel,
+    BoundsList,
+    ConstraintFcn,
+    ConstraintList,
+    DynamicsFcn,
+    DynamicsList,
+    InitialGuessList,
+    MultinodeConstraintList,
+    Node,
+    ObjectiveFcn,
+    ObjectiveList,
+    OdeSolver,
+    OptimalControlProgram,
+    ParameterList,
+    PhaseTransitionList,
+    VariableScaling,
+)
+import numpy as np
+
+from .spec import ProblemSpec, PhaseSpec
+from ..logistic_springs.springs import SPRING_FUNCTIONS
+from ..models.constant import (
+    ELEVATED_FINGER_TIP,
+    FINGER_TIP_ON_KEY_RELAXED,
+    KEY_TOP_PRESSED,
+    KEY_TOP_UNPRESSED,
+    MAX_BED_DEPTH,
+)
+from ..models.pianist_holonomic import HolonomicPianist
+from ..models.pianist_holonomic_with_spring import HolonomicPianistWithSpring
+from ..utils.custom_functions import (
+    custom_contraint_lambdas,
+    custom_func_track_markers,
+    custom_func_track_markers_velocity,
+)
+from ..utils.custom_transitions import (
+    RESTITUTION_PARAMETER,
+    custom_phase_transition_algebraic_post,
+    transition_algebraic_pre_with_collision,
+)
+from ..utils.torque_derivative_holonomic_driven import (
+    configure_holonomic_torque_derivative_driven_with_qv,
+    constraint_holonomic,
+    constraint_holonomic_end,
+    holonomic_torque_derivative_driven_with_qv,
+    holonomic_torque_derivative_driven_with_qv_spring,
+)
+
+FINGER_DOF_IDX = 11
+ELBOW_WRIST_IDX = [8, 10]
+SHOULDER_NON_FLEXION_IDX = [7, 6]
+
+# The bounds of the key translation (last q_v) at the (start, intermediate, end) nodes of each holonomic task.
+# They should go from 0 to -0.01, but a bit of slack avoids numerical issues. They cannot be tightened too much
+# otherwise the initial guess won't be able to slide on the holonomic constraints.
+KEY_BOUNDS = {
+    "rest": ((-0.0025, 0.0025), (-0.0025, 0.0025), (-0.0025, 0.0025)),
+    "descend": ((-0.020, 0.01), (-0.020, 0.01), (-0.015, 0.0025)),
+    "bed": ((-0.015, 0.0025), (-0.015, 0.0025), (-0.015, 0.0025)),
+    "release": ((-0.015, 0.0025), (-0.020, 0.01), (-0.020, 0.01)),
+}
+# With a spring, the key can go down to the bed (plus this slack) during all the holonomic phases
+BED_DEPTH_SLACK = 0.002
+
+
+def build_models(spec: ProblemSpec) -> tuple[HolonomicPianist | BiorbdModel, ...]:
+    """
+    Load one model per phase and set their friction coefficients and springs
+
+    Parameters
+    ----------
+    spec: ProblemSpec
+        The description of the problem
+
+    Returns
+    -------
+    The models of each phase
+    """
+    models = []
+    for phase in spec.phases:
+        if phase.holonomic:
+            model_type = HolonomicPianistWithSpring if spec.has_spring else HolonomicPianist
+            model = model_type(spec.model_path, compiled=spec.compiled, expanded=spec.use_sx or spec.expand)
+            if phase.spring is not None:
+                model.add_spring(SPRING_FUNCTIONS[phase.spring], min_value=0, max_value=MAX_BED_DEPTH)
+        else:
+            model = BiorbdModel(spec.free_model_path)
+        models.append(model)
+
+    holo_friction_coefficients = np.zeros(models[0].nb_q)
+    # todo : better modeled with
+    #   https://www.frontiersin.org/journals/robotics-and-ai/articles/10.3389/frobt.2017.00041/full
+    holo_friction_coefficients[FINGER_DOF_IDX] = spec.friction_coefficient
+    for model in models:
+        model.set_friction_coefficients(holo_friction_coefficients[: model.nb_q])
+
+    return tuple(models)
+
+
+def partition_mappings(model: HolonomicPianist) -> tuple[BiMappingList, BiMappingList]:
+    """
+    The mappings from q (qdot) to the independent coordinates q_u (qdot_u) and the dependent coordinates q_v
+
+    Parameters
+    ----------
+    model: HolonomicPianist
+        The holonomic model
+
+    Returns
+    -------
+    The mappings of the independent and the dependent coordinates
+    """
+    u_to_first = list(model.independent_joint_index)
+    u_to_second = [u_to_first.index(i) if i in u_to_first else None for i in range(model.nb_q)]
+    v_to_first = list(model.dependent_joint_index)
+    v_to_second = [v_to_first.index(i) if i in v_to_first else None for i in range(model.nb_q)]
+
+    u_variable_bimapping = BiMappingList()
+    u_variable_bimapping.add("q", to_second=u_to_second, to_first=u_to_first)
+    u_variable_bimapping.add("qdot", to_second=u_to_second, to_first=u_to_first)
+
+    v_variable_bimapping = BiMappingList()
+    v_variable_bimapping.add("q", to_second=v_to_second, to_first=v_to_first)
+
+    return u_variable_bimapping, v_variable_bimapping
+
+
+def build_ocp(spec: ProblemSpec, ode_solver: list[OdeSolver] = None) -> OptimalControlProgram:
+    """
+    Prepare the optimal control program described by spec
+
+    Parameters
+    ----------
+    spec: ProblemSpec
+        The description of the problem
+    ode_solver: list[OdeSolver]
+        The ode solver of each phase, collocations of the degree of each phase spec if None
+
+    Returns
+    -------
+    The OptimalControlProgram
+    """
+    models = build_models(spec)
+    holonomic_phases = spec.holonomic_phases
+    free_phases = spec.free_phases
+    first_model = models[0]
+
+    if ode_solver is None:
+        ode_solver = [OdeSolver.COLLOCATION(polynomial_degree=phase.polynomial_degree) for phase in spec.phases]
+
+    dynamics = DynamicsList()
+    objective_functions = ObjectiveList()
+    constraints = ConstraintList()
+    multinode_constraints = MultinodeConstraintList()
+    phase_transitions = PhaseTransitionList()
+
+    x_bounds = BoundsList()
+    x_init = InitialGuessList()
+    a_bounds = BoundsList()
+    a_init = InitialGuessList()
+    u_bounds = BoundsList()
+    u_init = InitialGuessList()
+
+    u_variable_bimapping, v_variable_bimapping = partition_mappings(first_model)
+
+    nb_tau = first_model.nb_tau - 1
+    tau_to_second = [i for i in range(nb_tau)] + [None]
+    tau_to_first = [i for i in range(nb_tau)]
+    dof_mapping = BiMappingList()
+
+    qu = FINGER_TIP_ON_KEY_RELAXED[first_model.independent_joint_index]
+    qv = FINGER_TIP_ON_KEY_RELAXED[first_model.dependent_joint_index]
+
+    for p in holonomic_phases:
+        dof_mapping.add("tau", to_second=tau_to_second, to_first=tau_to_first, phase=p)
+        dof_mapping.add("taudot", to_second=tau_to_second, to_first=tau_to_first, phase=p)
+
+        dynamics.add(
+            configure_holonomic_torque_derivative_driven_with_qv,
+            dynamic_function=(
+                holonomic_torque_derivative_driven_with_qv_spring
+                if spec.phases[p].spring is not None
+                else holonomic_torque_derivative_driven_with_qv
+            ),
+            custom_q_v_init=qv,
+            expand_continuity=spec.expand,
+            phase=p,
+        )
+        # Path Constraints
+        constraints.add(constraint_holonomic, node=Node.ALL_SHOOTING, phase=p)
+        constraints.add(constraint_holonomic_end, node=Node.END, phase=p)
+
+        x_bounds.add("q_u", bounds=first_model.bounds_from_ranges("q", u_variable_bimapping), phase=p)
+        x_bounds.add("qdot_u", bounds=first_model.bounds_from_ranges("qdot", u_variable_bimapping), phase=p)
+        a_bounds.add("q_v", bounds=first_model.bounds_from_ranges("q", v_variable_bimapping), phase=p)
+        x_bounds.add("tau", min_bound=[-spec.tau_max] * nb_tau, max_bound=[spec.tau_max] * nb_tau, phase=p)
+        u_bounds.add("taudot", min_bound=[-spec.taudot_max] * nb_tau, max_bound=[spec.taudot_max] * nb_tau, phase=p)
+
+        x_init.add("q_u", qu, phase=p)
+        x_init.add("qdot_u", [0] * first_model.nb_independent_joints, phase=p)
+        a_init.add("q_v", qv, phase=p)
+        x_init.add("tau", [0] * nb_tau, phase=p)
+        u_init.add("taudot", [0] * nb_tau, phase=p)
+
+        #  GUIDING THE KEY HEIGHT
+        for node, (min_bound, max_bound) in enumerate(KEY_BOUNDS[spec.phases[p].task]):
+            a_bounds[p]["q_v"].min[-1, node] = MAX_BED_DEPTH - BED_DEPTH_SLACK if spec.has_spring else min_bound
+            a_bounds[p]["q_v"].max[-1, node] = max_bound
+
+    for p in free_phases:
+        # mapping that map nothing to make the OCP not crash
+        to_second = [i for i in range(models[p].nb_q)]
+        to_first = [i for i in range(models[p].nb_q)]
+        dof_mapping.add("tau", to_second=to_second, to_first=to_first, phase=p)
+        dof_mapping.add("taudot", to_second=to_second, to_first=to_first, phase=p)
+
+        dynamics.add(DynamicsFcn.TORQUE_DERIVATIVE_DRIVEN, expand_continuity=spec.expand, phase=p)
+
+        x_bounds.add("q", bounds=models[p].bounds_from_ranges("q"), phase=p)
+        x_bounds.add("qdot", bounds=models[p].bounds_from_ranges("qdot"), phase=p)
+        x_bounds.add("tau", min_bound=[-spec.tau_max] * nb_tau, max_bound=[spec.tau_max] * nb_tau, phase=p)
+        u_bounds.add("taudot", min_bound=[-spec.taudot_max] * nb_tau, max_bound=[spec.taudot_max] * nb_tau, phase=p)
+
+        x_init.add("q", FINGER_TIP_ON_KEY_RELAXED[:-1], phase=p)
+        x_init.add("qdot", [0] * models[p].nb_q, phase=p)
+        x_init.add("tau", [0] * nb_tau, phase=p)
+        u_init.add("taudot", [0] * nb_tau, phase=p)
+
+    _add_objectives(spec, objective_functions, nb_tau, qv)
+    for p, phase in enumerate(spec.phases):
+        _add_task_constraints(p, phase, constraints, qv)
+    for p in holonomic_phases:
+        # Bounding the contact forces
+        constraints.add(
+            custom_contraint_lambdas,
+            phase=p,
+            node=Node.ALL,
+            custom_qv_init=qv,
+            min_bound=[-spec.lambda_max] * 3,
+            max_bound=[spec.lambda_max] * 3,
+        )
+
+    # NOTE: IT CONVERGED WITHOUT THE TIGHT BOUNDS BUT IT TOOK 14H.
+    if spec.boundary_qdot_max is not None:
+        first_qdot_key = "qdot_u" if spec.phases[0].holonomic else "qdot"
+        last_qdot_key = "qdot_u" if spec.phases[-1].holonomic else "qdot"
+        x_bounds[0][first_qdot_key].min[:, -1] = -spec.boundary_qdot_max
+        x_bounds[0][first_qdot_key].max[:, -1] = spec.boundary_qdot_max
+        x_bounds[-1][last_qdot_key].min[:, -1] = -spec.boundary_qdot_max
+        x_bounds[-1][last_qdot_key].max[:, -1] = spec.boundary_qdot_max
+
+    #  TRANSITIONS
+    if free_phases:
+        phase_transitions.add(custom_phase_transition_algebraic_post, phase_pre_idx=free_phases[0] - 1)
+    if spec.cyclic:
+        multinode_constraints.add(
+            transition_algebraic_pre_with_collision,
+            nodes_phase=(len(spec.phases) - 1, 0),
+            nodes=(Node.END, Node.START),
+            restitution=spec.restitution,
+        )
+
+    parameters, parameter_bounds, parameter_init = _restitution_parameter(spec)
+
+    return OptimalControlProgram(
+        bio_model=models,
+        dynamics=dynamics,
+        n_shooting=spec.n_shooting,
+        phase_time=[phase.phase_time for phase in spec.phases],
+        x_bounds=x_bounds,
+        u_bounds=u_bounds,
+        a_bounds=a_bounds,
+        x_init=x_init,
+        u_init=u_init,
+        a_init=a_init,
+        objective_functions=objective_functions,
+        constraints=constraints,
+        ode_solver=ode_solver,
+        use_sx=spec.use_sx,
+        n_threads=spec.n_threads,
+        variable_mappings=dof_mapping,
+        phase_transitions=phase_transitions,
+        multinode_constraints=multinode_constraints,
+        parameters=parameters,
+        parameter_bounds=parameter_bounds,
+        parameter_init=parameter_init,
+    )
+
+
+def _restitution_parameter(spec: ProblemSpec) -> tuple[ParameterList, BoundsList, InitialGuessList]:
+    """
+    The restitution as a parameter of the program, bounded to the value of the spec. The parameter does not change
+    the models, it is only read by the impact transition (transition_algebraic_pre_with_collision)
+    """
+    parameters = ParameterList(use_sx=spec.use_sx)
+    parameter_bounds = BoundsList()
+    parameter_init = InitialGuessList()
+    if not spec.restitution_as_parameter:
+        return parameters, parameter_bounds, parameter_init
+
+    parameters.add(
+        RESTITUTION_PARAMETER,
+        lambda bio_model, value: None,
+        size=1,
+        scaling=VariableScaling(RESTITUTION_PARAMETER, [1.0]),
+    )
+    parameter_bounds.add(RESTITUTION_PARAMETER, min_bound=[spec.restitution], max_bound=[spec.restitution])
+    parameter_init.add(RESTITUTION_PARAMETER, [spec.restitution])
+    return parameters, parameter_bounds, parameter_init
+
+
+def _add_objectives(spec: ProblemSpec, objective_functions: ObjectiveList, nb_tau: int, qv: np.ndarray) -> None:
+    """
+    The objectives shared by all the press play problems
+    """
+    no_elbow_wrist_idx = [i for i in range(nb_tau) if i not in ELBOW_WRIST_IDX]
+
+    for p, phase in enumerate(spec.phases):
+        # reduce the torque variation on all joints except elbow and wrist
+        objective_functions.add(
+            ObjectiveFcn.Lagrange.MINIMIZE_CONTROL, key="taudot", phase=p, weight=1, index=no_elbow_wrist_idx
+        )
+        # reduce the torque on all joints
+        objective_functions.add(ObjectiveFcn.Lagrange.MINIMIZE_STATE, key="tau", phase=p, weight=0.1)
+
+        if phase.holonomic:
+            # dont generate transverse forces along medio-lateral axis
+            objective_functions.add(
+                custom_contraint_lambdas,
+                custom_type=ObjectiveFcn.Lagrange,
+                # NOTE: I wanted to minimize only mediolateral forces (id=0) but it's not converging
+                index=[0, 2],
+                phase=p,
+                weight=0.1,
+                custom_qv_init=qv,
+                quadratic=True,
+            )
+            if phase.task in ("rest", "bed"):
+                # Trying to help with no speed of joint to guaranty no speed of the key
+                objective_functions.add(ObjectiveFcn.Lagrange.MINIMIZE_STATE, key="qdot_u", phase=p, weight=0.001)
+        else:
+            objective_functions.add(
+                ObjectiveFcn.Lagrange.MINIMIZE_STATE, key="q", phase=p, weight=1, index=SHOULDER_NON_FLEXION_IDX
+            )
+            objective_functions.add(
+                ObjectiveFcn.Lagrange.MINIMIZE_STATE, key="qdot", phase=p, weight=0.1, index=SHOULDER_NON_FLEXION_IDX
+            )
+
+
+def _add_task_constraints(p: int, phase: PhaseSpec, constraints: ConstraintList, qv: np.ndarray) -> None:
+    """
+    The constraints on the finger that define the task of a phase
+    """
+    if phase.task == "rest":
+        constraints.add(
+            custom_func_track_markers,
+            phase=p,
+            node=Node.ALL_SHOOTING,
+            marker="contact_finger",
+            target=KEY_TOP_UNPRESSED,
+            custom_qv_init=qv,
+        )
+        # PB This constraint is only applied on the first node of the interval
+        #   but not on the intermediate nodes of the collocation states
+        constraints.add(
+            custom_func_track_markers_velocity, phase=p, node=Node.ALL, marker="contact_finger", custom_qv_init=qv
+        )
+
+    elif phase.task == "descend":
+        constraints.add(
+            custom_func_track_markers,
+            phase=p,
+            node=Node.START,
+            marker="contact_finger",
+            target=KEY_TOP_UNPRESSED,
+            custom_qv_init=qv,
+        )
+        # non-linear inequality constraints on the finger pose, instead of the astate qv
+        constraints.add(
+            custom_func_track_markers,
+            phase=p,
+            node=Node.INTERMEDIATES,
+            marker="contact_finger",
+            custom_qv_init=qv,
+            min_bound=KEY_TOP_PRESSED,
+            max_bound=KEY_TOP_UNPRESSED,
+        )
+
+    elif phase.task == "bed":
+        for node in (Node.START, Node.END):
+            constraints.add(
+                custom_func_track_markers,
+                phase=p,
+                node=node,
+                marker="contact_finger",
+                target=KEY_TOP_PRESSED,
+                custom_qv_init=qv,
+            )
+        constraints.add(
+            custom_func_track_markers_velocity, phase=p, node=Node.ALL, marker="contact_finger", custom_qv_init=qv
+        )
+
+    elif phase.task == "release":
+        constraints.add(
+            custom_func_track_markers,
+            phase=p,
+            node=Node.ALL_SHOOTING,
+            marker="contact_finger",
+            custom_qv_init=qv,
+            min_bound=KEY_TOP_PRESSED,
+            max_bound=KEY_TOP_UNPRESSED,
+        )
+        constraints.add(
+            custom_func_track_markers,
+            phase=p,
+            node=Node.END,
+            marker="contact_finger",
+            target=KEY_TOP_UNPRESSED,
+            custom_qv_init=qv,
+        )
+
+    else:
+        constraints.add(
+            ConstraintFcn.TRACK_MARKERS,
+            phase=p,
+            node=Node.ALL_SHOOTING,
+            marker_index="contact_finger",
+            min_bound=KEY_TOP_UNPRESSED,
+            max_bound=ELEVATED_FINGER_TIP,
+            index=0,  # make sure bound only x direction
+        )
+
+        if phase.task == "lift":
+            # The finger as to move forward in the -y direction and +z direction after the key is released
+            constraints.add(
+                ConstraintFcn.TRACK_MARKERS_VELOCITY,
+                phase=p,
+                node=Node.START,
+                marker_index="contact_finger",
+                min_bound=[-0.01, -20, 0],
+                max_bound=[0.01, 0, 20],
+            )
+            constraints.add(
+                ConstraintFcn.TRACK_MARKERS,
+                phase=p,
+                node=Node.END,
+                marker_index="contact_finger",
+                target=ELEVATED_FINGER_TIP,
+            )
+
+        elif phase.task == "return":
+            constraints.add(
+                ConstraintFcn.TRACK_MARKERS,
+                phase=p,
+                node=Node.END,
+                marker_index="contact_finger",
+                target=KEY_TOP_UNPRESSED,
+            )
@@ -0,0 +1,219 @@
+"""
+Checkpoints of long IPOPT runs. A casadi Callback given to IPOPT as iteration_callback writes the current iterate
+(primal variables, multipliers of the constraints and of the bounds, phase times) every few iterations or seconds, so
+a run that is killed can be restarted from its last checkpoint with the warm start options of IPOPT instead of from
+the initial guess.
+"""
+
+import json
+import os
+import time
+
+from casadi import Callback, Sparsity, nlpsol_n_out, nlpsol_out
+import numpy as np
+
+from .nlp_cache import CompiledNlp
+from ..utils.cache import atomic_write
+
+CHECKPOINT_FILE = "checkpoint.npz"
+STATS_FILE = "stats.json"
+
+
+def warm_start_options(value: float = 1e-10) -> dict:
+    """
+    The nlpsol options that make IPOPT start from the given primal and dual iterates (see Solver.IPOPT of bioptim,
+    set_warm_start_options)
+    """
+    return {
+        "ipopt.warm_start_init_point": "yes",
+        "ipopt.mu_init": value,
+        "ipopt.warm_start_mult_bound_push": value,
+        "ipopt.warm_start_slack_bound_push": value,
+        "ipopt.warm_start_bound_push": value,
+        "ipopt.warm_start_slack_bound_frac": value,
+        "ipopt.warm_start_bound_frac": value,
+    }
+
+
+class Checkpointer(Callback):
+    """
+    The iteration callback of IPOPT that writes the current iterate to disk
+
+    Attributes
+    ----------
+    folder: str
+        The folder of the checkpoint
+    every_iterations: int | None
+        The number of iterations between two checkpoints, None to only use every_seconds
+    every_seconds: float | None
+        The time between two checkpoints, None to only use every_iterations
+    iteration: int
+        The number of iterations seen so far
+    """
+
+    def __init__(
+        self,
+        nlp: CompiledNlp,
+        folder: str,
+        every_iterations: int | None = 50,
+        every_seconds: float | None = 600,
+        first_iteration: int = 0,
+    ):
+        """
+        Parameters
+        ----------
+        nlp: CompiledNlp
+            The NLP that is solved
+        folder: str
+            The folder of the checkpoint
+        every_iterations: int | None
+            The number of iterations between two checkpoints, None to only use every_seconds
+        every_seconds: float | None
+            The time between two checkpoints, None to only use every_iterations
+        first_iteration: int
+            The number of iterations already done (when resuming), so the iterations of the checkpoints keep counting
+        """
+        Callback.__init__(self)
+        if every_iterations is None and every_seconds is None:
+            raise ValueError("every_iterations or every_seconds must be set")
+        self.nx = nlp.nx
+        self.ng = nlp.ng
+        self.dt_index = np.array(nlp.metadata.get("dt_index", []), dtype=int)
+        self.folder = folder
+        self.every_iterations = every_iterations
+        self.every_seconds = every_seconds
+        self.iteration = first_iteration
+        self._last_iteration = first_iteration
+        self._last_time = time.perf_counter()
+        self.construct("checkpointer", {})
+
+    def get_n_in(self) -> int:
+        return nlpsol_n_out()
+
+    def get_n_out(self) -> int:
+        return 1
+
+    def get_name_in(self, i: int) -> str:
+        return nlpsol_out(i)
+
+    def get_name_out(self, i: int) -> str:
+        return "ret"
+
+    def get_sparsity_in(self, i: int) -> Sparsity:
+        name = nlpsol_out(i)
+        if name == "f":
+            return Sparsity.scalar()
+        if name in ("x", "lam_x"):
+            return Sparsity.dense(self.nx)
+        if name in ("g", "lam_g"):
+            return Sparsity.dense(self.ng)
+        return Sparsity(0, 0)
+
+    def eval(self, arg: list) -> list:
+        self.iteration += 1
+        now = time.perf_counter()
+        due_iterations = (
+            self.every_iterations is not None and self.iteration - self._last_iteration >= self.every_iterations
+        )
+        due_time = self.every_seconds is not None and now - self._last_time >= self.every_seconds
+        if due_iterations or due_time:
+            iterate = dict(zip(nlpsol_out(), arg))
+            self.write({key: np.array(iterate[key]).reshape(-1) for key in ("x", "f", "lam_x", "lam_g")})
+            self._last_iteration = self.iteration
+            self._last_time = now
+        # 0 lets IPOPT continue
+        return [0]
+
+    def write(self, iterate: dict[str, np.ndarray]) -> None:
+        """
+        Write an iterate as the checkpoint of the folder, replacing the previous one atomically
+        """
+        arrays = dict(iterate)
+        arrays["phases_dt"] = arrays["x"][self.dt_index]
+        arrays["iteration"] = np.array(self.iteration)
+        arrays["shape"] = np.array([self.nx, self.ng])
+        atomic_write(os.path.join(self.folder, CHECKPOINT_FILE), lambda path: np.savez(path, **arrays), suffix=".npz")
+
+
+def load_checkpoint(nlp: CompiledNlp, folder: str) -> dict[str, np.ndarray] | None:
+    """
+    The last checkpoint of a folder
+
+    Parameters
+    ----------
+    nlp: CompiledNlp
+        The NLP the checkpoint must belong to
+    folder: str
+        The folder of the checkpoint
+
+    Returns
+    -------
+    The iterate (x, f, lam_x, lam_g, phases_dt, iteration), None if there is no checkpoint
+    """
+    path = os.path.join(folder, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as arrays:
+        checkpoint = {key: arrays[key] for key in arrays.files}
+    if tuple(checkpoint["shape"]) != (nlp.nx, nlp.ng):
+        raise ValueError(
+            f"The checkpoint of {folder} has {tuple(checkpoint['shape'])} variables and constraints, "
+            f"the NLP has {(nlp.nx, nlp.ng)}"
+        )
+    return checkpoint
+
+
+def solve_with_checkpoints(
+    nlp: CompiledNlp,
+    folder: str,
+    every_iterations: int | None = 50,
+    every_seconds: float | None = 600,
+    options: dict = None,
+    resume: bool = True,
+) -> dict:
+    """
+    Solve a NLP with IPOPT, writing checkpoints along the way and restarting from the last one if there is one
+
+    Parameters
+    ----------
+    nlp: CompiledNlp
+        The NLP to solve
+    folder: str
+        The folder of the checkpoint, one per problem
+    every_iterations: int | None
+        The number of iterations between two checkpoints
+    every_seconds: float | None
+        The time between two checkpoints
+    options: dict
+        The options sent to nlpsol, e.g. {"ipopt.linear_solver": "ma57"}
+    resume: bool
+        If the solve restarts from the checkpoint of the folder (with the warm start options of IPOPT)
+
+    Returns
+    -------
+    The output of CompiledNlp.solve, with the number of iterations done before resuming ("resumed_from")
+    """
+    options = {} if options is None else dict(options)
+    checkpoint = load_checkpoint(nlp, folder) if resume else None
+
+    arguments = {}
+    first_iteration = 0
+    if checkpoint is not None:
+        arguments = {"x0": checkpoint["x"], "lam_x0": checkpoint["lam_x"], "lam_g0": checkpoint["lam_g"]}
+        first_iteration = int(checkpoint["iteration"])
+        options.update(warm_start_options())
+
+    checkpointer = Checkpointer(nlp, folder, every_iterations, every_seconds, first_iteration)
+    options["iteration_callback"] = checkpointer
+    solution = nlp.solve(options=options, **arguments)
+    solution["resumed_from"] = first_iteration
+
+    # The final iterate is the checkpoint too, a rerun then starts from the solution
+    checkpointer.write({key: solution[key] for key in ("x", "f", "lam_x", "lam_g")})
+
+    def write_stats(path: str):
+        with open(path, "w") as file:
+            json.dump(solution["stats"], file, indent=2, default=str)
+
+    atomic_write(os.path.join(folder, STATS_FILE), write_stats)
+    return solution
@@ -0,0 +1,155 @@
+"""
+Coarse to fine continuation of the press play problems. The same phases are first solved with fewer shooting nodes
+and lower degree collocations, which is cheap, then each solution is interpolated on the grid of the next level (see
+warm_start_from) to start it close to its optimum. Once the objective stops changing from one level to the next, the
+remaining intermediate levels are skipped and the full resolution problem is solved.
+"""
+
+from dataclasses import dataclass, replace
+import math
+import time
+
+from bioptim import Solution
+import numpy as np
+import pandas as pd
+
+from .builder import build_ocp
+from .spec import ProblemSpec
+from .sweep import SolverSettings
+from .warm_start import SolutionStore, StoredSolution, warm_start_from
+
+
+@dataclass(frozen=True)
+class RefinementLevel:
+    """
+    The discretization of one level of the continuation, relative to the target spec
+
+    Attributes
+    ----------
+    shooting_scale: float
+        The fraction of the shooting nodes of each phase that is kept (at least one node per phase)
+    polynomial_degree: int | None
+        The maximal degree of the collocation polynomials, the one of each phase if None
+    """
+
+    shooting_scale: float = 1.0
+    polynomial_degree: int | None = None
+
+    def __post_init__(self):
+        if not 0 < self.shooting_scale <= 1:
+            raise ValueError(f"shooting_scale must be in ]0, 1], got {self.shooting_scale}")
+        if self.polynomial_degree is not None and self.polynomial_degree < 1:
+            raise ValueError(f"polynomial_degree must be at least 1, got {self.polynomial_degree}")
+
+    @property
+    def is_target(self) -> bool:
+        return self.shooting_scale == 1 and self.polynomial_degree is None
+
+    def apply(self, spec: ProblemSpec) -> ProblemSpec:
+        """
+        The spec discretized at this level
+        """
+        phases = []
+        for phase in spec.phases:
+            degree = phase.polynomial_degree
+            if self.polynomial_degree is not None:
+                degree = min(degree, self.polynomial_degree)
+            n_shooting = max(1, math.ceil(phase.n_shooting * self.shooting_scale))
+            phases.append(replace(phase, n_shooting=n_shooting, polynomial_degree=degree))
+        return replace(spec, phases=tuple(phases))
+
+
+# From a third of the nodes with cubic polynomials to the target discretization
+DEFAULT_LEVELS = (
+    RefinementLevel(shooting_scale=1 / 3, polynomial_degree=3),
+    RefinementLevel(shooting_scale=2 / 3, polynomial_degree=5),
+    RefinementLevel(),
+)
+
+
+def solve_continuation(
+    spec: ProblemSpec,
+    levels: tuple[RefinementLevel, ...] = DEFAULT_LEVELS,
+    settings: SolverSettings = SolverSettings(),
+    coarse_tolerance: float | None = 1e-4,
+    objective_tolerance: float = 1e-3,
+    store_folder: str = None,
+    verbose: bool = False,
+) -> tuple[Solution, pd.DataFrame]:
+    """
+    Solve a problem through increasingly finer discretizations, each level starting from the solution of the
+    previous one
+
+    Parameters
+    ----------
+    spec: ProblemSpec
+        The problem at full resolution
+    levels: tuple[RefinementLevel, ...]
+        The discretizations, from the coarsest to the finest. The target discretization is appended if missing
+    settings: SolverSettings
+        The IPOPT settings of the target level
+    coarse_tolerance: float | None
+        The IPOPT tolerance of the intermediate levels, which do not need to be solved as tightly as the target. The
+        one of settings if None
+    objective_tolerance: float
+        The relative change of the objective between two levels under which the remaining intermediate levels are
+        skipped
+    store_folder: str
+        The folder of the SolutionStore the solution of each level is saved to, the default one if None
+    verbose: bool
+        If the cost and iterations of each level are printed as it is solved
+
+    Returns
+    -------
+    The solution of the target level and one row per solved level (discretization, status, cost, iterations, times and
+    relative change of the objective)
+    """
+    levels = tuple(levels)
+    if not levels or not levels[-1].is_target:
+        levels = levels + (RefinementLevel(),)
+    coarse_settings = settings if coarse_tolerance is None else replace(settings, tolerance=coarse_tolerance)
+    store = SolutionStore(store_folder)
+
+    rows = []
+    previous: StoredSolution | None = None
+    previous_cost = None
+    sol = None
+    for i, level in enumerate(levels):
+        if not level.is_target and rows and rows[-1]["relative_change"] < objective_tolerance:
+            continue
+
+        level_spec = level.apply(spec)
+        tic = time.perf_counter()
+        ocp = build_ocp(level_spec)
+        build_time = time.perf_counter() - tic
+
+        solver = (settings if level.is_target else coarse_settings).solver()
+        if previous is not None:
+            warm_start_from(previous, level_spec).apply(ocp, solver)
+
+        sol = ocp.solve(solver)
+        previous = store.save(level_spec, sol)
+
+        cost = float(np.array(sol.cost).reshape(-1)[0])
+        relative_change = np.inf
+        if previous_cost is not None:
+            relative_change = abs(cost - previous_cost) / max(abs(previous_cost), 1e-12)
+        previous_cost = cost
+
+        rows.append(
+            {
+                "level": i,
+                "n_shooting": sum(phase.n_shooting for phase in level_spec.phases),
+                "max_polynomial_degree": max(phase.polynomial_degree for phase in level_spec.phases),
+                "status": int(sol.status),
+                "cost": cost,
+                "relative_change": relative_change,
+                "iterations": int(sol.iterations),
+                "build_time": build_time,
+                "real_time_to_optimize": float(sol.real_time_to_optimize),
+            }
+        )
+        if verbose:
+            print(f"Level {i}: cost {cost:.6g} in {rows[-1]['iterations']} iterations")
+
+    return sol, pd.DataFrame(rows)
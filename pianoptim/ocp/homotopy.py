@@ -0,0 +1,132 @@
+"""
+Homotopy on the tightness of the bounds of the press play problems. Tight bounds (the velocities at the boundaries,
+the derivative of the torques) make IPOPT crawl when it starts far from the optimum, and
+removing them changes the problem. Instead, a sequence of problems is solved from loose to tight bounds, each stage
+starting from the solution of the previous one, the last stage being the problem itself.
+"""
+
+from dataclasses import replace
+import time
+
+from bioptim import Solution
+import numpy as np
+import pandas as pd
+
+from .builder import build_ocp
+from .spec import ProblemSpec
+from .sweep import SolverSettings
+from .warm_start import SolutionStore, StoredSolution, warm_start_from
+
+
+def relaxed_spec(spec: ProblemSpec, relaxation: float) -> ProblemSpec:
+    """
+    The spec with its bounds loosened by a factor: boundary_qdot_max and taudot_max are multiplied by relaxation. The
+    phases are left untouched, their duration being fixed (see PhaseSpec.phase_time), changing their time window
+    would solve another problem rather than a looser one
+
+    Parameters
+    ----------
+    spec: ProblemSpec
+        The problem with the target bounds
+    relaxation: float
+        The factor, at least 1 (1 gives spec back)
+
+    Returns
+    -------
+    The relaxed problem
+    """
+    if relaxation < 1:
+        raise ValueError(f"relaxation must be at least 1, got {relaxation}")
+    if relaxation == 1:
+        return spec
+
+    boundary_qdot_max = None if spec.boundary_qdot_max is None else spec.boundary_qdot_max * relaxation
+    return replace(
+        spec,
+        taudot_max=spec.taudot_max * relaxation,
+        boundary_qdot_max=boundary_qdot_max,
+    )
+
+
+def relaxation_schedule(initial_relaxation: float = 4.0, n_stages: int = 4) -> np.ndarray:
+    """
+    The relaxation of each stage, decreasing geometrically from initial_relaxation to 1
+    """
+    if n_stages < 1:
+        raise ValueError(f"n_stages must be at least 1, got {n_stages}")
+    return np.geomspace(initial_relaxation, 1, n_stages)
+
+
+def solve_homotopy(
+    spec: ProblemSpec,
+    relaxations: list[float] = None,
+    settings: SolverSettings = SolverSettings(),
+    stage_settings: SolverSettings = None,
+    store_folder: str = None,
+    verbose: bool = False,
+) -> tuple[Solution, pd.DataFrame]:
+    """
+    Solve a problem through a sequence of problems with tighter and tighter bounds
+
+    Parameters
+    ----------
+    spec: ProblemSpec
+        The problem with the target bounds
+    relaxations: list[float]
+        The relaxation of each stage (see relaxed_spec), relaxation_schedule() if None. A last stage without
+        relaxation is appended if missing
+    settings: SolverSettings
+        The IPOPT settings of the last stage
+    stage_settings: SolverSettings
+        The IPOPT settings of the relaxed stages, settings if None
+    store_folder: str
+        The folder of the SolutionStore the solution of each stage is saved to, the default one if None
+    verbose: bool
+        If the iterations and time of each stage are printed as it is solved
+
+    Returns
+    -------
+    The solution of the last stage and one row per stage (relaxation, bounds, status, cost, iterations and times)
+    """
+    relaxations = list(relaxation_schedule() if relaxations is None else relaxations)
+    if not relaxations or relaxations[-1] != 1:
+        relaxations.append(1.0)
+    stage_settings = settings if stage_settings is None else stage_settings
+    store = SolutionStore(store_folder)
+
+    rows = []
+    previous: StoredSolution | None = None
+    sol = None
+    for stage, relaxation in enumerate(relaxations):
+        stage_spec = relaxed_spec(spec, relaxation)
+        tic = time.perf_counter()
+        ocp = build_ocp(stage_spec)
+        build_time = time.perf_counter() - tic
+
+        solver = (settings if relaxation == 1 else stage_settings).solver()
+        if previous is not None:
+            warm_start_from(previous, stage_spec).apply(ocp, solver)
+
+        sol = ocp.solve(solver)
+        previous = store.save(stage_spec, sol)
+
+        rows.append(
+            {
+                "stage": stage,
+                "relaxation": float(relaxation),
+                "taudot_max": stage_spec.taudot_max,
+                "boundary_qdot_max": stage_spec.boundary_qdot_max,
+                "status": int(sol.status),
+                "cost": float(np.array(sol.cost).reshape(-1)[0]),
+                "iterations": int(sol.iterations),
+                "build_time": build_time,
+                "real_time_to_optimize": float(sol.real_time_to_optimize),
+            }
+        )
+        if verbose:
+            print(
+                f"Stage {stage} (relaxation {relaxation:.3g}): {rows[-1]['iterations']} iterations in "
+                f"{rows[-1]['real_time_to_optimize']:.1f} s"
+            )
+
+    return sol, pd.DataFrame(rows)
@@ -0,0 +1,322 @@
+"""
+On-disk cache of the assembled nonlinear programs. Building the press play OptimalControlProgram (collocations of
+high degree on MX graphs) takes a long time, so the objective and the constraints of the NLP are stored as a
+serialized casadi Function, together with the bounds and the initial guess of the decision vector. A rerun with an
+unchanged spec loads them back and hands them to IPOPT without going through bioptim.
+"""
+
+from typing import Callable
+import json
+import os
+import time
+
+import bioptim
+from bioptim import OptimalControlProgram
+from bioptim.interfaces.ipopt_interface import IpoptInterface
+import casadi
+from casadi import Function, MX, SX, jacobian, nlpsol, sum1, vec
+import numpy as np
+
+from .builder import build_ocp
+from .spec import ProblemSpec, spec_hash
+from ..utils.cache import atomic_write, cache_folder, source_hash
+
+FUNCTION_FILE = "nlp.casadi"
+VECTORS_FILE = "vectors.npz"
+METADATA_FILE = "metadata.json"
+
+
+def vector_indices(vector: MX | SX, symbols: MX | SX) -> np.ndarray:
+    """
+    The position of some symbols in the decision vector
+
+    Parameters
+    ----------
+    vector: MX | SX
+        The decision vector, a concatenation of symbols
+    symbols: MX | SX
+        The symbols to find
+
+    Returns
+    -------
+    The index of each symbol in the vector (column-major if symbols is a matrix)
+    """
+    symbols = vec(symbols)
+    if symbols.numel() == 0:
+        return np.zeros(0, dtype=int)
+    rows, cols = jacobian(vector, symbols).sparsity().get_triplet()
+    cols = np.array(cols, dtype=int)
+    if cols.size != symbols.numel() or np.unique(cols).size != symbols.numel():
+        raise ValueError(
+            f"{symbols.numel() - np.unique(cols).size} of the {symbols.numel()} symbols are not in the vector (or "
+            f"are not a single element of it)"
+        )
+    indices = np.zeros(symbols.numel(), dtype=int)
+    indices[cols] = np.array(rows, dtype=int)
+    return indices
+
+
+class CompiledNlp:
+    """
+    A nonlinear program min f(x) s.t. lbg <= g(x) <= ubg, lbx <= x <= ubx detached from bioptim
+
+    Attributes
+    ----------
+    function: Function
+        The function of the decision vector "x" (and an empty "p") that returns the objective "f" and the
+        constraints "g"
+    lbx, ubx: np.ndarray
+        The bounds of the decision vector
+    lbg, ubg: np.ndarray
+        The bounds of the constraints
+    x0: np.ndarray
+        The initial guess of the decision vector
+    metadata: dict
+        How to read the decision vector: the index of the phase times ("dt_index") and of the parameters
+        ("parameter_index", by parameter name)
+    """
+
+    def __init__(
+        self,
+        function: Function,
+        lbx: np.ndarray,
+        ubx: np.ndarray,
+        lbg: np.ndarray,
+        ubg: np.ndarray,
+        x0: np.ndarray,
+        metadata: dict = None,
+    ):
+        self.function = function
+        self.lbx = np.array(lbx, dtype=float).reshape(-1)
+        self.ubx = np.array(ubx, dtype=float).reshape(-1)
+        self.lbg = np.array(lbg, dtype=float).reshape(-1)
+        self.ubg = np.array(ubg, dtype=float).reshape(-1)
+        self.x0 = np.array(x0, dtype=float).reshape(-1)
+        self.metadata = {} if metadata is None else metadata
+        self._solvers: dict[str, Function] = {}
+
+    @classmethod
+    def from_ocp(cls, ocp: OptimalControlProgram) -> "CompiledNlp":
+        """
+        Assemble the NLP of an OptimalControlProgram the same way bioptim does before calling IPOPT
+
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            The program to assemble
+
+        Returns
+        -------
+        The compiled NLP
+        """
+        interface = IpoptInterface(ocp)
+        v = ocp.variables_vector
+        v_bounds = ocp.bounds_vectors
+        v_init = ocp.init_vector
+
+        objectives = interface.dispatch_obj_func()
+        g, g_bounds = interface.dispatch_bounds()
+
+        empty_p = type(v).sym("p", 0, 1)
+        function = Function("nlp", [v, empty_p], [sum1(objectives), g], ["x", "p"], ["f", "g"])
+
+        metadata = {
+            "n_phases": ocp.n_phases,
+            "dt_index": vector_indices(v, ocp.dt_parameter.cx).tolist(),
+            "parameter_index": {
+                name: vector_indices(v, ocp.parameters.scaled[name].cx).tolist() for name in ocp.parameters.keys()
+            },
+        }
+        return cls(function, v_bounds[0], v_bounds[1], g_bounds.min, g_bounds.max, v_init, metadata)
+
+    @property
+    def nx(self) -> int:
+        return self.x0.shape[0]
+
+    @property
+    def ng(self) -> int:
+        return self.lbg.shape[0]
+
+    def save(self, folder: str) -> None:
+        """
+        Serialize the NLP in a folder. The metadata is written last, so a folder without it is an incomplete entry
+
+        Parameters
+        ----------
+        folder: str
+            The folder to write to
+        """
+        os.makedirs(folder, exist_ok=True)
+        atomic_write(os.path.join(folder, FUNCTION_FILE), self.function.save)
+        atomic_write(
+            os.path.join(folder, VECTORS_FILE),
+            lambda path: np.savez(path, lbx=self.lbx, ubx=self.ubx, lbg=self.lbg, ubg=self.ubg, x0=self.x0),
+            suffix=".npz",
+        )
+
+        def write_metadata(path: str):
+            with open(path, "w") as file:
+                json.dump(self.metadata, file, indent=2)
+
+        atomic_write(os.path.join(folder, METADATA_FILE), write_metadata)
+
+    @classmethod
+    def load(cls, folder: str) -> "CompiledNlp":
+        """
+        Load a NLP serialized with save
+
+        Parameters
+        ----------
+        folder: str
+            The folder to read from
+
+        Returns
+        -------
+        The compiled NLP
+        """
+        with open(os.path.join(folder, METADATA_FILE), "r") as file:
+            metadata = json.load(file)
+        function = Function.load(os.path.join(folder, FUNCTION_FILE))
+        with np.load(os.path.join(folder, VECTORS_FILE)) as vectors:
+            return cls(
+                function, vectors["lbx"], vectors["ubx"], vectors["lbg"], vectors["ubg"], vectors["x0"], metadata
+            )
+
+    def solver(self, options: dict = None) -> Function:
+        """
+        The IPOPT solver of the NLP, built once per set of options
+
+        Parameters
+        ----------
+        options: dict
+            The options sent to nlpsol, e.g. {"ipopt.linear_solver": "ma57"}
+
+        Returns
+        -------
+        The nlpsol Function
+        """
+        options = {} if options is None else options
+        # The objects of the options (e.g. an iteration_callback) are told apart by their identity
+        key = json.dumps(options, sort_keys=True, default=lambda value: f"{type(value).__name__}@{id(value)}")
+        if key not in self._solvers:
+            self._solvers[key] = nlpsol("solver", "ipopt", self.function, options)
+        return self._solvers[key]
+
+    def solve(
+        self,
+        x0: np.ndarray = None,
+        lam_x0: np.ndarray = None,
+        lam_g0: np.ndarray = None,
+        lbx: np.ndarray = None,
+        ubx: np.ndarray = None,
+        options: dict = None,
+    ) -> dict:
+        """
+        Solve the NLP with IPOPT
+
+        Parameters
+        ----------
+        x0: np.ndarray
+            The initial guess, the one of the program if None
+        lam_x0: np.ndarray
+            The initial multipliers of the bounds of the decision vector
+        lam_g0: np.ndarray
+            The initial multipliers of the constraints
+        lbx: np.ndarray
+            The lower bounds of the decision vector, the ones of the program if None
+        ubx: np.ndarray
+            The upper bounds of the decision vector, the ones of the program if None
+        options: dict
+            The options sent to nlpsol
+
+        Returns
+        -------
+        The output of IPOPT (x, f, g, lam_x, lam_g) as numpy arrays, the solver stats ("stats") and the
+        wall time of the solve ("real_time_to_optimize")
+        """
+        solver = self.solver(options)
+        arguments = {
+            "x0": self.x0 if x0 is None else x0,
+            "lbx": self.lbx if lbx is None else lbx,
+            "ubx": self.ubx if ubx is None else ubx,
+            "lbg": self.lbg,
+            "ubg": self.ubg,
+        }
+        if lam_x0 is not None:
+            arguments["lam_x0"] = lam_x0
+        if lam_g0 is not None:
+            arguments["lam_g0"] = lam_g0
+
+        tic = time.perf_counter()
+        out = solver(**arguments)
+        toc = time.perf_counter() - tic
+
+        solution = {key: np.array(value).reshape(-1) for key, value in out.items()}
+        solution["stats"] = solver.stats()
+        solution["real_time_to_optimize"] = toc
+        return solution
+
+    def phase_dt(self, x: np.ndarray) -> np.ndarray:
+        """
+        Extract the time step of each phase from a decision vector
+        """
+        return np.asarray(x).reshape(-1)[self.metadata["dt_index"]]
+
+
+class NlpCache:
+    """
+    The on-disk cache of the compiled NLP, keyed by the hash of the problem spec (and of the model files), of the
+    casadi and bioptim versions and of the pianoptim sources that build the program
+    """
+
+    def __init__(self, folder: str = None):
+        """
+        Parameters
+        ----------
+        folder: str
+            The folder of the cache, the "nlp" folder of the pianoptim cache if None
+        """
+        self.folder = cache_folder("nlp") if folder is None else folder
+
+    def key(self, spec: ProblemSpec) -> str:
+        return spec_hash(spec, casadi=casadi.__version__, bioptim=bioptim.__version__, pianoptim=source_hash())
+
+    def path(self, spec: ProblemSpec) -> str:
+        return os.path.join(self.folder, self.key(spec))
+
+    def __contains__(self, spec: ProblemSpec) -> bool:
+        return os.path.exists(os.path.join(self.path(spec), METADATA_FILE))
+
+    def load(self, spec: ProblemSpec) -> CompiledNlp | None:
+        """
+        The NLP of the spec if it was cached, None otherwise
+        """
+        if spec not in self:
+            return None
+        return CompiledNlp.load(self.path(spec))
+
+    def store(self, spec: ProblemSpec, nlp: CompiledNlp) -> None:
+        nlp.save(self.path(spec))
+
+    def get_or_build(
+        self, spec: ProblemSpec, build: Callable[[ProblemSpec], OptimalControlProgram] = build_ocp
+    ) -> CompiledNlp:
+        """
+        Load the NLP of the spec, or build the program, compile and store it if it is not in the cache
+
+        Parameters
+        ----------
+        spec: ProblemSpec
+            The description of the problem
+        build: Callable[[ProblemSpec], OptimalControlProgram]
+            The function that builds the program from the spec
+
+        Returns
+        -------
+        The compiled NLP
+        """
+        nlp = self.load(spec)
+        if nlp is None:
+            nlp = CompiledNlp.from_ocp(build(spec))
+            self.store(spec, nlp)
+        return nlp
@@ -0,0 +1,108 @@
+"""
+The generalized coordinates of the whole pianist and key model over all the phases of a solution. The holonomic
+phases only have the independent (q_u) and dependent (q_v) coordinates, the free phases do not have the key, so the
+full q of each phase is scattered into one preallocated array through index maps computed once per phase.
+"""
+
+from dataclasses import dataclass
+
+from bioptim import OptimalControlProgram, Solution, SolutionMerge, TimeAlignment
+import numpy as np
+
+from .builder import partition_mappings
+
+
+@dataclass(frozen=True)
+class FullQ:
+    """
+    The full q of a solution
+
+    Attributes
+    ----------
+    q: np.ndarray
+        The generalized coordinates (nb_q, total_frames), the rows a phase does not have (the key in the free phases)
+        are zeros
+    time: np.ndarray
+        The time of each frame (total_frames,)
+    phase_offsets: np.ndarray
+        The first frame of each phase, and the total number of frames as last element
+    """
+
+    q: np.ndarray
+    time: np.ndarray
+    phase_offsets: np.ndarray
+
+    def phase(self, phase: int) -> slice:
+        """
+        The frames of a phase
+        """
+        return slice(int(self.phase_offsets[phase]), int(self.phase_offsets[phase + 1]))
+
+
+def phase_index_maps(ocp: OptimalControlProgram) -> list[dict[str, np.ndarray]]:
+    """
+    The rows of the full q filled by each variable of each phase: "q_u" and "q_v" for the holonomic phases (from
+    the same mappings as the builder), "q" for the free phases
+
+    Parameters
+    ----------
+    ocp: OptimalControlProgram
+        The program
+
+    Returns
+    -------
+    The row indices by variable name, for each phase
+    """
+    index_maps = []
+    for nlp in ocp.nlp:
+        if hasattr(nlp.model, "independent_joint_index"):
+            u_mapping, v_mapping = partition_mappings(nlp.model)
+            index_maps.append(
+                {
+                    "q_u": np.array(u_mapping["q"].to_first.map_idx, dtype=int),
+                    "q_v": np.array(v_mapping["q"].to_first.map_idx, dtype=int),
+                }
+            )
+        else:
+            index_maps.append({"q": np.arange(nlp.model.nb_q)})
+    return index_maps
+
+
+def full_q(sol: Solution, nb_q: int = None) -> FullQ:
+    """
+    The full q of all the phases of a solution, at the stepwise frames, in one contiguous array
+
+    Parameters
+    ----------
+    sol: Solution
+        The solution
+    nb_q: int
+        The number of generalized coordinates of the full model, the largest number of coordinates of the phases if
+        None
+
+    Returns
+    -------
+    The full q, the time of each frame and the frames of each phase
+    """
+    ocp = sol.ocp
+    index_maps = phase_index_maps(ocp)
+    nb_q = max(int(max(rows.max() for rows in maps.values())) + 1 for maps in index_maps) if nb_q is None else nb_q
+
+    stepwise_time = sol.stepwise_time(to_merge=SolutionMerge.NODES, time_alignment=TimeAlignment.STATES)
+    stepwise_states = sol.stepwise_states(to_merge=SolutionMerge.NODES)
+    algebraic_states = sol.decision_algebraic_states(to_merge=SolutionMerge.NODES)
+    if ocp.n_phases == 1:
+        stepwise_time, stepwise_states, algebraic_states = [stepwise_time], [stepwise_states], [algebraic_states]
+
+    n_frames = [np.asarray(stepwise_time[phase]).size for phase in range(ocp.n_phases)]
+    phase_offsets = np.concatenate(([0], np.cumsum(n_frames))).astype(int)
+
+    q = np.zeros((nb_q, phase_offsets[-1]))
+    time = np.zeros(phase_offsets[-1])
+    for phase, maps in enumerate(index_maps):
+        frames = slice(phase_offsets[phase], phase_offsets[phase + 1])
+        time[frames] = np.asarray(stepwise_time[phase]).reshape(-1)
+        for name, rows in maps.items():
+            values = stepwise_states[phase][name] if name in stepwise_states[phase] else algebraic_states[phase][name]
+            q[rows, frames] = values
+    return FullQ(q, time, phase_offsets)
@@ -0,0 +1,364 @@
+"""
+Forward simulation of the solved controls, to check the dynamic consistency of the solutions. The controls (taudot)
+of each phase are integrated with an adaptive integrator (cvodes) through the dynamics of the program, phase by phase
+and through the transitions (the finger leaving the key, the impact of the finger on the key for the cyclic
+problems), and the integrated states are compared to the ones of the solution:
+- the defect of each interval, integrated from the state of the solution at its start
+- the drift, integrated from the start of the movement without ever going back to the solution
+
+The dynamics Functions of the program are wrapped once in a Simulator, which is sent once to each worker of the pool,
+so simulating many solutions (a sweep archive) does not build anything again.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import multiprocessing
+import os
+
+from bioptim import OptimalControlProgram, Solution
+from casadi import Function, MX, integrator, vertcat
+import numpy as np
+import pandas as pd
+
+from .sweep import thread_environment
+from .trajectories import TrajectoryFile
+from .warm_start import decision_arrays
+from ..utils.collision import collision_impact
+
+# The simulator of the current worker, set by the initializer of the pool
+_WORKER_SIMULATOR = None
+
+
+@dataclass
+class PhaseSimulator:
+    """
+    The integration of one phase
+
+    Attributes
+    ----------
+    holonomic: bool
+        If the finger is attached to the key
+    n_shooting: int
+        The number of shooting nodes
+    state_names: list[str]
+        The states, in the order of the state vector
+    state_sizes: list[int]
+        The size of each state
+    control_names: list[str]
+        The controls, in the order of the control vector
+    algebraic_names: list[str]
+        The algebraic states (q_v), they seed the dependent coordinates computed along the integration
+    n_parameters: int
+        The size of the parameter vector of the dynamics
+    interval: Function
+        The state at the end of an interval, xf = f(x0, u, p, dt, a)
+    transition: Function | None
+        The state at the start of the next phase, f(x_end, a_end, restitution), None if the states are the same
+    """
+
+    holonomic: bool
+    n_shooting: int
+    state_names: list[str]
+    state_sizes: list[int]
+    control_names: list[str]
+    algebraic_names: list[str]
+    n_parameters: int
+    interval: Function
+    transition: Function | None = None
+
+
+def _dependent_coordinates(model) -> Function:
+    """
+    q_v = f(q_u, q_v_init) as the program computes it: the closed form if the model uses it (see
+    HolonomicPianist.compute_q_v_explicit), Newton iterations otherwise. q_v_init is the q_v of the solution, so the
+    integration stays on the configuration of the solution (e.g. not the arm flipped about the shoulder-finger axis)
+    """
+    if getattr(model, "closed_form_q_v", False):
+        return model.compute_q_v_explicit()
+    return model.compute_q_v()
+
+
+def _state_slices(nlp) -> dict[str, list[int]]:
+    return {name: list(nlp.states[name].index) for name in nlp.states.keys()}
+
+
+def interval_integrator(nlp, method: str = "cvodes", options: dict = None) -> Function:
+    """
+    The integration of the dynamics of a phase over one interval with constant controls
+
+    Parameters
+    ----------
+    nlp: NonLinearProgram
+        The phase, its dynamics_func is reused
+    method: str
+        The casadi integrator
+    options: dict
+        The options of the integrator, tight tolerances if None
+
+    Returns
+    -------
+    The Function xf = f(x0, u, p, dt, a), a being the algebraic states of the solution at the start of the interval
+    """
+    options = {"abstol": 1e-10, "reltol": 1e-10} if options is None else options
+    dynamics = nlp.dynamics_func[0] if isinstance(nlp.dynamics_func, list) else nlp.dynamics_func
+
+    n_x, n_u, n_p, n_a, n_d = (dynamics.size1_in(i) for i in range(1, 6))
+    x = MX.sym("x", n_x, 1)
+    u = MX.sym("u", n_u, 1)
+    p = MX.sym("p", n_p, 1)
+    dt = MX.sym("dt", 1, 1)
+    a_init = MX.sym("a", n_a, 1)
+
+    # The algebraic states (q_v) are not integrated, they follow q_u from the ones of the solution
+    a = MX(0, 1)
+    if n_a > 0:
+        a = _dependent_coordinates(nlp.model)(x[_state_slices(nlp)["q_u"]], a_init)
+
+    # The interval is mapped on [0, 1], so dt is a parameter of the integrator
+    integrator_parameters = vertcat(u, p, dt, a_init)
+    xdot = dynamics.call([vertcat(0, dt), x, u, p, a, MX.zeros(n_d, 1)])[0]
+    phase_integrator = integrator(
+        f"interval_{nlp.phase_idx}", method, {"x": x, "p": integrator_parameters, "ode": dt * xdot}, 0, 1, options
+    )
+    xf = phase_integrator(x0=x, p=integrator_parameters)["xf"]
+    return Function(f"interval_{nlp.phase_idx}", [x, u, p, dt, a_init], [xf], ["x0", "u", "p", "dt", "a"], ["xf"])
+
+
+def transition_function(nlp_pre, nlp_post) -> Function | None:
+    """
+    The state at the start of a phase from the state at the end of the previous one: the dependent coordinates are
+    added when the finger leaves the key, the impact is applied when the finger lands on it (see
+    custom_phase_transition_algebraic_post and transition_algebraic_pre_with_collision)
+
+    Returns
+    -------
+    The Function x_post = f(x_pre, a_pre, restitution), None if the two phases have the same states
+    """
+    pre_holonomic = hasattr(nlp_pre.model, "independent_joint_index")
+    post_holonomic = hasattr(nlp_post.model, "independent_joint_index")
+    if pre_holonomic == post_holonomic:
+        return None
+
+    pre = _state_slices(nlp_pre)
+    x = MX.sym("x", nlp_pre.states.shape, 1)
+    a = MX.sym("a", nlp_pre.algebraic_states.shape, 1)
+    restitution = MX.sym("restitution", 1, 1)
+
+    if pre_holonomic:
+        model = nlp_pre.model
+        q_u = x[pre["q_u"]]
+        q = model.state_from_partition(q_u, _dependent_coordinates(model)(q_u, a))
+        qdot = model.compute_qdot()(q, x[pre["qdot_u"]])
+        # The free model has no key, the last coordinate
+        values = {"q": q[:-1], "qdot": qdot[:-1], "tau": x[pre["tau"]]}
+    else:
+        model = nlp_post.model
+        # The key is at rest at the top when the finger lands on it
+        q = vertcat(x[pre["q"]], 0)
+        qdot = vertcat(x[pre["qdot"]], 0)
+        qdot_post = collision_impact(model, q, qdot, e=restitution, linear_solver="closed_form")
+        u = list(model.independent_joint_index)
+        values = {"q_u": q[u], "qdot_u": qdot_post[u], "tau": x[pre["tau"]]}
+
+    x_post = vertcat(*(values[name] for name in nlp_post.states.keys()))
+    return Function(
+        f"transition_{nlp_pre.phase_idx}_{nlp_post.phase_idx}",
+        [x, a, restitution],
+        [x_post],
+        ["x", "a", "e"],
+        ["x_post"],
+    )
+
+
+@dataclass
+class Simulator:
+    """
+    The integration of all the phases of a program
+
+    Attributes
+    ----------
+    phases: list[PhaseSimulator]
+        The simulation of each phase, the transition of the last one leads back to the first one if cyclic
+    cyclic: bool
+        If the last phase is followed by the first one
+    """
+
+    phases: list[PhaseSimulator]
+    cyclic: bool = False
+
+    @classmethod
+    def from_ocp(
+        cls, ocp: OptimalControlProgram, cyclic: bool = False, method: str = "cvodes", options: dict = None
+    ) -> "Simulator":
+        """
+        Wrap the dynamics of a program
+
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            The program the solutions come from
+        cyclic: bool
+            If the last phase lands on the key to start the first one again
+        method: str
+            The casadi integrator
+        options: dict
+            The options of the integrator
+        """
+        phases = []
+        for nlp in ocp.nlp:
+            next_phase = nlp.phase_idx + 1
+            transition = None
+            if next_phase < ocp.n_phases or cyclic:
+                transition = transition_function(nlp, ocp.nlp[next_phase % ocp.n_phases])
+            phases.append(
+                PhaseSimulator(
+                    holonomic=hasattr(nlp.model, "independent_joint_index"),
+                    n_shooting=nlp.ns,
+                    state_names=list(nlp.states.keys()),
+                    state_sizes=[len(nlp.states[name].index) for name in nlp.states.keys()],
+                    control_names=list(nlp.controls.keys()),
+                    algebraic_names=list(nlp.algebraic_states.keys()),
+                    n_parameters=nlp.parameters.shape,
+                    interval=interval_integrator(nlp, method, options),
+                    transition=transition,
+                )
+            )
+        return cls(phases, cyclic)
+
+    def simulate(self, arrays, phases_dt: np.ndarray, restitution: float = 0.0) -> pd.DataFrame:
+        """
+        Integrate the controls of a solution and compare the integrated states to the ones of the solution
+
+        Parameters
+        ----------
+        arrays
+            The decision variables named "<kind>/<phase>/<name>" (see decision_arrays, TrajectoryFile)
+        phases_dt: np.ndarray
+            The time step of each phase
+        restitution: float
+            The coefficient of restitution of the impact of the cyclic problems
+
+        Returns
+        -------
+        One row per phase (and one "cycle" row for the cyclic problems) with the largest defect of the intervals,
+        the largest and the final drift, the error of the state at the entry of the phase and the largest drift of
+        each state
+        """
+        rows = []
+        x_start = None
+        for phase, simulator in enumerate(self.phases):
+            nodes = self._nodes(arrays, phase, simulator)
+            n = simulator.n_shooting
+            controls = np.vstack(
+                [np.asarray(arrays[f"controls/{phase}/{name}"])[:, :n] for name in simulator.control_names]
+            )
+            parameters = np.zeros((simulator.n_parameters, n))
+            dt = np.full((1, n), phases_dt[phase])
+            algebraic = self._nodes(arrays, phase, simulator, "algebraic_states")
+
+            x_start = nodes[:, 0] if x_start is None else x_start
+            intervals = simulator.interval.map(n)(nodes[:, :-1], controls, parameters, dt, algebraic[:, :-1])
+            defects = np.array(intervals) - nodes[:, 1:]
+            drift = np.hstack(
+                (
+                    x_start[:, np.newaxis],
+                    np.array(simulator.interval.mapaccum(n)(x_start, controls, parameters, dt, algebraic[:, :-1])),
+                )
+            )
+            drift -= nodes
+
+            row = {
+                "phase": phase,
+                "max_defect": float(np.max(np.abs(defects))),
+                "max_drift": float(np.max(np.abs(drift))),
+                "final_drift": float(np.max(np.abs(drift[:, -1]))),
+                "entry_error": float(np.max(np.abs(drift[:, 0]))),
+            }
+            offset = 0
+            for name, size in zip(simulator.state_names, simulator.state_sizes):
+                row[f"max_drift_{name}"] = float(np.max(np.abs(drift[offset : offset + size])))
+                offset += size
+            rows.append(row)
+
+            x_end = drift[:, -1] + nodes[:, -1]
+            if simulator.transition is not None:
+                x_end = np.array(simulator.transition(x_end, algebraic[:, -1], restitution))
+            x_start = x_end
+            x_start = np.asarray(x_start).reshape(-1)
+
+        if self.cyclic:
+            error = x_start - self._nodes(arrays, 0, self.phases[0])[:, 0]
+            rows.append({"phase": "cycle", "entry_error": float(np.max(np.abs(error)))})
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def _nodes(arrays, phase: int, simulator: PhaseSimulator, kind: str = "states") -> np.ndarray:
+        """
+        The states (or algebraic states) of the solution at the shooting nodes (the collocation points are left out)
+        """
+        names = simulator.state_names if kind == "states" else simulator.algebraic_names
+        if not names:
+            return np.zeros((0, simulator.n_shooting + 1))
+        values = [np.asarray(arrays[f"{kind}/{phase}/{name}"]) for name in names]
+        n_cols = values[0].shape[1]
+        step = (n_cols - 1) // simulator.n_shooting
+        return np.vstack(values)[:, ::step]
+
+    def simulate_solution(self, sol: Solution, restitution: float = 0.0) -> pd.DataFrame:
+        """
+        Simulate a solution, see simulate
+        """
+        return self.simulate(decision_arrays(sol), np.array(sol.phases_dt, dtype=float).reshape(-1), restitution)
+
+    def simulate_file(self, path: str) -> pd.DataFrame:
+        """
+        Simulate a trajectory file (see pianoptim.ocp.trajectories), the restitution is read from its spec
+        """
+        trajectories = TrajectoryFile(path)
+        restitution = trajectories.metadata.get("spec", {}).get("restitution", 0.0)
+        table = self.simulate(trajectories, np.array(trajectories.metadata["phases_dt"]), restitution)
+        table.insert(0, "case", path)
+        return table
+
+
+def _initialize_worker(simulator: Simulator) -> None:
+    global _WORKER_SIMULATOR
+    _WORKER_SIMULATOR = simulator
+
+
+def _simulate_file(path: str) -> pd.DataFrame:
+    return _WORKER_SIMULATOR.simulate_file(path)
+
+
+def simulate_archive(simulator: Simulator, paths: list[str], n_workers: int = None) -> pd.DataFrame:
+    """
+    Simulate many trajectory files of the same program over a process pool. The files must come from the program
+    of the simulator (same phases, models and friction), e.g. the runs of one spec
+
+    Parameters
+    ----------
+    simulator: Simulator
+        The simulator of the program, sent once to each worker
+    paths: list[str]
+        The trajectory files
+    n_workers: int
+        The number of processes, one per core if None
+
+    Returns
+    -------
+    The tables of Simulator.simulate of all the files, with their path as "case"
+    """
+    n_workers = min(len(paths), os.cpu_count() or 1) if n_workers is None else n_workers
+    if n_workers <= 1:
+        return pd.concat([simulator.simulate_file(path) for path in paths], ignore_index=True)
+
+    # spawn rather than fork, casadi does not survive a fork of a threaded process. One thread per worker, inherited
+    # from the environment as the backends are loaded before the initializer runs
+    with thread_environment(1), ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initialize_worker,
+        initargs=(simulator,),
+    ) as executor:
+        tables = list(executor.map(_simulate_file, paths))
+    return pd.concat(tables, ignore_index=True)
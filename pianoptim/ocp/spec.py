@@ -0,0 +1,270 @@
+"""
+Declarative description of the press play problems. A ProblemSpec lists the phases of the movement (what the finger
+does, if the finger is attached to the key, how the phase is discretized and how long it lasts), and the builder
+turns it into an OptimalControlProgram.
+"""
+
+from dataclasses import asdict, dataclass, replace
+import hashlib
+import json
+import os
+
+from ..utils.cache import file_hash
+
+HOLONOMIC_TASKS = ("rest", "descend", "bed", "release")
+FREE_TASKS = ("lift", "return")
+
+MODELS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+PIANIST_AND_KEY_MODEL_PATH = os.path.join(MODELS_FOLDER, "pianist_and_key.bioMod")
+PIANIST_MODEL_PATH = os.path.join(MODELS_FOLDER, "pianist.bioMod")
+
+
+@dataclass(frozen=True)
+class PhaseSpec:
+    """
+    The description of one phase of the movement
+
+    Attributes
+    ----------
+    task: str
+        What the finger does during the phase:
+        - "rest": the finger lies on the unpressed key and waits
+        - "descend": the finger pushes the key from the top to the bed
+        - "bed": the key is held into the bed
+        - "release": the key goes back up to the top with the finger on it
+        - "lift": the finger leaves the key and goes up to the elevated position
+        - "return": the finger goes back on top of the key
+    n_shooting: int
+        The number of shooting nodes of the phase
+    min_time: float
+        The lower end of the time window of the phase
+    max_time: float
+        The upper end of the time window of the phase. The duration of the phase is not an optimization variable:
+        the builder fixes it to the middle of the window (see phase_time), as the press play examples do, and the
+        window itself is not enforced as a bound
+    polynomial_degree: int
+        The degree of the collocation polynomials
+    holonomic: bool | None
+        If the finger is attached to the key (HolonomicPianist) or free (pianist without the key). It is deduced from
+        the task if None
+    spring: str | None
+        The name of the spring law of the key bed (see pianoptim.logistic_springs.springs.SPRING_FUNCTIONS), holonomic
+        phases only
+    """
+
+    task: str
+    n_shooting: int
+    min_time: float
+    max_time: float
+    polynomial_degree: int = 9
+    holonomic: bool | None = None
+    spring: str | None = None
+
+    def __post_init__(self):
+        if self.task not in HOLONOMIC_TASKS + FREE_TASKS:
+            raise ValueError(f"task must be one of {HOLONOMIC_TASKS + FREE_TASKS}, got {self.task}")
+        if self.holonomic is None:
+            object.__setattr__(self, "holonomic", self.task in HOLONOMIC_TASKS)
+        if self.holonomic != (self.task in HOLONOMIC_TASKS):
+            raise ValueError(f"The task {self.task} cannot be performed with holonomic={self.holonomic}")
+        if self.spring is not None and not self.holonomic:
+            raise ValueError("A spring can only be added to the key, i.e. in holonomic phases")
+        if self.min_time > self.max_time:
+            raise ValueError(f"min_time ({self.min_time}) must be lower than max_time ({self.max_time})")
+
+    @property
+    def phase_time(self) -> float:
+        """
+        The (fixed) duration of the phase, i.e. the middle of the time window
+        """
+        return (self.min_time + self.max_time) / 2
+
+
+@dataclass(frozen=True)
+class ProblemSpec:
+    """
+    The description of a press play problem
+
+    Attributes
+    ----------
+    phases: tuple[PhaseSpec, ...]
+        The phases of the movement, in order
+    cyclic: bool
+        If the last phase (free) is linked to the first one (holonomic) through the impact of the finger on the key
+    model_path: str
+        The bioMod of the pianist and the key, used by the holonomic phases
+    free_model_path: str
+        The bioMod of the pianist alone, used by the free phases
+    friction_coefficient: float
+        The joint friction coefficient of the finger
+    tau_max: float
+        The bounds on the generalized forces
+    taudot_max: float
+        The bounds on the derivative of the generalized forces
+    lambda_max: float
+        The bounds on the lagrange multipliers (i.e. contact forces) of the holonomic constraints
+    boundary_qdot_max: float | None
+        The bounds on the generalized velocities at the end of the first and last phases, None to leave them free
+    restitution: float
+        The coefficient of restitution of the impact of the finger on the key (cyclic problems)
+    restitution_as_parameter: bool
+        If the restitution is a parameter of the program (bounded to the value of restitution), so it can be changed
+        through the bounds of the compiled NLP without building the program again
+    n_threads: int
+        The number of threads used by bioptim to build the program
+    compiled: bool
+        If the holonomic functions of the dynamics are compiled to C (see HolonomicPianist)
+    use_sx: bool
+        If the program is built with SX variables, the holonomic functions are then expanded
+    expand: bool
+        If the continuity constraints are expanded, the holonomic functions are then expanded
+    """
+
+    phases: tuple[PhaseSpec, ...]
+    cyclic: bool = False
+    model_path: str = PIANIST_AND_KEY_MODEL_PATH
+    free_model_path: str = PIANIST_MODEL_PATH
+    friction_coefficient: float = 0.05
+    tau_max: float = 40
+    taudot_max: float = 5000
+    lambda_max: float = 20
+    boundary_qdot_max: float | None = 10
+    restitution: float = 0.0
+    restitution_as_parameter: bool = False
+    n_threads: int = 32
+    compiled: bool = False
+    use_sx: bool = False
+    expand: bool = False
+
+    def __post_init__(self):
+        object.__setattr__(self, "phases", tuple(self.phases))
+        if len(self.phases) == 0:
+            raise ValueError("A problem needs at least one phase")
+        if not self.phases[0].holonomic:
+            raise ValueError("The first phase must start with the finger on the key (holonomic phase)")
+        seen_free = False
+        for phase in self.phases:
+            if seen_free and phase.holonomic:
+                raise ValueError("The finger cannot be attached back to the key after a free phase, use cyclic=True")
+            seen_free |= not phase.holonomic
+        if self.cyclic and self.phases[-1].holonomic:
+            raise ValueError("A cyclic problem must end with a free phase so the finger can impact the key")
+        if not 0 <= self.restitution <= 1:
+            raise ValueError(f"restitution must be in [0, 1], got {self.restitution}")
+        if self.restitution_as_parameter and not self.cyclic:
+            raise ValueError("The restitution is only used by the impact of cyclic problems")
+
+    @property
+    def holonomic_phases(self) -> list[int]:
+        return [i for i, phase in enumerate(self.phases) if phase.holonomic]
+
+    @property
+    def free_phases(self) -> list[int]:
+        return [i for i, phase in enumerate(self.phases) if not phase.holonomic]
+
+    @property
+    def has_spring(self) -> bool:
+        return any(phase.spring is not None for phase in self.phases)
+
+    @property
+    def n_shooting(self) -> tuple[int, ...]:
+        return tuple(phase.n_shooting for phase in self.phases)
+
+    def with_phases(self, **changes) -> "ProblemSpec":
+        """
+        Copy the spec with the same changes applied to every phase, e.g. spec.with_phases(polynomial_degree=3)
+        """
+        return replace(self, phases=tuple(replace(phase, **changes) for phase in self.phases))
+
+
+def spec_hash(spec: ProblemSpec, **extra) -> str:
+    """
+    A hash that changes whenever the problem described by spec changes, i.e. the spec itself or the content of the
+    bioMod files it points to
+
+    Parameters
+    ----------
+    spec: ProblemSpec
+        The description of the problem
+    extra
+        Any other value that should change the hash (e.g. the versions of the libraries)
+
+    Returns
+    -------
+    The hexadecimal sha256 of the problem
+    """
+    content = asdict(spec)
+    content["model_hashes"] = [file_hash(spec.model_path), file_hash(spec.free_model_path)]
+    content["extra"] = extra
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def press_play_spec(**kwargs) -> ProblemSpec:
+    """
+    The finger descends, holds the key in the bed and releases it (press_play_torque_derivative_driven_algebraic)
+    """
+    phases = (
+        PhaseSpec("descend", n_shooting=3, min_time=0.04, max_time=0.05),
+        PhaseSpec("bed", n_shooting=3, min_time=0.045, max_time=0.055),
+        PhaseSpec("release", n_shooting=3, min_time=0.05, max_time=0.06),
+    )
+    return ProblemSpec(phases=phases, **kwargs)
+
+
+def extra_lift_spec(**kwargs) -> ProblemSpec:
+    """
+    The press play followed by the lift of the finger (press_play_torque_derivative_driven_algebraic_extra_lift)
+    """
+    phases = press_play_spec().phases + (PhaseSpec("lift", n_shooting=30, min_time=0.225, max_time=0.275),)
+    return ProblemSpec(phases=phases, **kwargs)
+
+
+def extra_lift_to_beginning_spec(**kwargs) -> ProblemSpec:
+    """
+    The press play, the lift of the finger and its return on the key, without closing the loop
+    (press_play_torque_derivative_driven_algebraic_extra_lift_to_beginning)
+    """
+    phases = extra_lift_spec().phases + (PhaseSpec("return", n_shooting=3, min_time=0.05, max_time=0.05),)
+    return ProblemSpec(phases=phases, **kwargs)
+
+
+def full_loop_spec(**kwargs) -> ProblemSpec:
+    """
+    The finger rests on the key, plays it, lifts and impacts the key again to start over
+    (press_play_torque_derivative_driven_algebraic_full_loop_refactor)
+    """
+    phases = (
+        PhaseSpec("rest", n_shooting=15, min_time=0.3, max_time=0.3, polynomial_degree=6),
+        PhaseSpec("descend", n_shooting=3, min_time=0.04, max_time=0.05),
+        PhaseSpec("bed", n_shooting=3, min_time=0.045, max_time=0.055),
+        PhaseSpec("release", n_shooting=3, min_time=0.05, max_time=0.06),
+        PhaseSpec("lift", n_shooting=30, min_time=0.225, max_time=0.275, polynomial_degree=3),
+        PhaseSpec("return", n_shooting=3, min_time=0.05, max_time=0.05),
+    )
+    kwargs.setdefault("cyclic", True)
+    return ProblemSpec(phases=phases, **kwargs)
+
+
+def full_loop_with_spring_spec(**kwargs) -> ProblemSpec:
+    """
+    The full loop where the bed of the key is a spring and there is no holding phase
+    (press_play_torque_derivative_driven_algebraic_full_loop_refactor_with_sring)
+    """
+    phases = (
+        PhaseSpec("rest", n_shooting=15, min_time=0.3, max_time=0.3, polynomial_degree=6, spring="cubic_increase"),
+        PhaseSpec("descend", n_shooting=3, min_time=0.04, max_time=0.05, spring="cubic_increase"),
+        PhaseSpec("release", n_shooting=3, min_time=0.05, max_time=0.06, spring="exponential_decay"),
+        PhaseSpec("lift", n_shooting=30, min_time=0.225, max_time=0.275, polynomial_degree=3),
+        PhaseSpec("return", n_shooting=3, min_time=0.05, max_time=0.05),
+    )
+    kwargs.setdefault("cyclic", True)
+    return ProblemSpec(phases=phases, **kwargs)
+
+
+PRESETS = {
+    "press_play": press_play_spec,
+    "extra_lift": extra_lift_spec,
+    "extra_lift_to_beginning": extra_lift_to_beginning_spec,
+    "full_loop": full_loop_spec,
+    "full_loop_with_spring": full_loop_with_spring_spec,
+}
@@ -0,0 +1,371 @@
+"""
+Parameter sweeps of the press play problems. A grid of values (phase time bounds, friction, bounds, spring laws...) is
+expanded into specs that are built and solved in parallel over a process pool. Each worker gets its share of the cores
+for IPOPT and the building of the program, and starts from the closest solution already in the SolutionStore, so the
+variants that finish first warm start their neighbours.
+
+The coefficient of restitution of the impact is swept differently (restitution_sweep): it is a parameter of one
+compiled NLP, so each value only changes its bounds and the program is built once.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+import itertools
+import multiprocessing
+import os
+import time
+import traceback
+
+from bioptim import Solver
+import numpy as np
+import pandas as pd
+
+from .builder import build_ocp
+from .nlp_cache import NlpCache
+from .spec import ProblemSpec, spec_hash
+from .trajectories import EXTENSION, export_solution
+from ..utils.custom_transitions import RESTITUTION_PARAMETER
+from .warm_start import SolutionStore
+
+# The environment variables read by the BLAS/OpenMP backends of the linear solvers of IPOPT
+THREAD_ENVIRONMENT_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# The number of threads of the current worker, set by the initializer of the pool
+_WORKER_THREADS = None
+
+
+@dataclass(frozen=True)
+class SweepCase:
+    """
+    One point of the grid
+
+    Attributes
+    ----------
+    parameters: dict
+        The value of each axis of the grid for this case
+    spec: ProblemSpec
+        The problem to solve
+    """
+
+    parameters: dict
+    spec: ProblemSpec
+
+
+@dataclass(frozen=True)
+class SolverSettings:
+    """
+    The IPOPT settings shared by all the cases of a sweep
+
+    Attributes
+    ----------
+    max_iterations: int
+        The maximum number of iterations
+    linear_solver: str
+        The linear solver of IPOPT
+    tolerance: float | None
+        The tolerance of IPOPT, the default one if None
+    options: dict
+        Any other IPOPT option, by name (without the "ipopt." prefix)
+    """
+
+    max_iterations: int = 10000
+    linear_solver: str = "ma57"
+    tolerance: float | None = None
+    options: dict = field(default_factory=dict)
+
+    def solver(self) -> Solver.IPOPT:
+        solver = Solver.IPOPT(show_online_optim=False)
+        solver.set_maximum_iterations(self.max_iterations)
+        solver.set_linear_solver(self.linear_solver)
+        if self.tolerance is not None:
+            solver.set_tol(self.tolerance)
+        for name, value in self.options.items():
+            solver.set_option_unsafe(value, name)
+        return solver
+
+
+def _apply_axis(spec: ProblemSpec, axis: str, value) -> ProblemSpec:
+    """
+    Change one value of a spec. The axis is either a field of ProblemSpec ("friction_coefficient", "taudot_max"...),
+    or "<task>.<field>" for a field of the phases of this task ("descend.max_time", "bed.spring"...), "phases.<field>"
+    for all the phases. The pseudo field "time" sets (min_time, max_time) at once. A KeyError is raised if no phase
+    matches the axis, a ValueError if the value does not describe a valid problem.
+    """
+    if "." not in axis:
+        return replace(spec, **{axis: value})
+
+    target, phase_field = axis.split(".", 1)
+    changes = dict(zip(("min_time", "max_time"), value)) if phase_field == "time" else {phase_field: value}
+
+    phases = []
+    found = False
+    for phase in spec.phases:
+        if target == "phases" or phase.task == target:
+            if phase_field == "spring" and not phase.holonomic:
+                phases.append(phase)
+                continue
+            phase = replace(phase, **changes)
+            found = True
+        phases.append(phase)
+    if not found:
+        raise KeyError(f"No phase of the spec matches the axis {axis}")
+    return replace(spec, phases=tuple(phases))
+
+
+def expand_grid(base: ProblemSpec, **axes) -> list[SweepCase]:
+    """
+    The cartesian product of the values of each axis, applied to a base spec. The combinations that do not describe
+    a valid problem (e.g. min_time > max_time) are left out, an axis that matches nothing (e.g. a misspelled task or
+    field) raises.
+
+    Parameters
+    ----------
+    base: ProblemSpec
+        The spec that is modified
+    axes
+        The values of each axis, e.g. expand_grid(spec, friction_coefficient=[0.01, 0.05], **{"bed.max_time": [...]})
+
+    Returns
+    -------
+    The cases of the sweep
+    """
+    names = list(axes.keys())
+    cases = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        spec = base
+        try:
+            for name, value in zip(names, values):
+                spec = _apply_axis(spec, name, value)
+        except ValueError:
+            continue
+        cases.append(SweepCase(dict(zip(names, values)), spec))
+    return cases
+
+
+def threads_per_worker(n_workers: int, n_cpus: int = None) -> int:
+    """
+    The number of threads each worker can use without oversubscribing the cores
+    """
+    n_cpus = os.cpu_count() if n_cpus is None else n_cpus
+    return max(1, n_cpus // n_workers)
+
+
+@contextmanager
+def thread_environment(n_threads: int):
+    """
+    Set the number of threads of the BLAS/OpenMP backends in the environment, restored on exit. The backends read it
+    once, when they are loaded, i.e. when a spawned worker imports numpy and casadi and before its initializer runs.
+    The workers must therefore be spawned within this context so they inherit it.
+    """
+    previous = {name: os.environ.get(name) for name in THREAD_ENVIRONMENT_VARIABLES}
+    os.environ.update({name: str(n_threads) for name in THREAD_ENVIRONMENT_VARIABLES})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _initialize_worker(n_threads: int) -> None:
+    global _WORKER_THREADS
+    _WORKER_THREADS = n_threads
+
+
+def solve_case(
+    case: SweepCase,
+    settings: SolverSettings = SolverSettings(),
+    store_folder: str = None,
+    warm_start: bool = True,
+    trajectory_folder: str = None,
+) -> dict:
+    """
+    Build and solve one case of the sweep, the solution being saved in the SolutionStore
+
+    Parameters
+    ----------
+    case: SweepCase
+        The case to solve
+    settings: SolverSettings
+        The IPOPT settings
+    store_folder: str
+        The folder of the SolutionStore, the default one if None
+    warm_start: bool
+        If the case starts from the closest solution of the store
+    trajectory_folder: str
+        The folder where the trajectories of the solution are exported (see pianoptim.ocp.trajectories), one file
+        per spec hash, None to not export them
+
+    Returns
+    -------
+    The row of the case in the table of results
+    """
+    spec = case.spec
+    if _WORKER_THREADS is not None:
+        spec = replace(spec, n_threads=_WORKER_THREADS)
+
+    row = dict(case.parameters)
+    row["spec_hash"] = spec_hash(case.spec)
+    row["warm_started_from"] = None
+    try:
+        tic = time.perf_counter()
+        ocp = build_ocp(spec)
+        row["build_time"] = time.perf_counter() - tic
+
+        solver = settings.solver()
+        store = SolutionStore(store_folder)
+        if warm_start:
+            initial_guess = store.warm_start(spec)
+            if initial_guess is not None:
+                initial_guess.apply(ocp, solver)
+                row["warm_started_from"] = initial_guess.source.metadata["name"]
+
+        sol = ocp.solve(solver)
+        store.save(spec, sol)
+        if trajectory_folder is not None:
+            export_solution(
+                sol,
+                os.path.join(trajectory_folder, f"{row['spec_hash']}{EXTENSION}"),
+                metadata={"parameters": case.parameters, "spec": asdict(case.spec)},
+            )
+
+        row["status"] = int(sol.status)
+        row["cost"] = float(np.array(sol.cost).reshape(-1)[0])
+        row["iterations"] = int(sol.iterations)
+        row["real_time_to_optimize"] = float(sol.real_time_to_optimize)
+        for phase, (phase_spec, dt) in enumerate(zip(spec.phases, sol.phases_dt)):
+            row[f"phase_{phase}_time"] = float(dt) * phase_spec.n_shooting
+        row["error"] = None
+    except Exception:
+        row["status"] = -1
+        row["error"] = traceback.format_exc()
+    return row
+
+
+def run_sweep(
+    cases: list[SweepCase],
+    n_workers: int = None,
+    settings: SolverSettings = SolverSettings(),
+    store_folder: str = None,
+    warm_start: bool = True,
+    trajectory_folder: str = None,
+    verbose: bool = False,
+) -> pd.DataFrame:
+    """
+    Solve all the cases of a sweep over a process pool
+
+    Parameters
+    ----------
+    cases: list[SweepCase]
+        The cases, as given by expand_grid. They are submitted in order, so neighbouring cases should be next to each
+        other to benefit from the warm start
+    n_workers: int
+        The number of processes, one per 4 cores if None
+    settings: SolverSettings
+        The IPOPT settings
+    store_folder: str
+        The folder of the SolutionStore, the default one if None
+    warm_start: bool
+        If the cases start from the closest solution of the store
+    trajectory_folder: str
+        The folder where the trajectories of the solutions are exported, None to not export them
+    verbose: bool
+        If the status of each case is printed as it finishes
+
+    Returns
+    -------
+    One row per case with its parameters, the solver status, cost, iterations, time and the duration of each phase
+    """
+    if n_workers is None:
+        n_workers = max(1, min(len(cases), (os.cpu_count() or 1) // 4))
+    n_threads = threads_per_worker(n_workers)
+
+    rows = [None] * len(cases)
+    # spawn rather than fork, casadi and the linear solvers do not survive a fork of a threaded process. The workers
+    # are spawned as the cases are submitted, so the whole pool lives within the thread environment
+    with thread_environment(n_threads), ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initialize_worker,
+        initargs=(n_threads,),
+    ) as executor:
+        futures = {
+            executor.submit(solve_case, case, settings, store_folder, warm_start, trajectory_folder): i
+            for i, case in enumerate(cases)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            rows[i] = future.result()
+            if verbose:
+                print(f"Case {i + 1}/{len(cases)} {cases[i].parameters}: status {rows[i]['status']}")
+    return pd.DataFrame(rows)
+
+
+def restitution_sweep(
+    spec: ProblemSpec,
+    values: list[float],
+    options: dict = None,
+    warm_start: bool = True,
+    cache: NlpCache = None,
+    verbose: bool = False,
+) -> pd.DataFrame:
+    """
+    Solve a cyclic problem for several coefficients of restitution of the impact. The restitution is a parameter of
+    the program (restitution_as_parameter), so the NLP is compiled once and each value only fixes the bounds of this
+    parameter. Each solve starts from the solution (and the multipliers) of the previous value, so the values should
+    be sorted.
+
+    Parameters
+    ----------
+    spec: ProblemSpec
+        The cyclic problem, its restitution is ignored
+    values: list[float]
+        The coefficients of restitution, in [0, 1]
+    options: dict
+        The options sent to nlpsol, e.g. {"ipopt.linear_solver": "ma57"}
+    warm_start: bool
+        If each solve starts from the solution of the previous value
+    cache: NlpCache
+        The cache of the compiled NLP, the default one if None
+    verbose: bool
+        If the status of each value is printed as it is solved
+
+    Returns
+    -------
+    One row per value with the solver status, cost, iterations, time and the duration of each phase
+    """
+    # The restitution is set to 0 in the spec so all the sweeps of a problem share the same cached NLP
+    parametric_spec = replace(spec, restitution=0.0, restitution_as_parameter=True)
+    nlp = (NlpCache() if cache is None else cache).get_or_build(parametric_spec)
+    index = nlp.metadata["parameter_index"][RESTITUTION_PARAMETER]
+
+    rows = []
+    x0, lam_x0, lam_g0 = nlp.x0.copy(), None, None
+    for value in values:
+        if not 0 <= value <= 1:
+            raise ValueError(f"restitution must be in [0, 1], got {value}")
+        lbx, ubx = nlp.lbx.copy(), nlp.ubx.copy()
+        lbx[index] = ubx[index] = x0[index] = value
+
+        solution = nlp.solve(x0=x0, lam_x0=lam_x0, lam_g0=lam_g0, lbx=lbx, ubx=ubx, options=options)
+        stats = solution["stats"]
+        row = {
+            RESTITUTION_PARAMETER: value,
+            "success": bool(stats["success"]),
+            "return_status": stats["return_status"],
+            "cost": float(solution["f"][0]),
+            "iterations": int(stats["iter_count"]),
+            "real_time_to_optimize": solution["real_time_to_optimize"],
+        }
+        for phase, (phase_spec, dt) in enumerate(zip(spec.phases, nlp.phase_dt(solution["x"]))):
+            row[f"phase_{phase}_time"] = float(dt) * phase_spec.n_shooting
+        rows.append(row)
+        if verbose:
+            print(f"Restitution {value}: {row['return_status']} in {row['iterations']} iterations")
+
+        if warm_start:
+            x0, lam_x0, lam_g0 = solution["x"].copy(), solution["lam_x"], solution["lam_g"]
+    return pd.DataFrame(rows)
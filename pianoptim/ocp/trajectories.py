@@ -0,0 +1,241 @@
+"""
+A compact binary file of the trajectories of a solution, to analyze the results (of a sweep for instance) without
+bioptim. The file is a JSON header followed by raw little-endian float64 arrays aligned on 64 bytes:
+
+    b"PIANOTRJ" | header length (uint64) | header (JSON) | padding | array 0 | padding | array 1 | ...
+
+The header gives the shape and the offset (from the start of the data) of each array, so the reader maps only the
+arrays it is asked for (np.memmap) and a folder of files can be scanned without loading them. The arrays are named
+"<kind>/<phase>/<name>" as in the SolutionStore: "states/0/q_u", "controls/4/taudot", "algebraic_states/0/q_v",
+"time/0/states" (the time of each column of the states), "full/0/qdot" (the generalized velocities of all the
+joints, dependent ones included), "lagrange_multipliers/0/lambdas"...
+"""
+
+import glob
+import json
+import os
+import struct
+from typing import Iterator
+
+from bioptim import Solution
+import numpy as np
+
+from .warm_start import column_times, decision_arrays
+from ..utils.cache import atomic_write
+
+MAGIC = b"PIANOTRJ"
+VERSION = 1
+ALIGNMENT = 64
+DTYPE = "<f8"
+EXTENSION = ".traj"
+
+_PREFIX = struct.Struct("<8sQ")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_trajectories(path: str, arrays: dict[str, np.ndarray], metadata: dict = None) -> None:
+    """
+    Write arrays in a trajectory file, atomically
+
+    Parameters
+    ----------
+    path: str
+        The path of the file
+    arrays: dict[str, np.ndarray]
+        The arrays by name, they are stored as float64
+    metadata: dict
+        Anything JSON serializable to keep in the header (the spec, the cost...)
+    """
+    arrays = {name: np.ascontiguousarray(value, dtype=DTYPE) for name, value in arrays.items()}
+    entries = {}
+    offset = 0
+    for name, value in arrays.items():
+        offset = _aligned(offset)
+        entries[name] = {"offset": offset, "shape": list(value.shape)}
+        offset += value.nbytes
+
+    header = json.dumps(
+        {"version": VERSION, "dtype": DTYPE, "metadata": {} if metadata is None else metadata, "arrays": entries},
+        default=str,
+    ).encode("utf-8")
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    def write(temporary_path: str):
+        with open(temporary_path, "wb") as file:
+            file.write(_PREFIX.pack(MAGIC, len(header)))
+            file.write(header)
+            for name, value in arrays.items():
+                file.seek(data_start + entries[name]["offset"])
+                file.write(value.tobytes())
+            # The file ends at the last byte of the data even if the last array is empty
+            file.truncate(data_start + offset)
+
+    atomic_write(path, write, suffix=EXTENSION)
+
+
+class TrajectoryFile:
+    """
+    The reader of a trajectory file. Only the header is read when opened, the arrays are memory mapped on access
+
+    Attributes
+    ----------
+    path: str
+        The path of the file
+    metadata: dict
+        The metadata given to the writer
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            magic, header_length = _PREFIX.unpack(file.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a trajectory file")
+            header = json.loads(file.read(header_length).decode("utf-8"))
+        if header["version"] > VERSION:
+            raise ValueError(f"{path} was written by a newer version of the format ({header['version']})")
+        self.metadata = header["metadata"]
+        self._dtype = np.dtype(header["dtype"])
+        self._arrays = header["arrays"]
+        self._data_start = _aligned(_PREFIX.size + header_length)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._arrays.keys())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        The array name, memory mapped (read only)
+        """
+        entry = self._arrays[name]
+        shape = tuple(entry["shape"])
+        if 0 in shape:
+            return np.zeros(shape, dtype=self._dtype)
+        return np.memmap(self.path, dtype=self._dtype, mode="r", offset=self._data_start + entry["offset"], shape=shape)
+
+    def phase(self, kind: str, phase: int) -> dict[str, np.ndarray]:
+        """
+        The arrays of a kind ("states", "controls", "algebraic_states", "time"...) of a phase, by name
+        """
+        prefix = f"{kind}/{phase}/"
+        return {name[len(prefix) :]: self[name] for name in self._arrays if name.startswith(prefix)}
+
+
+def solution_arrays(sol: Solution) -> dict[str, np.ndarray]:
+    """
+    The trajectories of a solution: the decision variables of each phase, the time of their columns, the full q and
+    qdot at the columns of the states and, for the holonomic phases, the lagrange multipliers
+
+    Parameters
+    ----------
+    sol: Solution
+        The solution
+
+    Returns
+    -------
+    The arrays, named "<kind>/<phase>/<name>"
+    """
+    arrays = decision_arrays(sol)
+    phases_dt = np.array(sol.phases_dt, dtype=float).reshape(-1)
+    phase_start = 0.0
+    for nlp in sol.ocp.nlp:
+        phase = nlp.phase_idx
+        duration = phases_dt[phase] * nlp.ns
+        polynomial_degree = getattr(nlp.ode_solver, "polynomial_degree", None)
+        for kind in ("states", "controls", "algebraic_states"):
+            first = next((value for name, value in arrays.items() if name.startswith(f"{kind}/{phase}/")), None)
+            if first is not None:
+                times = column_times(first.shape[1], nlp.ns, polynomial_degree)
+                arrays[f"time/{phase}/{kind}"] = phase_start + times * duration
+        phase_start += duration
+
+        arrays.update(_full_coordinates(nlp.model, arrays, phase))
+    return arrays
+
+
+def _full_coordinates(model, arrays: dict[str, np.ndarray], phase: int) -> dict[str, np.ndarray]:
+    """
+    The full q and qdot of a phase ("full/<phase>/q", "full/<phase>/qdot") at the columns of the states and, for the
+    holonomic phases where q_v is an algebraic state, the lagrange multipliers
+    """
+    if not hasattr(model, "partitioned_forward_dynamics_and_lagrange_multipliers_with_qv"):
+        if f"states/{phase}/q" not in arrays:
+            return {}
+        return {f"full/{phase}/q": arrays[f"states/{phase}/q"], f"full/{phase}/qdot": arrays[f"states/{phase}/qdot"]}
+
+    names = ("states/{}/q_u", "algebraic_states/{}/q_v", "states/{}/qdot_u", "states/{}/tau")
+    values = [arrays.get(name.format(phase)) for name in names]
+    if any(value is None for value in values) or len({value.shape[1] for value in values}) != 1:
+        return {}
+    q_u, q_v, qdot_u, tau = values
+    n_cols = q_u.shape[1]
+    # The key is not actuated, its generalized force is zero (see the tau mapping of the builder)
+    tau = np.vstack((tau, np.zeros((model.nb_tau - tau.shape[0], n_cols))))
+
+    q = np.array(model.state_from_partition(q_u, q_v))
+    qdot = np.array(model.compute_qdot().map(n_cols)(q, qdot_u))
+    dynamics = model.partitioned_forward_dynamics_and_lagrange_multipliers_with_qv()
+    _, lambdas = dynamics.map(n_cols)(q_u, q_v, qdot_u, tau)
+    return {
+        f"full/{phase}/q": q,
+        f"full/{phase}/qdot": qdot,
+        f"lagrange_multipliers/{phase}/lambdas": np.array(lambdas),
+    }
+
+
+def export_solution(sol: Solution, path: str, metadata: dict = None) -> None:
+    """
+    Write the trajectories of a solution (see solution_arrays) in a trajectory file
+
+    Parameters
+    ----------
+    sol: Solution
+        The solution
+    path: str
+        The path of the file
+    metadata: dict
+        What to keep with the trajectories, the cost, status, iterations, phase times and discretization of the
+        phases are always added
+    """
+    metadata = {} if metadata is None else dict(metadata)
+    metadata.update(
+        {
+            "cost": float(np.array(sol.cost).reshape(-1)[0]),
+            "status": int(sol.status),
+            "iterations": int(sol.iterations),
+            "phases_dt": np.array(sol.phases_dt, dtype=float).reshape(-1).tolist(),
+            "phases": [
+                {"n_shooting": nlp.ns, "polynomial_degree": getattr(nlp.ode_solver, "polynomial_degree", None)}
+                for nlp in sol.ocp.nlp
+            ],
+        }
+    )
+    write_trajectories(path, solution_arrays(sol), metadata)
+
+
+def scan_trajectories(folder: str, names: list[str] = None) -> Iterator[tuple[str, dict, dict[str, np.ndarray]]]:
+    """
+    Iterate over the trajectory files of a folder (a sweep archive) and map only some of their arrays
+
+    Parameters
+    ----------
+    folder: str
+        The folder to scan (recursively)
+    names: list[str]
+        The arrays to map, none (only the metadata) if None. The files without one of them are skipped
+
+    Returns
+    -------
+    The path, the metadata and the requested arrays of each file
+    """
+    names = [] if names is None else names
+    for path in sorted(glob.glob(os.path.join(folder, "**", f"*{EXTENSION}"), recursive=True)):
+        trajectories = TrajectoryFile(path)
+        if all(name in trajectories for name in names):
+            yield path, trajectories.metadata, {name: trajectories[name] for name in names}
@@ -0,0 +1,420 @@
+"""
+A store of the solutions of the press play problems, used to warm start the following runs. The decision variables
+of each solved problem are kept on disk with the spec they solve, so a new problem can start from the closest problem
+solved so far instead of the constant FINGER_TIP_ON_KEY_RELAXED guess. The trajectories are interpolated when the
+shooting grids differ, and the IPOPT multipliers are handed over when the decision vectors match.
+"""
+
+from dataclasses import asdict, fields, replace
+import datetime
+import glob
+import json
+import os
+
+from bioptim import (
+    InitialGuessList,
+    InterpolationType,
+    OptimalControlProgram,
+    Solution,
+    SolutionMerge,
+    Solver,
+)
+from bioptim.interfaces.ipopt_interface import IpoptInterface
+from casadi import collocation_points
+import numpy as np
+
+from .spec import ProblemSpec, spec_hash
+from ..utils.cache import atomic_write, cache_folder, source_hash
+
+# The fields of the spec that only change how the problem is solved, not the problem itself
+_IGNORED_FIELDS = ("n_threads", "compiled", "use_sx", "expand")
+
+
+def problem_hash(spec: ProblemSpec) -> str:
+    """
+    The hash of the problem described by spec, leaving out the fields that only change how it is solved, so the
+    solutions of the same problem share their key (and their multipliers) whatever the number of threads or the
+    compilation options they were solved with
+    """
+    defaults = {
+        spec_field.name: spec_field.default for spec_field in fields(ProblemSpec) if spec_field.name in _IGNORED_FIELDS
+    }
+    return spec_hash(replace(spec, **defaults))
+
+
+def _as_phase_list(values: dict | list[dict]) -> list[dict]:
+    return values if isinstance(values, list) else [values]
+
+
+def decision_arrays(sol: Solution) -> dict[str, np.ndarray]:
+    """
+    The decision variables of each phase of a solution, named "<kind>/<phase>/<name>" with kind being "states",
+    "controls" or "algebraic_states"
+    """
+    arrays = {}
+    for kind, values in (
+        ("states", sol.decision_states(to_merge=SolutionMerge.NODES)),
+        ("controls", sol.decision_controls(to_merge=SolutionMerge.NODES)),
+        ("algebraic_states", sol.decision_algebraic_states(to_merge=SolutionMerge.NODES)),
+    ):
+        for phase, variables in enumerate(_as_phase_list(values)):
+            for name, value in variables.items():
+                arrays[f"{kind}/{phase}/{name}"] = np.array(value, dtype=float)
+    return arrays
+
+
+def column_times(n_cols: int, n_shooting: int, polynomial_degree: int | None) -> np.ndarray:
+    """
+    The normalized time [0, 1] of each column of a decision variable of a phase
+
+    Parameters
+    ----------
+    n_cols: int
+        The number of columns of the variable
+    n_shooting: int
+        The number of shooting nodes of the phase
+    polynomial_degree: int | None
+        The degree of the collocation polynomials, None if the phase is not solved with collocations
+
+    Returns
+    -------
+    The time of each column
+    """
+    if polynomial_degree is not None and n_cols == n_shooting * (polynomial_degree + 1) + 1:
+        # The start of each interval, its collocation points, and the final node
+        points = np.array([0] + collocation_points(polynomial_degree, "legendre"))
+        times = (np.arange(n_shooting)[:, np.newaxis] + points[np.newaxis, :]).reshape(-1)
+        return np.concatenate((times, [n_shooting])) / n_shooting
+    if n_cols == n_shooting + 1:
+        return np.linspace(0, 1, n_cols)
+    if n_cols == n_shooting:
+        return np.arange(n_cols) / n_shooting
+    return np.linspace(0, 1, n_cols)
+
+
+def resample(values: np.ndarray, times: np.ndarray, new_times: np.ndarray) -> np.ndarray:
+    """
+    Linearly interpolate each row of values from times to new_times
+    """
+    return np.array([np.interp(new_times, times, row) for row in np.atleast_2d(values)])
+
+
+class StoredSolution:
+    """
+    A solution saved in the store. The arrays are loaded from disk on first access
+
+    Attributes
+    ----------
+    metadata: dict
+        The spec, its hash and the solver information of the solution
+    path: str
+        The path of the arrays of the solution
+    """
+
+    def __init__(self, metadata: dict, path: str):
+        self.metadata = metadata
+        self.path = path
+        self._arrays = None
+
+    @property
+    def arrays(self) -> dict[str, np.ndarray]:
+        if self._arrays is None:
+            with np.load(self.path) as arrays:
+                self._arrays = {key: arrays[key] for key in arrays.files}
+        return self._arrays
+
+    @property
+    def phases(self) -> list[dict]:
+        return self.metadata["spec"]["phases"]
+
+    def variable(self, kind: str, phase: int, name: str) -> np.ndarray | None:
+        """
+        The decision variable name of a phase, kind being "states", "controls" or "algebraic_states"
+        """
+        return self.arrays.get(f"{kind}/{phase}/{name}")
+
+    def variable_names(self, kind: str, phase: int) -> list[str]:
+        prefix = f"{kind}/{phase}/"
+        return [key[len(prefix) :] for key in self.arrays if key.startswith(prefix)]
+
+
+class WarmStart:
+    """
+    The initial guess (and the multipliers if the decision vectors match) to start a problem from a stored solution
+
+    Attributes
+    ----------
+    x_init, u_init, a_init: InitialGuessList
+        The initial guesses of the states, controls and algebraic states
+    lam_x, lam_g: np.ndarray | None
+        The multipliers of the bounds and the constraints of the stored solution, None if they cannot be reused
+    source: StoredSolution
+        The solution the warm start comes from
+    """
+
+    def __init__(
+        self,
+        x_init: InitialGuessList,
+        u_init: InitialGuessList,
+        a_init: InitialGuessList,
+        source: StoredSolution,
+        lam_x: np.ndarray = None,
+        lam_g: np.ndarray = None,
+    ):
+        self.x_init = x_init
+        self.u_init = u_init
+        self.a_init = a_init
+        self.source = source
+        self.lam_x = lam_x
+        self.lam_g = lam_g
+
+    @property
+    def has_multipliers(self) -> bool:
+        return self.lam_x is not None and self.lam_g is not None
+
+    def apply(self, ocp: OptimalControlProgram, solver: Solver.IPOPT = None) -> None:
+        """
+        Send the initial guess to the program and, if available, the multipliers to IPOPT. The multipliers are
+        dropped if their sizes do not match the decision vector and the constraints of the program
+
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            The program to warm start
+        solver: Solver.IPOPT
+            The solver that will be used, its warm start options are set if the multipliers are reused
+        """
+        ocp.update_initial_guess(x_init=self.x_init, u_init=self.u_init, a_init=self.a_init)
+
+        if self.has_multipliers and solver is not None:
+            if ocp.ocp_solver is None:
+                ocp.ocp_solver = IpoptInterface(ocp)
+            g, _ = ocp.ocp_solver.dispatch_bounds()
+            if self.lam_x.size != ocp.variables_vector.shape[0] or self.lam_g.size != g.shape[0]:
+                self.lam_x, self.lam_g = None, None
+                return
+            ocp.ocp_solver.set_lagrange_multiplier(self)
+            solver.set_warm_start_options(1e-10)
+
+
+class SolutionStore:
+    """
+    The on-disk store of the solutions, one folder per spec hash and one entry (arrays + metadata) per run
+    """
+
+    def __init__(self, folder: str = None):
+        """
+        Parameters
+        ----------
+        folder: str
+            The folder of the store, the "solutions" folder of the pianoptim cache if None
+        """
+        self.folder = cache_folder("solutions") if folder is None else folder
+
+    def save(self, spec: ProblemSpec, sol: Solution, name: str = None) -> StoredSolution:
+        """
+        Store the decision variables, the phase times and the multipliers of a solution
+
+        Parameters
+        ----------
+        spec: ProblemSpec
+            The spec the solution solves
+        sol: Solution
+            The solution
+        name: str
+            The name of the run, the current date if None
+
+        Returns
+        -------
+        The stored solution
+        """
+        key = problem_hash(spec)
+        name = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f") if name is None else name
+        folder = os.path.join(self.folder, key)
+
+        arrays = decision_arrays(sol)
+        arrays["phases_dt"] = np.array(sol.phases_dt, dtype=float).reshape(-1)
+        arrays["vector"] = np.array(sol.vector, dtype=float).reshape(-1)
+        arrays["lam_x"] = np.array(sol.lam_x, dtype=float).reshape(-1)
+        arrays["lam_g"] = np.array(sol.lam_g, dtype=float).reshape(-1)
+
+        metadata = {
+            "name": name,
+            "spec_hash": key,
+            "source_hash": source_hash(),
+            "spec": asdict(spec),
+            "cost": float(np.array(sol.cost).reshape(-1)[0]),
+            "status": int(sol.status),
+            "iterations": int(sol.iterations),
+            "real_time_to_optimize": float(sol.real_time_to_optimize),
+        }
+
+        arrays_path = os.path.join(folder, f"{name}.npz")
+        atomic_write(arrays_path, lambda path: np.savez(path, **arrays), suffix=".npz")
+
+        def write_metadata(path: str):
+            with open(path, "w") as file:
+                json.dump(metadata, file, indent=2, default=str)
+
+        # The metadata is written last, it marks the entry as complete
+        atomic_write(os.path.join(folder, f"{name}.json"), write_metadata)
+        return StoredSolution(metadata, arrays_path)
+
+    def entries(self, converged_only: bool = False) -> list[StoredSolution]:
+        """
+        All the solutions of the store
+
+        Parameters
+        ----------
+        converged_only: bool
+            If only the solutions where IPOPT converged should be returned
+        """
+        entries = []
+        for metadata_path in sorted(glob.glob(os.path.join(self.folder, "*", "*.json"))):
+            with open(metadata_path, "r") as file:
+                metadata = json.load(file)
+            if converged_only and metadata["status"] != 0:
+                continue
+            entries.append(StoredSolution(metadata, metadata_path[: -len(".json")] + ".npz"))
+        return entries
+
+    def nearest(self, spec: ProblemSpec, converged_only: bool = True) -> StoredSolution | None:
+        """
+        The stored solution of the closest problem. Only problems with the same phases (tasks, springs) and loop are
+        considered, the distance being the relative difference of their numerical values (shooting, times, bounds...).
+        Among the solutions of the same problem, the one with the lowest cost is returned.
+
+        Parameters
+        ----------
+        spec: ProblemSpec
+            The problem to warm start
+        converged_only: bool
+            If only the solutions where IPOPT converged should be considered
+
+        Returns
+        -------
+        The closest stored solution, None if no comparable problem was solved
+        """
+        structure, features = spec_features(asdict(spec))
+
+        best, best_key = None, None
+        for entry in self.entries(converged_only=converged_only):
+            entry_structure, entry_features = spec_features(entry.metadata["spec"])
+            if entry_structure != structure:
+                continue
+            scale = np.maximum(np.maximum(np.abs(features), np.abs(entry_features)), 1e-12)
+            distance = float(np.sum(((features - entry_features) / scale) ** 2))
+            key = (distance, entry.metadata["cost"])
+            if best_key is None or key < best_key:
+                best, best_key = entry, key
+        return best
+
+    def warm_start(self, spec: ProblemSpec, converged_only: bool = True) -> WarmStart | None:
+        """
+        The warm start of a problem from the nearest stored solution
+
+        Parameters
+        ----------
+        spec: ProblemSpec
+            The problem to warm start
+        converged_only: bool
+            If only the solutions where IPOPT converged should be considered
+
+        Returns
+        -------
+        The warm start, None if no comparable problem was solved
+        """
+        source = self.nearest(spec, converged_only=converged_only)
+        if source is None:
+            return None
+        return warm_start_from(source, spec)
+
+
+def spec_features(spec: dict) -> tuple[tuple, np.ndarray]:
+    """
+    Split a spec (as a dict) into what must be identical for two problems to be comparable and the numerical values
+    that can be compared
+
+    Parameters
+    ----------
+    spec: dict
+        The spec, as given by dataclasses.asdict
+
+    Returns
+    -------
+    The structure of the problem and its numerical values
+    """
+    structure = [(phase["task"], phase["holonomic"], phase["spring"]) for phase in spec["phases"]]
+    features = []
+    for phase in spec["phases"]:
+        features.extend([phase["n_shooting"], phase["min_time"], phase["max_time"], phase["polynomial_degree"]])
+
+    for key, value in sorted(spec.items()):
+        if key == "phases" or key in _IGNORED_FIELDS:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            features.append(value)
+        elif value is None:
+            # e.g. a bound that was removed, which is comparable to a very loose bound
+            features.append(1e6)
+        else:
+            structure.append((key, value))
+    return tuple(structure), np.array(features, dtype=float)
+
+
+def warm_start_from(source: StoredSolution, spec: ProblemSpec) -> WarmStart:
+    """
+    Build the warm start of spec from a stored solution, interpolating the trajectories on the shooting grid of spec
+
+    Parameters
+    ----------
+    source: StoredSolution
+        The solution to start from
+    spec: ProblemSpec
+        The problem to warm start, its phases must match the ones of the source
+
+    Returns
+    -------
+    The warm start
+    """
+    if len(source.phases) != len(spec.phases):
+        raise ValueError("The stored solution and the spec must have the same phases")
+
+    initial_guesses = {
+        "states": InitialGuessList(),
+        "controls": InitialGuessList(),
+        "algebraic_states": InitialGuessList(),
+    }
+    for phase_idx, (stored_phase, phase) in enumerate(zip(source.phases, spec.phases)):
+        for kind, initial_guess in initial_guesses.items():
+            for name in source.variable_names(kind, phase_idx):
+                values = source.variable(kind, phase_idx, name)
+                times = column_times(values.shape[1], stored_phase["n_shooting"], stored_phase["polynomial_degree"])
+
+                if kind == "controls":
+                    n_cols = phase.n_shooting if values.shape[1] == stored_phase["n_shooting"] else phase.n_shooting + 1
+                    interpolation = InterpolationType.EACH_FRAME
+                elif values.shape[1] == stored_phase["n_shooting"] + 1:
+                    n_cols = phase.n_shooting + 1
+                    interpolation = InterpolationType.EACH_FRAME
+                else:
+                    n_cols = phase.n_shooting * (phase.polynomial_degree + 1) + 1
+                    interpolation = InterpolationType.ALL_POINTS
+
+                new_times = column_times(n_cols, phase.n_shooting, phase.polynomial_degree)
+                new_values = resample(values, times, new_times)
+                initial_guess.add(name, new_values, interpolation=interpolation, phase=phase_idx)
+
+    # The multipliers only make sense if the decision vector is exactly the same, i.e. the same spec built by the same
+    # sources
+    same_problem = (
+        source.metadata["spec_hash"] == problem_hash(spec) and source.metadata.get("source_hash") == source_hash()
+    )
+    return WarmStart(
+        initial_guesses["states"],
+        initial_guesses["controls"],
+        initial_guesses["algebraic_states"],
+        source,
+        lam_x=source.arrays["lam_x"] if same_problem else None,
+        lam_g=source.arrays["lam_g"] if same_problem else None,
+    )
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+
+CACHE_FOLDER_ENV = "PIANOPTIM_CACHE_DIR"
+PACKAGE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_FILE_HASHES: dict[tuple[str, float, int], str] = {}
+
+
+def cache_folder(*sub_folders: str) -> str:
+    """
+    Get (and create if needed) a folder of the pianoptim on-disk cache. The root of the cache is
+    ~/.cache/pianoptim unless the PIANOPTIM_CACHE_DIR environment variable is set
+
+    Parameters
+    ----------
+    sub_folders: str
+        The sub folders to append to the root of the cache
+
+    Returns
+    -------
+    The absolute path to the folder
+    """
+    root = os.environ.get(CACHE_FOLDER_ENV, os.path.join(os.path.expanduser("~"), ".cache", "pianoptim"))
+    folder = os.path.join(root, *sub_folders)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def file_hash(path: str) -> str:
+    """
+    Compute the sha256 of a file content. The result is memoized as long as the file is not modified
+
+    Parameters
+    ----------
+    path: str
+        The path to the file to hash
+
+    Returns
+    -------
+    The hexadecimal digest of the file
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    if key not in _FILE_HASHES:
+        with open(path, "rb") as file:
+            _FILE_HASHES[key] = hashlib.sha256(file.read()).hexdigest()
+    return _FILE_HASHES[key]
+
+
+def source_hash(folder: str = PACKAGE_FOLDER) -> str:
+    """
+    Compute the sha256 of the python sources of a folder (the pianoptim package by default), so what is built by the
+    code (e.g. the compiled NLP) can be invalidated whenever the code changes. Each file hash is memoized by file_hash
+
+    Parameters
+    ----------
+    folder: str
+        The root folder of the sources
+
+    Returns
+    -------
+    The hexadecimal digest of the sources
+    """
+    digest = hashlib.sha256()
+    for root, folders, files in os.walk(folder):
+        folders.sort()
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, folder).encode())
+                digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def atomic_write(path: str, writer: callable, suffix: str = "") -> None:
+    """
+    Write a file in a temporary file of the same folder and move it to its final path once done, so a reader never
+    sees a partially written file (e.g. if the process is killed or another process writes the same entry)
+
+    Parameters
+    ----------
+    path: str
+        The final path of the file
+    writer: callable
+        A function that receives the temporary path and writes the content in it
+    suffix: str
+        The suffix of the temporary file (some writers, e.g. np.save, append an extension if it is missing)
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=folder, suffix=suffix)
+    os.close(file_descriptor)
+    try:
+        writer(temporary_path)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
@@ -0,0 +1,95 @@
+"""
+Export casadi Functions to C and load them back as compiled external Functions. The shared libraries are cached on
+disk by the hash of the serialized Function, so a Function is only compiled once for a given model.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+from casadi import CodeGenerator, Function, external
+
+from .cache import atomic_write, cache_folder
+
+DEFAULT_COMPILER = "gcc"
+DEFAULT_FLAGS = ("-O3", "-fPIC", "-shared")
+
+
+def _derivatives(function: Function, order: int) -> list[Function]:
+    """
+    The derivatives casadi looks for when an external Function is differentiated: forward, reverse (adj1_) and
+    jacobian (jac_) of the function, and the jacobian of the jacobian (jac_jac_) for the hessians
+    """
+    functions = []
+    current = function
+    for _ in range(order):
+        functions.extend([current.forward(1), current.reverse(1), current.jacobian()])
+        current = current.jacobian()
+    return functions
+
+
+def library_hash(function: Function, derivatives_order: int, compiler: str, flags: tuple[str, ...]) -> str:
+    """
+    The hash of the shared library of a Function, it changes with the Function graph and the way it is compiled
+    """
+    content = hashlib.sha256(function.serialize().encode())
+    content.update(f"{derivatives_order}|{compiler}|{' '.join(flags)}".encode())
+    return content.hexdigest()
+
+
+def compile_function(
+    function: Function,
+    derivatives_order: int = 2,
+    compiler: str = DEFAULT_COMPILER,
+    flags: tuple[str, ...] = DEFAULT_FLAGS,
+    folder: str = None,
+) -> Function:
+    """
+    Generate the C code of a Function and its derivatives, compile it into a shared library (or reuse the cached one)
+    and load it as an external Function
+
+    Parameters
+    ----------
+    function: Function
+        The function to compile, it must not have free variables
+    derivatives_order: int
+        The order of the derivatives to compile along the function, 2 for IPOPT with exact hessians
+    compiler: str
+        The C compiler
+    flags: tuple[str, ...]
+        The flags of the compiler, they must produce a shared library
+    folder: str
+        The folder of the libraries, the "codegen" folder of the pianoptim cache if None
+
+    Returns
+    -------
+    The external Function, with the same name and signature as function
+    """
+    folder = cache_folder("codegen") if folder is None else folder
+    name = function.name()
+    key = library_hash(function, derivatives_order, compiler, flags)
+    library_path = os.path.join(folder, f"{name}_{key[:16]}.so")
+
+    if not os.path.exists(library_path):
+        if shutil.which(compiler) is None:
+            raise RuntimeError(f"The compiler {compiler} is required to compile {name}")
+
+        with tempfile.TemporaryDirectory() as build_folder:
+            source_name = f"{name}_{key[:16]}.c"
+            generator = CodeGenerator(source_name, {"with_header": False})
+            generator.add(function)
+            for derivative in _derivatives(function, derivatives_order):
+                generator.add(derivative)
+            generator.generate(build_folder + os.sep)
+
+            def build(path: str):
+                command = [compiler, *flags, os.path.join(build_folder, source_name), "-o", path]
+                result = subprocess.run(command, capture_output=True, text=True)
+                if result.returncode != 0:
+                    raise RuntimeError(f"The compilation of {name} failed:\n{result.stderr}")
+
+            atomic_write(library_path, build, suffix=".so")
+
+    return external(name, library_path)
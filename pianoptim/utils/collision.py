@@ -1,7 +1,15 @@
-from casadi import solve
+import os
 
+from casadi import Function, MX, solve
+import numpy as np
 
-def collision_impact(model, q, qdot_minus, e=0):
+from .maths import cholesky, solve_3x3, solve_lower_triangular, solve_upper_triangular
+from ..models.function_registry import FunctionRegistry, as_frames
+
+LINEAR_SOLVERS = ("symbolicqr", "closed_form")
+
+
+def collision_impact(model, q, qdot_minus, e=0, linear_solver: str = "symbolicqr"):
     """
     Compute the post-collision generalized velocity qdot_plus using CasADi symbolic expressions:
 
@@ -14,6 +22,8 @@ def collision_impact(model, q, qdot_minus, e=0):
     qdot_minus : CasADi vector (or DM) of pre-collision generalized velocities
     e     :  scalar (coefficient of restitution in [0,1]);
              can be a float or a CasADi symbolic variable
+    linear_solver : how the Delassus system is solved, "symbolicqr" (any number of constraints) or "closed_form"
+             (the inverse of the 3x3 Delassus matrix of the finger on the key, cheap and sparse derivatives)
 
     Returns:
     --------
@@ -34,9 +44,128 @@ def collision_impact(model, q, qdot_minus, e=0):
     # 4) Compute the impulse: Lambda = -S^{-1} * (e + 1)*J*qdot_minus
     #    (Use casadi.solve(...) rather than S^{-1} for better numeric stability)
     rhs = (e + 1.0) * (J @ qdot_minus)  # shape: (m,)
-    Lambda = -solve(delassus, rhs, "symbolicqr")
+    if linear_solver == "closed_form":
+        Lambda = -solve_3x3(delassus, rhs)
+    elif linear_solver == "symbolicqr":
+        Lambda = -solve(delassus, rhs, "symbolicqr")
+    else:
+        raise ValueError(f"linear_solver must be one of {LINEAR_SOLVERS}, got {linear_solver}")
 
     # 5) Finally, compute qdot_plus = qdot_minus + M^{-1} * J^T * Lambda
     qdot_plus = qdot_minus + M_inv @ (J_T @ Lambda)
 
     return qdot_plus
+
+
+def collision_impact_cholesky(model, q, qdot_minus, e=0):
+    """
+    Compute the post-collision generalized velocity qdot_plus, like collision_impact, without forming the inverse of
+    the mass matrix: M(q) = L L' is factorized once (Cholesky) and the 3 columns of J' go through the two triangular
+    solves, then the 3x3 Delassus system of the finger on the key is solved in closed form.
+
+    Arguments:
+    ----------
+    model :  Your model or system object that exposes:
+               - model.massMatrix(q)    -> CasADi matrix M
+               - constraint_jacobian(q) -> CasADi matrix G with 3 rows
+    q     :  CasADi vector of generalized positions
+    qdot_minus : CasADi vector of pre-collision generalized velocities
+    e     :  scalar (coefficient of restitution in [0,1]);
+             can be a float or a CasADi symbolic variable
+
+    Returns:
+    --------
+    qdot_plus : CasADi expression for the post-collision velocity
+    """
+
+    M = model.model.massMatrix(q).to_mx()  # shape: (n x n)
+    J = model.holonomic_constraints_jacobian(q)  # shape: (3 x n)
+
+    # M^{-1} J^T = L^{-T} L^{-1} J^T from one factorization of M with 3 right hand sides
+    L = cholesky(M)  # shape: (n x n)
+    L_inv_J_T = solve_lower_triangular(L, J.T)  # shape: (n x 3)
+    M_inv_J_T = solve_upper_triangular(L.T, L_inv_J_T)  # shape: (n x 3)
+    delassus = L_inv_J_T.T @ L_inv_J_T  # shape: (3 x 3), symmetric by construction
+
+    Lambda = -solve_3x3(delassus, (e + 1.0) * (J @ qdot_minus))
+    return qdot_minus + M_inv_J_T @ Lambda
+
+
+COLLISION_IMPACTS = {
+    "symbolicqr": lambda model, q, qdot_minus, e: collision_impact(model, q, qdot_minus, e),
+    "closed_form": lambda model, q, qdot_minus, e: collision_impact(model, q, qdot_minus, e, "closed_form"),
+    "cholesky": collision_impact_cholesky,
+}
+
+
+def collision_impact_function(model, method: str = "cholesky") -> Function:
+    """
+    The post-collision velocity as a casadi Function of (q, qdot_minus, e). It is built once per model (and method)
+    if the model has a function registry (dm_functions), so sweeping e does not rebuild the graph
+
+    Parameters
+    ----------
+    model: HolonomicPianist
+        The holonomic model of the finger on the key
+    method: str
+        The implementation of the impact, a key of COLLISION_IMPACTS
+
+    Returns
+    -------
+    The casadi Function
+    """
+    if method not in COLLISION_IMPACTS:
+        raise ValueError(f"method must be one of {tuple(COLLISION_IMPACTS.keys())}, got {method}")
+
+    def build() -> Function:
+        q = MX.sym("q", model.nb_q, 1)
+        qdot_minus = MX.sym("qdot_minus", model.nb_q, 1)
+        e = MX.sym("e", 1, 1)
+        qdot_plus = COLLISION_IMPACTS[method](model, q, qdot_minus, e)
+        return Function("collision_impact", [q, qdot_minus, e], [qdot_plus], ["q", "qdot_minus", "e"], ["qdot_plus"])
+
+    registry: FunctionRegistry = getattr(model, "dm_functions", None)
+    if registry is None:
+        return build()
+    return registry.get(("collision_impact", method, None, None), build)
+
+
+def collision_impact_batch(
+    model, q: np.ndarray, qdot_minus: np.ndarray, e: float | np.ndarray = 0, method: str = "cholesky", n_threads=None
+) -> np.ndarray:
+    """
+    The post-collision velocities of many pre-impact states (and restitution coefficients) in one mapped call
+
+    Parameters
+    ----------
+    model: HolonomicPianist
+        The holonomic model of the finger on the key
+    q: np.ndarray
+        The generalized coordinates at the impact, of shape (nb_q, n_frames)
+    qdot_minus: np.ndarray
+        The pre-collision generalized velocities, of shape (nb_q, n_frames)
+    e: float | np.ndarray
+        The coefficient of restitution, the same for all the frames or one per frame
+    method: str
+        The implementation of the impact, a key of COLLISION_IMPACTS
+    n_threads: int | None
+        The maximum number of threads to evaluate the frames with, all the cpus if None
+
+    Returns
+    -------
+    The post-collision velocities, of shape (nb_q, n_frames)
+    """
+    q = as_frames(q, model.nb_q, "q")
+    qdot_minus = as_frames(qdot_minus, model.nb_q, "qdot_minus")
+    if q.shape[1] != qdot_minus.shape[1]:
+        raise ValueError("q and qdot_minus must have the same number of frames")
+    n_frames = q.shape[1]
+    e = np.broadcast_to(np.asarray(e, dtype=float).reshape(1, -1), (1, n_frames))
+
+    function = collision_impact_function(model, method)
+    registry: FunctionRegistry = getattr(model, "dm_functions", None)
+    if registry is None:
+        mapped = function.map(n_frames, "thread", os.cpu_count() if n_threads is None else n_threads)
+    else:
+        mapped = registry.get_mapped(("collision_impact", method, None, None), function, n_frames, n_threads=n_threads)
+    return np.array(mapped(q, qdot_minus, e))
@@ -4,7 +4,9 @@ import numpy as np
 
 from bioptim import PenaltyController, ControlType, DynamicsFunctions
 from bioptim.limits.penalty import PenaltyFunctionAbstract
-from casadi import horzcat, DM, vertcat, MX
+from casadi import horzcat, DM, vertcat, MX, Function
+
+from .torque_derivative_holonomic_driven import map_over_points, stack_points
 
 
 def custom_func_track_markers(
@@ -184,24 +186,18 @@ def minimize_qdot_v_intermediates(
         dof_idx = [i for i in range(controllers.model.nb_independent_joints)]
 
     q_u = controllers.states["q_u"]
-    q_u_complete = q_u.mapping.to_second.map(q_u.cx)
     qdot_u = controllers.states["qdot_u"]
-    qdot_u_complete = qdot_u.mapping.to_second.map(qdot_u.cx)
-
     q_v = controllers.algebraic_states["q_v"]
-    q_v_complete = q_v.mapping.to_second.map(q_v.cx)
-
-    q = controllers.model.state_from_partition(q_u_complete, q_v_complete)
-    qdot_v = controllers.model.compute_qdot_v()(q, qdot_u_complete)[dof_idx]
 
-    for q_u_cx, q_v_cx, qdot_u_cx in zip(q_u.cx_intermediates_list, q_v.cx_intermediates_list, qdot_u.cx_intermediates_list):
-        q_u_complete = q_u.mapping.to_second.map(q_u_cx)
-        qdot_u_complete = qdot_u.mapping.to_second.map(qdot_u_cx)
-        q_v_complete = q_v.mapping.to_second.map(q_v_cx)
-        q = controllers.model.state_from_partition(q_u_complete, q_v_complete)
-        qdot_v = vertcat(qdot_v, controllers.model.compute_qdot_v()(q, qdot_u_complete)[dof_idx])
+    q_u_sym = type(q_u.cx).sym("q_u", q_u.cx.shape[0], 1)
+    qdot_u_sym = type(qdot_u.cx).sym("qdot_u", qdot_u.cx.shape[0], 1)
+    q_v_sym = type(q_v.cx).sym("q_v", q_v.cx.shape[0], 1)
+    q = controllers.model.state_from_partition(q_u.mapping.to_second.map(q_u_sym), q_v.mapping.to_second.map(q_v_sym))
+    qdot_v = controllers.model.compute_qdot_v()(q, qdot_u.mapping.to_second.map(qdot_u_sym))[dof_idx]
+    point_function = Function("qdot_v_at_point", [q_u_sym, qdot_u_sym, q_v_sym], [qdot_v])
 
-    return qdot_v
+    # The node and all the collocation points are evaluated with one mapped Function
+    return map_over_points(point_function, stack_points(q_u), stack_points(qdot_u), stack_points(q_v))
 
 
 def custom_contraint_lambdas(controller: PenaltyController, custom_qv_init: np.ndarray = None) -> MX:
@@ -218,11 +214,17 @@ def custom_contraint_lambdas(controller: PenaltyController, custom_qv_init: np.n
     # Calculer lambdas
     if "q_v" in controller.algebraic_states:
         q_v = controller.algebraic_states["q_v"].cx
-        q = model.state_from_partition(q_u, q_v)
-        qdot = model.compute_qdot()(q, qdot_u)
-        qddot_u = model.partitioned_forward_dynamics_with_qv()(q_u, q_v, qdot_u, tau_complete)
-        qddot = model.compute_qddot()(q, qdot, qddot_u)
-        lambdas = model._compute_the_lagrangian_multipliers()(q, qdot, qddot, tau_complete)
+        if hasattr(model, "partitioned_forward_dynamics_and_lagrange_multipliers_with_qv"):
+            # One evaluation of the mass matrix for both the dynamics and the multipliers
+            _, lambdas = model.partitioned_forward_dynamics_and_lagrange_multipliers_with_qv()(
+                q_u, q_v, qdot_u, tau_complete
+            )
+        else:
+            q = model.state_from_partition(q_u, q_v)
+            qdot = model.compute_qdot()(q, qdot_u)
+            qddot_u = model.partitioned_forward_dynamics_with_qv()(q_u, q_v, qdot_u, tau_complete)
+            qddot = model.compute_qddot()(q, qdot, qddot_u)
+            lambdas = model._compute_the_lagrangian_multipliers()(q, qdot, qddot, tau_complete)
     else:
         lambdas = model.compute_the_lagrangian_multipliers()(q_u, qdot_u, custom_qv_init, tau_complete)
 
@@ -4,6 +4,9 @@ from warnings import warn
 
 from .collision import collision_impact
 
+# The name of the bioptim parameter of the coefficient of restitution of the impact of the finger on the key
+RESTITUTION_PARAMETER = "restitution"
+
 
 def custom_phase_transition_pre(controllers: list[PenaltyController, PenaltyController]) -> MX:
     """
@@ -105,7 +108,9 @@ def custom_phase_transition_algebraic_pre(controllers: list[PenaltyController, P
     return states_pre - states_post
 
 
-def transition_algebraic_pre_with_collision(controllers: list[PenaltyController, PenaltyController]) -> MX:
+def transition_algebraic_pre_with_collision(
+    controllers: list[PenaltyController, PenaltyController], restitution: float = 0
+) -> MX:
     """
     The constraint of the transition from a holonomic to an model without holonomic constraints.
 
@@ -113,6 +118,8 @@ def transition_algebraic_pre_with_collision(controllers: list[PenaltyController,
     ----------
     controllers: list[PenaltyController, PenaltyController]
         The controller for all the nodes in the penalty
+    restitution: float
+        The coefficient of restitution of the impact, used if the program has no "restitution" parameter
 
     Returns
     -------
@@ -123,7 +130,12 @@ def transition_algebraic_pre_with_collision(controllers: list[PenaltyController,
     # add the position and velocity of the key to zero
     q_pre = vertcat(q_pre, 0)
     qdot_pre = vertcat(qdot_pre, 0)
-    qdot_post_estimated = collision_impact(controllers[1].model, q_pre, qdot_pre)
+    if RESTITUTION_PARAMETER in controllers[0].parameters.keys():
+        restitution = controllers[0].parameters[RESTITUTION_PARAMETER].cx
+    # The finger on the key is a 3x3 Delassus system, its closed form inverse keeps the transition block cheap
+    qdot_post_estimated = collision_impact(
+        controllers[1].model, q_pre, qdot_pre, e=restitution, linear_solver="closed_form"
+    )
 
     u_post = controllers[1].states["q_u"].cx
     udot_post = controllers[1].states["qdot_u"].cx
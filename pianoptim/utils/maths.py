@@ -1,5 +1,101 @@
+from casadi import MX, SX, horzcat, sqrt, vertcat
 import numpy as np
 
 
 def degrees(radians):
     return np.degrees(radians)
+
+
+def inverse_3x3(matrix: MX | SX) -> MX | SX:
+    """
+    The inverse of a 3x3 matrix from its adjugate and determinant. Unlike a symbolic QR factorization, it is a
+    handful of scalar operations whose derivatives stay cheap and sparse
+
+    Parameters
+    ----------
+    matrix: MX | SX
+        The matrix to invert, it must be invertible
+
+    Returns
+    -------
+    The inverse of the matrix
+    """
+    if matrix.shape != (3, 3):
+        raise ValueError(f"The matrix must be 3x3, got {matrix.shape}")
+
+    a, b, c = matrix[0, 0], matrix[0, 1], matrix[0, 2]
+    d, e, f = matrix[1, 0], matrix[1, 1], matrix[1, 2]
+    g, h, i = matrix[2, 0], matrix[2, 1], matrix[2, 2]
+
+    cofactor_a = e * i - f * h
+    cofactor_b = -(d * i - f * g)
+    cofactor_c = d * h - e * g
+    determinant = a * cofactor_a + b * cofactor_b + c * cofactor_c
+
+    adjugate = vertcat(
+        horzcat(cofactor_a, -(b * i - c * h), b * f - c * e),
+        horzcat(cofactor_b, a * i - c * g, -(a * f - c * d)),
+        horzcat(cofactor_c, -(a * h - b * g), a * e - b * d),
+    )
+    return adjugate / determinant
+
+
+def solve_3x3(matrix: MX | SX, rhs: MX | SX) -> MX | SX:
+    """
+    Solve matrix @ x = rhs for a 3x3 matrix with its closed form inverse (see inverse_3x3)
+    """
+    return inverse_3x3(matrix) @ rhs
+
+
+def cholesky(matrix: MX | SX) -> MX | SX:
+    """
+    The lower triangular Cholesky factor L of a symmetric positive definite matrix (matrix = L @ L.T), written with
+    scalar operations since casadi.chol does not accept MX. Only the lower triangle of the matrix is read
+
+    Parameters
+    ----------
+    matrix: MX | SX
+        The matrix to factorize
+
+    Returns
+    -------
+    The Cholesky factor
+    """
+    n = matrix.shape[0]
+    if matrix.shape != (n, n):
+        raise ValueError(f"The matrix must be square, got {matrix.shape}")
+
+    lower = [[type(matrix)(1, 1) for _ in range(n)] for _ in range(n)]
+    for j in range(n):
+        lower[j][j] = sqrt(matrix[j, j] - sum(lower[j][k] ** 2 for k in range(j)))
+        for i in range(j + 1, n):
+            lower[i][j] = (matrix[i, j] - sum(lower[i][k] * lower[j][k] for k in range(j))) / lower[j][j]
+    return vertcat(*[horzcat(*row) for row in lower])
+
+
+def solve_lower_triangular(lower: MX | SX, rhs: MX | SX) -> MX | SX:
+    """
+    Solve lower @ x = rhs by forward substitution, lower being lower triangular (e.g. the factor of cholesky)
+    """
+    rows = []
+    for i in range(lower.shape[0]):
+        row = rhs[i, :]
+        for k in range(i):
+            row = row - lower[i, k] * rows[k]
+        rows.append(row / lower[i, i])
+    return vertcat(*rows)
+
+
+def solve_upper_triangular(upper: MX | SX, rhs: MX | SX) -> MX | SX:
+    """
+    Solve upper @ x = rhs by back substitution, upper being upper triangular (e.g. the transpose of the factor of
+    cholesky)
+    """
+    n = upper.shape[0]
+    rows = [None] * n
+    for i in reversed(range(n)):
+        row = rhs[i, :]
+        for k in range(i + 1, n):
+            row = row - upper[i, k] * rows[k]
+        rows[i] = row / upper[i, i]
+    return vertcat(*rows)
@@ -1,4 +1,16 @@
+"""
+Joint power and work of the press play movements. The functions work on the last axis (the frames) of numpy arrays,
+so one phase, a whole solution or a stack of solutions of a sweep (cases x joints x frames) go through the same
+code. The time grids are not uniform (collocation points, phases of different durations), so the work is integrated
+with the trapezoidal rule over the frames or with the Gauss-Legendre weights of the collocation points.
+"""
+
 import numpy as np
+import pandas as pd
+
+from ..ocp.trajectories import TrajectoryFile, scan_trajectories, solution_arrays
+
+QUADRATURES = ("trapezoid", "collocation")
 
 
 def calculate_joint_energy_transfer(q, qdot, tau, dt):
@@ -12,3 +24,304 @@ def calculate_joint_energy_transfer(q, qdot, tau, dt):
     total_energy_transfer = np.sum(joint_work, axis=0)
 
     return joint_power, joint_work, total_energy_transfer
+
+
+def trapezoid_weights(time: np.ndarray) -> np.ndarray:
+    """
+    The weights of the trapezoidal rule on a non uniform grid, repeated times (the boundaries of the phases) get no
+    weight for their empty interval
+
+    Parameters
+    ----------
+    time: np.ndarray
+        The time of each frame (..., n_frames)
+
+    Returns
+    -------
+    The weight of each frame (..., n_frames)
+    """
+    time = np.asarray(time, dtype=float)
+    steps = np.diff(time, axis=-1) / 2
+    weights = np.zeros_like(time)
+    weights[..., :-1] += steps
+    weights[..., 1:] += steps
+    return weights
+
+
+def collocation_weights(time: np.ndarray, n_shooting: int, polynomial_degree: int) -> np.ndarray:
+    """
+    The weights of the Gauss-Legendre quadrature of the collocation points, i.e. the quadrature the collocation
+    polynomials are exact for. The columns are the start of each interval (no weight), its collocation points and
+    the final node (no weight), as in the decision states of a phase solved with OdeSolver.COLLOCATION
+
+    Parameters
+    ----------
+    time: np.ndarray
+        The time of each column (..., n_shooting * (polynomial_degree + 1) + 1)
+    n_shooting: int
+        The number of shooting nodes of the phase
+    polynomial_degree: int
+        The degree of the collocation polynomials (legendre points)
+
+    Returns
+    -------
+    The weight of each column (..., n_columns)
+    """
+    time = np.asarray(time, dtype=float)
+    n_cols = n_shooting * (polynomial_degree + 1) + 1
+    if time.shape[-1] != n_cols:
+        raise ValueError(
+            f"A collocation grid of {n_shooting} intervals of degree {polynomial_degree} has {n_cols} columns, "
+            f"got {time.shape[-1]}"
+        )
+
+    # leggauss is on [-1, 1], the collocation points are on [0, 1]
+    _, gauss_weights = np.polynomial.legendre.leggauss(polynomial_degree)
+    interval = np.concatenate(([0.0], gauss_weights / 2))
+    unit_weights = np.concatenate((np.tile(interval, n_shooting), [0.0]))
+    dt = (time[..., -1] - time[..., 0]) / n_shooting
+    return unit_weights * dt[..., np.newaxis]
+
+
+def quadrature_weights(
+    time: np.ndarray, method: str = "trapezoid", n_shooting: int = None, polynomial_degree: int = None
+) -> np.ndarray:
+    """
+    The weights of a quadrature, see trapezoid_weights and collocation_weights. The collocation quadrature falls back
+    to the trapezoidal rule when the grid is not a collocation grid (e.g. a phase integrated with RK4)
+    """
+    if method not in QUADRATURES:
+        raise ValueError(f"method must be one of {QUADRATURES}, got {method}")
+    if (
+        method == "collocation"
+        and polynomial_degree is not None
+        and np.shape(time)[-1] == n_shooting * (polynomial_degree + 1) + 1
+    ):
+        return collocation_weights(time, n_shooting, polynomial_degree)
+    return trapezoid_weights(time)
+
+
+def joint_power(tau: np.ndarray, qdot: np.ndarray) -> np.ndarray:
+    """
+    The power of each joint (..., n_dof, n_frames). The dofs of qdot that have no generalized force (the key) are
+    left out
+    """
+    tau = np.asarray(tau, dtype=float)
+    return tau * np.asarray(qdot, dtype=float)[..., : tau.shape[-2], :]
+
+
+def joint_work(power: np.ndarray, weights: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    The positive (generated), negative (absorbed) and net work of each joint
+
+    Parameters
+    ----------
+    power: np.ndarray
+        The power of each joint (..., n_dof, n_frames)
+    weights: np.ndarray
+        The quadrature weights of the frames (..., n_frames)
+
+    Returns
+    -------
+    "positive", "negative" and "net" work of each joint (..., n_dof)
+    """
+    weights = np.asarray(weights)[..., np.newaxis, :]
+    positive = np.sum(np.clip(power, 0, None) * weights, axis=-1)
+    negative = np.sum(np.clip(power, None, 0) * weights, axis=-1)
+    return {"positive": positive, "negative": negative, "net": positive + negative}
+
+
+def peak_power(power: np.ndarray, time: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The power of largest magnitude of each joint and when it happens
+
+    Parameters
+    ----------
+    power: np.ndarray
+        The power of each joint (..., n_dof, n_frames)
+    time: np.ndarray
+        The time of each frame (..., n_frames)
+
+    Returns
+    -------
+    The peak power (signed) and its time (..., n_dof)
+    """
+    index = np.argmax(np.abs(power), axis=-1)[..., np.newaxis]
+    peak = np.take_along_axis(power, index, axis=-1)[..., 0]
+    times = np.broadcast_to(np.asarray(time)[..., np.newaxis, :], power.shape)
+    return peak, np.take_along_axis(times, index, axis=-1)[..., 0]
+
+
+def dof_groups(model, n_dof: int) -> dict[str, list[int]]:
+    """
+    The dofs of each segment group: the trunk and the hand of the model (trunk_dof, hand_dof), the arm in between
+
+    Parameters
+    ----------
+    model
+        The pianist model (Pianist or HolonomicPianist)
+    n_dof: int
+        The number of actuated dofs
+    """
+    trunk = [i for i in model.trunk_dof if i < n_dof]
+    hand = [i for i in model.hand_dof if i < n_dof]
+    arm = [i for i in range(n_dof) if i not in trunk and i not in hand]
+    return {"trunk": trunk, "arm": arm, "hand": hand}
+
+
+def phase_energy(
+    tau: np.ndarray,
+    qdot: np.ndarray,
+    time: np.ndarray,
+    method: str = "collocation",
+    n_shooting: int = None,
+    polynomial_degree: int = None,
+) -> dict[str, np.ndarray]:
+    """
+    The power, work and peak power of each joint of a phase, for one case (n_dof, n_frames) or a stack of cases
+    (n_cases, n_dof, n_frames) on grids of the same size
+
+    Returns
+    -------
+    "power" (..., n_dof, n_frames), "positive", "negative", "net" work, "peak_power" and "peak_time" (..., n_dof)
+    """
+    power = joint_power(tau, qdot)
+    weights = quadrature_weights(time, method, n_shooting, polynomial_degree)
+    energy = joint_work(power, weights)
+    energy["power"] = power
+    energy["peak_power"], energy["peak_time"] = peak_power(power, time)
+    return energy
+
+
+def _phase_inputs(trajectories: dict | TrajectoryFile, phase: int) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+    names = (f"states/{phase}/tau", f"full/{phase}/qdot", f"time/{phase}/states")
+    if not all(name in trajectories for name in names):
+        return None
+    return tuple(np.asarray(trajectories[name]) for name in names)
+
+
+def energy_table(
+    energies: list[dict[str, np.ndarray]], phases: list[int], groups: dict[str, list[int]], cases: list = None
+) -> pd.DataFrame:
+    """
+    The long table of phase_energy results: one row per case, phase and joint
+
+    Parameters
+    ----------
+    energies: list[dict[str, np.ndarray]]
+        The phase_energy of each phase, batched over the cases (n_cases, n_dof) or not (n_dof)
+    phases: list[int]
+        The phase of each energy
+    groups: dict[str, list[int]]
+        The dofs of each segment group (see dof_groups)
+    cases: list
+        The name of each case of the batch, None for a single case
+    """
+    frames = []
+    for phase, energy in zip(phases, energies):
+        positive = np.atleast_2d(energy["positive"])
+        n_cases, n_dof = positive.shape
+        group_of_dof = np.full(n_dof, "", dtype=object)
+        for group, dofs in groups.items():
+            group_of_dof[[dof for dof in dofs if dof < n_dof]] = group
+
+        frames.append(
+            pd.DataFrame(
+                {
+                    "case": np.repeat(np.arange(n_cases) if cases is None else np.asarray(cases, dtype=object), n_dof),
+                    "phase": phase,
+                    "dof": np.tile(np.arange(n_dof), n_cases),
+                    "group": np.tile(group_of_dof, n_cases),
+                    "positive_work": positive.reshape(-1),
+                    "negative_work": np.atleast_2d(energy["negative"]).reshape(-1),
+                    "net_work": np.atleast_2d(energy["net"]).reshape(-1),
+                    "peak_power": np.atleast_2d(energy["peak_power"]).reshape(-1),
+                    "peak_time": np.atleast_2d(energy["peak_time"]).reshape(-1),
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def segment_flows(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    The work of each segment group (trunk, arm, hand) of each case and phase, and the share of the positive work of
+    the phase each group generates
+    """
+    flows = (
+        table.groupby(["case", "phase", "group"], sort=False)[["positive_work", "negative_work", "net_work"]]
+        .sum()
+        .reset_index()
+    )
+    phase_positive = flows.groupby(["case", "phase"], sort=False)["positive_work"].transform("sum")
+    flows["positive_share"] = np.where(phase_positive > 0, flows["positive_work"] / phase_positive, np.nan)
+    return flows
+
+
+def solution_energy(sol, method: str = "collocation") -> pd.DataFrame:
+    """
+    The work and peak power of each joint of each phase of a solution (see energy_table)
+
+    Parameters
+    ----------
+    sol: Solution
+        The solution
+    method: str
+        The quadrature, "trapezoid" or "collocation"
+    """
+    arrays = solution_arrays(sol)
+    energies, phases = [], []
+    for nlp in sol.ocp.nlp:
+        inputs = _phase_inputs(arrays, nlp.phase_idx)
+        if inputs is None:
+            continue
+        polynomial_degree = getattr(nlp.ode_solver, "polynomial_degree", None)
+        energies.append(phase_energy(*inputs, method, nlp.ns, polynomial_degree))
+        phases.append(nlp.phase_idx)
+    n_dof = max((energy["positive"].shape[-1] for energy in energies), default=0)
+    return energy_table(energies, phases, dof_groups(sol.ocp.nlp[0].model, n_dof))
+
+
+def archive_energy(folder: str, model, method: str = "collocation") -> pd.DataFrame:
+    """
+    The work and peak power of each joint of each phase of all the trajectory files of a folder (a sweep archive).
+    The cases whose phases have the same grid are stacked and processed in one batch, only the arrays needed are
+    memory mapped
+
+    Parameters
+    ----------
+    folder: str
+        The folder of the trajectory files (see pianoptim.ocp.trajectories)
+    model
+        The pianist model, for the segment groups
+    method: str
+        The quadrature, "trapezoid" or "collocation"
+
+    Returns
+    -------
+    One row per case (the path of its file), phase and joint, see energy_table
+    """
+    # (phase, shapes, discretization) -> paths and inputs of the cases
+    batches: dict[tuple, tuple[list[str], list[tuple]]] = {}
+    for path, metadata, _ in scan_trajectories(folder):
+        trajectories = TrajectoryFile(path)
+        for phase, discretization in enumerate(metadata.get("phases", [])):
+            inputs = _phase_inputs(trajectories, phase)
+            if inputs is None:
+                continue
+            shapes = tuple(value.shape for value in inputs)
+            key = (phase, shapes, discretization["n_shooting"], discretization["polynomial_degree"])
+            paths, stacked_inputs = batches.setdefault(key, ([], []))
+            paths.append(path)
+            stacked_inputs.append(inputs)
+
+    tables = []
+    n_dof = max((key[1][0][0] for key in batches), default=0)
+    groups = dof_groups(model, n_dof)
+    for (phase, _, n_shooting, polynomial_degree), (paths, inputs) in batches.items():
+        tau, qdot, time = (np.stack(values) for values in zip(*inputs))
+        energy = phase_energy(tau, qdot, time, method, n_shooting, polynomial_degree)
+        tables.append(energy_table([energy], [phase], groups, cases=paths))
+    if not tables:
+        return pd.DataFrame()
+    return pd.concat(tables, ignore_index=True).sort_values(["case", "phase", "dof"], ignore_index=True)
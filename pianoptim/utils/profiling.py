@@ -0,0 +1,255 @@
+"""
+Profiling of the press play programs. The custom functions of pianoptim (penalties, transitions, dynamics) are only
+called by bioptim while the program is built, what they return is evaluated by IPOPT inside casadi Functions. So the
+profiling is done in two parts:
+- BuildProfiler wraps the custom functions in timing/counting shims, to know where the building time goes
+- evaluation_profile estimates the share of the solve time of each penalty: the casadi Function of each penalty
+  (and its jacobian) is timed apart, on random inputs, and multiplied by the number of times IPOPT evaluated the
+  whole NLP. These are estimates, not measurements of the evaluations done during the solve
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+import time
+from types import ModuleType
+from typing import Callable
+
+from bioptim import OptimalControlProgram
+from casadi import Function
+import numpy as np
+import pandas as pd
+
+
+class BuildProfiler:
+    """
+    Count the calls and the cumulative time of the functions it wraps
+    """
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.times = defaultdict(float)
+
+    def wrap(self, function: Callable, name: str = None) -> Callable:
+        """
+        A shim of function that records its calls, it keeps the name and the signature of function so bioptim
+        names the penalties the same way
+
+        Parameters
+        ----------
+        function: Callable
+            The function to wrap
+        name: str
+            The name of the function in the report, its __name__ if None
+
+        Returns
+        -------
+        The shim
+        """
+        name = function.__name__ if name is None else name
+
+        @wraps(function)
+        def shim(*args, **kwargs):
+            tic = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.times[name] += time.perf_counter() - tic
+                self.calls[name] += 1
+
+        return shim
+
+    @contextmanager
+    def instrument(self, module: ModuleType, names: list[str] = None):
+        """
+        Replace functions of a module by their shims while in the context, e.g.
+            with profiler.instrument(pianoptim.ocp.builder):
+                ocp = build_ocp(spec)
+
+        Parameters
+        ----------
+        module: ModuleType
+            The module that uses the functions (the builder, an example script...)
+        names: list[str]
+            The names of the functions to wrap, all the functions of pianoptim.utils used by the module if None
+        """
+        if names is None:
+            names = [
+                name
+                for name, value in vars(module).items()
+                if callable(value) and getattr(value, "__module__", "").startswith("pianoptim.utils")
+            ]
+
+        originals = {name: getattr(module, name) for name in names}
+        try:
+            for name, function in originals.items():
+                setattr(module, name, self.wrap(function, name))
+            yield self
+        finally:
+            for name, function in originals.items():
+                setattr(module, name, function)
+
+    def table(self) -> pd.DataFrame:
+        """
+        The calls and the cumulative time of each wrapped function, the slowest first
+        """
+        rows = [{"name": name, "calls": self.calls[name], "time": self.times[name]} for name in self.calls]
+        table = pd.DataFrame(rows, columns=["name", "calls", "time"])
+        total = table["time"].sum()
+        table["share"] = table["time"] / total if total > 0 else 0.0
+        return table.sort_values("time", ascending=False, ignore_index=True)
+
+
+def time_function(function: Function, n_repeats: int = 20, seed: int = 0) -> float:
+    """
+    The mean time of one evaluation of a casadi Function, on random inputs. Functions that fail on these inputs
+    (e.g. a rootfinder that does not converge) are not timed
+
+    Parameters
+    ----------
+    function: Function
+        The function to evaluate
+    n_repeats: int
+        The number of evaluations to average
+    seed: int
+        The seed of the random inputs
+
+    Returns
+    -------
+    The time of one evaluation, in seconds, NaN if the function fails on the random inputs
+    """
+    rng = np.random.default_rng(seed)
+    inputs = [rng.random(function.size_in(i)) for i in range(function.n_in())]
+    try:
+        function(*inputs)
+    except RuntimeError:
+        return np.nan
+    tic = time.perf_counter()
+    for _ in range(n_repeats):
+        function(*inputs)
+    return (time.perf_counter() - tic) / n_repeats
+
+
+def penalty_functions(penalty) -> tuple[list[Function], int]:
+    """
+    The distinct casadi Functions of a penalty and the number of nodes it is evaluated at
+    """
+    functions = penalty.weighted_function if getattr(penalty, "weighted_function", None) else penalty.function
+    functions = [f for f in functions if f is not None]
+    unique = list({id(f): f for f in functions}.values())
+    return unique, len(functions)
+
+
+def iterate_penalties(ocp: OptimalControlProgram):
+    """
+    Iterate over (phase, kind, penalty) of all the penalties of the program, internal ones (continuity, transitions)
+    included
+    """
+    for nlp in ocp.nlp:
+        for kind, penalties in (
+            ("constraint", nlp.g),
+            ("internal constraint", nlp.g_internal),
+            ("objective", nlp.J),
+            ("internal objective", nlp.J_internal),
+        ):
+            for penalty in penalties:
+                if penalty:
+                    yield nlp.phase_idx, kind, penalty
+
+    for kind, penalties in (
+        ("constraint", ocp.g),
+        ("internal constraint", ocp.g_internal),
+        ("objective", ocp.J),
+        ("internal objective", ocp.J_internal),
+    ):
+        for penalty in penalties:
+            if penalty:
+                yield "multiphase", kind, penalty
+
+
+def evaluation_profile(
+    ocp: OptimalControlProgram, stats: dict = None, n_repeats: int = 20, with_jacobian: bool = True
+) -> pd.DataFrame:
+    """
+    Estimate the evaluation time of the NLP spent in each penalty of each phase. Each casadi Function of a penalty
+    (and its jacobian) is timed on random inputs and multiplied by the number of nodes it is evaluated at, then by
+    the number of evaluations of the whole NLP IPOPT did. Nothing is measured during the solve: the time on random
+    inputs may differ from the one on the iterates (e.g. the rootfinder of q_v), and a penalty whose Function fails
+    on them has a NaN time. The dynamics are reported on their own rows, they are also evaluated inside the
+    continuity constraints so they are not counted in the shares.
+
+    Parameters
+    ----------
+    ocp: OptimalControlProgram
+        The program to profile
+    stats: dict
+        The stats of the IPOPT solve (see CompiledNlp.solve), if None a single evaluation of the NLP is reported
+    n_repeats: int
+        The number of evaluations averaged to time each Function
+    with_jacobian: bool
+        If the jacobians of the penalties are timed too (the gradient of the objectives, the jacobian of the
+        constraints), which is slower to profile but closer to what IPOPT does
+
+    Returns
+    -------
+    One row per penalty: phase, kind, name, nodes, estimated evaluation and jacobian time per NLP evaluation, the
+    number of evaluations of the NLP by IPOPT, the estimated cumulative time and share of the total
+    """
+    stats = {} if stats is None else stats
+    rows = []
+
+    def add_row(phase, kind: str, name: str, functions: list[Function], n_nodes: int):
+        n_unique = max(len(functions), 1)
+        evaluation = sum(time_function(f, n_repeats) for f in functions) / n_unique * n_nodes
+        jacobian = 0.0
+        if with_jacobian:
+            jacobian = sum(time_function(f.jacobian(), n_repeats) for f in functions) / n_unique * n_nodes
+
+        if "objective" in kind:
+            n_evaluations, n_jacobians = stats.get("n_call_nlp_f", 1), stats.get("n_call_nlp_grad_f", 1)
+        else:
+            n_evaluations, n_jacobians = stats.get("n_call_nlp_g", 1), stats.get("n_call_nlp_jac_g", 1)
+
+        rows.append(
+            {
+                "phase": phase,
+                "kind": kind,
+                "name": name,
+                "nodes": n_nodes,
+                "estimated_evaluation_time": evaluation,
+                "estimated_jacobian_time": jacobian,
+                "nlp_evaluations": n_evaluations,
+                "nlp_jacobians": n_jacobians,
+                "estimated_time": evaluation * n_evaluations + jacobian * n_jacobians,
+            }
+        )
+
+    for phase, kind, penalty in iterate_penalties(ocp):
+        functions, n_nodes = penalty_functions(penalty)
+        if functions:
+            add_row(phase, kind, str(penalty.name), functions, n_nodes)
+
+    for nlp in ocp.nlp:
+        dynamics = nlp.dynamics_func if isinstance(nlp.dynamics_func, list) else [nlp.dynamics_func]
+        dynamics = [f for f in dynamics if f is not None]
+        polynomial_degree = getattr(nlp.ode_solver, "polynomial_degree", 1)
+        if dynamics:
+            add_row(nlp.phase_idx, "dynamics", dynamics[0].name(), dynamics, nlp.ns * polynomial_degree)
+
+    table = pd.DataFrame(rows)
+    counted = table["kind"] != "dynamics"
+    total = stats.get("t_wall_total", table.loc[counted, "estimated_time"].sum())
+    table["estimated_share"] = np.where(counted, table["estimated_time"] / total, np.nan) if total > 0 else np.nan
+    return table.sort_values("estimated_time", ascending=False, ignore_index=True)
+
+
+def phase_summary(profile: pd.DataFrame) -> pd.DataFrame:
+    """
+    The estimated time and share of each phase and kind of penalty of an evaluation_profile
+    """
+    return (
+        profile[profile["kind"] != "dynamics"]
+        .groupby(["phase", "kind"], sort=False)[["estimated_time", "estimated_share"]]
+        .sum()
+        .reset_index()
+    )
@@ -0,0 +1,255 @@
+"""
+Sparsity of the press play programs: the structure of the jacobian of the constraints and of the hessian of the
+lagrangian, by phase (blocks of the decision vector) and by penalty, to find the dense couplings that slow down the
+linear solver of IPOPT (e.g. a transition that links the last phase to the first one).
+"""
+
+from bioptim import OptimalControlProgram
+from casadi import Function, Sparsity, dot, hessian, vec, vertcat
+import numpy as np
+import pandas as pd
+
+from ..ocp.nlp_cache import CompiledNlp, vector_indices
+from .profiling import iterate_penalties, penalty_functions
+
+# The characters of render_density, from empty to full
+DENSITY_CHARACTERS = " .:-=+*#%@"
+
+
+def phase_of_variables(ocp: OptimalControlProgram) -> np.ndarray:
+    """
+    The phase of each element of the decision vector, -1 for the ones that belong to no phase (parameters, time)
+
+    Parameters
+    ----------
+    ocp: OptimalControlProgram
+        The program
+
+    Returns
+    -------
+    The phase index of each decision variable
+    """
+    v = ocp.variables_vector
+    phases = -np.ones(v.shape[0], dtype=int)
+    for nlp in ocp.nlp:
+        # With collocations, the symbols of a node are matrices (one column per collocation point), as in
+        # OptimizationVectorHelper.vector they are flattened into columns
+        symbols = [vec(cx) for cx in (*nlp.X_scaled, *nlp.U_scaled, *nlp.A_scaled) if cx.numel() > 0]
+        phases[vector_indices(v, vertcat(*symbols))] = nlp.phase_idx
+    return phases
+
+
+def constraint_phases(jacobian: Sparsity, phases: np.ndarray) -> np.ndarray:
+    """
+    The phase of each constraint: the phase of the variables it depends on, -2 if it couples several phases (e.g. a
+    transition) and -1 if it only depends on the parameters and the time
+
+    Parameters
+    ----------
+    jacobian: Sparsity
+        The sparsity of the jacobian of the constraints
+    phases: np.ndarray
+        The phase of each decision variable (see phase_of_variables)
+    """
+    rows, cols = jacobian.get_triplet()
+    row_phases = [set() for _ in range(jacobian.size1())]
+    for row, col in zip(rows, cols):
+        if phases[col] >= 0:
+            row_phases[row].add(int(phases[col]))
+    return np.array([-1 if not p else (p.pop() if len(p) == 1 else -2) for p in row_phases], dtype=int)
+
+
+def jacobian_sparsity(nlp: CompiledNlp) -> Sparsity:
+    """
+    The sparsity of the jacobian of the constraints with respect to the decision vector
+    """
+    return nlp.function.sparsity_jac("x", "g")
+
+
+def hessian_sparsity(nlp: CompiledNlp) -> Sparsity:
+    """
+    The sparsity of the hessian of the lagrangian f + lam_g' g with respect to the decision vector
+    """
+    x = nlp.function.mx_in("x")
+    lam_g = type(x).sym("lam_g", nlp.ng, 1)
+    f, g = nlp.function(x, type(x).sym("p", 0, 1))
+    return hessian(f + dot(lam_g, g), x)[0].sparsity()
+
+
+def block_density(sparsity: Sparsity, row_blocks: np.ndarray, col_blocks: np.ndarray) -> pd.DataFrame:
+    """
+    The density (non zeros / size) of each block of a sparsity pattern
+
+    Parameters
+    ----------
+    sparsity: Sparsity
+        The pattern
+    row_blocks: np.ndarray
+        The block of each row
+    col_blocks: np.ndarray
+        The block of each column
+
+    Returns
+    -------
+    The density of each (row block, column block)
+    """
+    rows, cols = sparsity.get_triplet()
+    row_labels = np.unique(row_blocks)
+    col_labels = np.unique(col_blocks)
+    non_zeros = pd.crosstab(
+        pd.Categorical(row_blocks[np.array(rows, dtype=int)], categories=row_labels),
+        pd.Categorical(col_blocks[np.array(cols, dtype=int)], categories=col_labels),
+        dropna=False,
+    )
+    sizes = np.outer(
+        [np.sum(row_blocks == label) for label in row_labels], [np.sum(col_blocks == label) for label in col_labels]
+    )
+    return pd.DataFrame(non_zeros.values / sizes, index=row_labels, columns=col_labels)
+
+
+def render_density(density: pd.DataFrame) -> str:
+    """
+    A text heatmap of a block density table, one character per block
+    """
+    lines = ["     " + "".join(f"{str(label):>3}" for label in density.columns)]
+    for label, row in density.iterrows():
+        cells = ""
+        for value in row.values:
+            if value == 0:
+                cells += "  ."
+            else:
+                cells += "  " + DENSITY_CHARACTERS[min(int(np.ceil(value * 9)), 9)]
+        lines.append(f"{str(label):>4} {cells}")
+    return "\n".join(lines)
+
+
+def coupling_flags(density: pd.DataFrame, dense_threshold: float = 0.5) -> list[str]:
+    """
+    The blocks of a phase x phase hessian density that should be looked at: the couplings of phases that are not
+    consecutive, and the blocks denser than dense_threshold
+    """
+    flags = []
+    for row_label in density.index:
+        for col_label in density.columns:
+            value = density.loc[row_label, col_label]
+            if value == 0 or col_label < row_label:
+                continue
+            if row_label >= 0 and col_label >= 0 and abs(row_label - col_label) > 1:
+                flags.append(f"phases {row_label} and {col_label} are coupled (density {value:.3f})")
+            elif value > dense_threshold:
+                flags.append(f"block ({row_label}, {col_label}) is dense (density {value:.3f})")
+    return flags
+
+
+def penalty_sparsity(ocp: OptimalControlProgram, dense_threshold: float = 0.5) -> pd.DataFrame:
+    """
+    The local jacobian structure of each penalty, with respect to each input of its Function (x, u, a...)
+
+    Parameters
+    ----------
+    ocp: OptimalControlProgram
+        The program
+    dense_threshold: float
+        The density above which a penalty is flagged as dense
+
+    Returns
+    -------
+    One row per penalty and input: phase, kind, name, input, rows, columns, non zeros, density and the dense flag
+    """
+    rows = []
+    for phase, kind, penalty in iterate_penalties(ocp):
+        functions, n_nodes = penalty_functions(penalty)
+        if not functions:
+            continue
+        function: Function = functions[0]
+        for i, input_name in enumerate(function.name_in()):
+            n_cols = function.size1_in(i) * function.size2_in(i)
+            n_rows = function.size1_out(0) * function.size2_out(0)
+            if n_cols == 0 or n_rows == 0:
+                continue
+            non_zeros = function.sparsity_jac(i, 0).nnz()
+            density = non_zeros / (n_rows * n_cols)
+            rows.append(
+                {
+                    "phase": phase,
+                    "kind": kind,
+                    "name": str(penalty.name),
+                    "nodes": n_nodes,
+                    "input": input_name,
+                    "rows": n_rows,
+                    "columns": n_cols,
+                    "non_zeros": non_zeros,
+                    "density": density,
+                    "dense": density > dense_threshold,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def sparsity_report(ocp: OptimalControlProgram, nlp: CompiledNlp = None, dense_threshold: float = 0.5) -> dict:
+    """
+    The sparsity of the jacobian of the constraints and of the hessian of the lagrangian of a program, globally, by
+    phase and by penalty
+
+    Parameters
+    ----------
+    ocp: OptimalControlProgram
+        The program
+    nlp: CompiledNlp
+        The compiled NLP of the program, it is compiled if None
+    dense_threshold: float
+        The density above which a block or a penalty is flagged as dense
+
+    Returns
+    -------
+    "summary" (sizes, non zeros and densities), "jacobian_density" (phase of the constraints x phase of the
+    variables, see constraint_phases), "hessian_density" (phase x phase), "flags" (dense or non consecutive
+    couplings) and "penalties" (see penalty_sparsity)
+    """
+    nlp = CompiledNlp.from_ocp(ocp) if nlp is None else nlp
+    phases = phase_of_variables(ocp)
+    jacobian = jacobian_sparsity(nlp)
+    hessian_pattern = hessian_sparsity(nlp)
+
+    summary = {
+        "nx": nlp.nx,
+        "ng": nlp.ng,
+        "jacobian_non_zeros": jacobian.nnz(),
+        "jacobian_density": jacobian.nnz() / max(nlp.nx * nlp.ng, 1),
+        "hessian_non_zeros": hessian_pattern.nnz(),
+        "hessian_density": hessian_pattern.nnz() / max(nlp.nx**2, 1),
+    }
+    jacobian_density = block_density(jacobian, constraint_phases(jacobian, phases), phases)
+    hessian_density = block_density(hessian_pattern, phases, phases)
+
+    penalties = penalty_sparsity(ocp, dense_threshold)
+    flags = coupling_flags(hessian_density, dense_threshold)
+    if len(penalties):
+        for _, row in penalties[penalties["dense"]].iterrows():
+            flags.append(
+                f"penalty {row['name']} (phase {row['phase']}) is dense in {row['input']} ({row['density']:.3f})"
+            )
+
+    return {
+        "summary": summary,
+        "jacobian_density": jacobian_density,
+        "hessian_density": hessian_density,
+        "flags": flags,
+        "penalties": penalties,
+    }
+
+
+def print_sparsity_report(report: dict) -> None:
+    """
+    Print a sparsity_report
+    """
+    for key, value in report["summary"].items():
+        print(f"{key}: {value:.4g}" if isinstance(value, float) else f"{key}: {value}")
+    print()
+    print("Jacobian of the constraints, density by phase (-1: parameters and time, -2: multiphase constraints)")
+    print(render_density(report["jacobian_density"]))
+    print("\nHessian of the lagrangian, density by phase (-1: parameters and time)")
+    print(render_density(report["hessian_density"]))
+    print("\nFlags")
+    for flag in report["flags"]:
+        print(f"- {flag}")
@@ -10,7 +10,7 @@ from bioptim import (
     PlotType,
     PenaltyController,
 )
-from casadi import MX, vertcat, Function
+from casadi import MX, vertcat, horzcat, reshape, Function
 import numpy as np
 
 
@@ -78,7 +78,8 @@ def configure_holonomic_torque_derivative_driven_with_qv(
     ocp, nlp, numerical_data_timeseries: dict[str, np.ndarray] = None, custom_q_v_init: np.ndarray = None
 ):
     """
-    Tell the program which variables are states and controls.
+    Tell the program which variables are states and controls. The dynamics are
+    holonomic_torque_derivative_driven_with_qv unless another dynamic_function was given to DynamicsList.add
 
     Parameters
     ----------
@@ -136,12 +137,19 @@ def configure_holonomic_torque_derivative_driven_with_qv(
 
     # extra plots
     ConfigureProblem.configure_qdotv(ocp, nlp, nlp.model._compute_qdot_v)
-    configure_lagrange_multipliers_function(
-        ocp, nlp, nlp.model.compute_the_lagrangian_multipliers, custom_q_v_init=custom_q_v_init
+    if hasattr(nlp.model, "partitioned_forward_dynamics_and_lagrange_multipliers_with_qv"):
+        configure_lagrange_multipliers_function_with_qv(ocp, nlp)
+    else:
+        configure_lagrange_multipliers_function(
+            ocp, nlp, nlp.model.compute_the_lagrangian_multipliers, custom_q_v_init=custom_q_v_init
+        )
+
+    # The dynamic_function given to DynamicsList.add (e.g. holonomic_torque_derivative_driven_with_qv_spring)
+    dynamic_function = getattr(nlp.dynamics_type, "dynamic_function", None)
+    ConfigureProblem.configure_dynamics_function(
+        ocp, nlp, holonomic_torque_derivative_driven_with_qv if dynamic_function is None else dynamic_function
     )
 
-    ConfigureProblem.configure_dynamics_function(ocp, nlp, holonomic_torque_derivative_driven_with_qv)
-
 
 def configure_lagrange_multipliers_function(ocp, nlp, dyn_func: Callable, custom_q_v_init):
     """
@@ -180,6 +188,52 @@ def configure_lagrange_multipliers_function(ocp, nlp, dyn_func: Callable, custom
         ["lagrange_multipliers"],
     )
 
+    _add_lagrange_multipliers_plot(ocp, nlp)
+
+
+def configure_lagrange_multipliers_function_with_qv(ocp, nlp):
+    """
+    Configure the lagrange multipliers of a phase where q_v is an algebraic state. They are computed from q_v itself
+    (no Newton iterations from an initial guess), with the same Function as the dynamics
+
+    Parameters
+    ----------
+    ocp: OptimalControlProgram
+        A reference to the ocp
+    nlp: NonLinearProgram
+        A reference to the phase
+    """
+
+    time_span_sym = vertcat(nlp.time_cx, nlp.dt)
+    _, lambdas = nlp.model.partitioned_forward_dynamics_and_lagrange_multipliers_with_qv()(
+        nlp.get_var_from_states_or_controls("q_u", nlp.states.scaled.cx, nlp.controls.scaled.cx),
+        DynamicsFunctions.get(nlp.algebraic_states["q_v"], nlp.algebraic_states.scaled.cx),
+        nlp.get_var_from_states_or_controls("qdot_u", nlp.states.scaled.cx, nlp.controls.scaled.cx),
+        nlp.get_var_from_states_or_controls("tau", nlp.states.scaled.cx, nlp.controls.scaled.cx),
+    )
+    nlp.lagrange_multipliers_function = Function(
+        "lagrange_multipliers_function",
+        [
+            time_span_sym,
+            nlp.states.scaled.cx,
+            nlp.controls.scaled.cx,
+            nlp.parameters.scaled.cx,
+            nlp.algebraic_states.scaled.cx,
+            nlp.numerical_timeseries.cx,
+        ],
+        [lambdas],
+        ["t_span", "x", "u", "p", "a", "d"],
+        ["lagrange_multipliers"],
+    )
+
+    _add_lagrange_multipliers_plot(ocp, nlp)
+
+
+def _add_lagrange_multipliers_plot(ocp, nlp):
+    """
+    Plot nlp.lagrange_multipliers_function, with one axis per dependent joint of all the phases
+    """
+
     all_multipliers_names = []
     for nlp_i in ocp.nlp:
         if hasattr(nlp_i.model, "has_holonomic_constraints"):  # making sure we have a HolonomicBiorbdModel
@@ -375,12 +429,40 @@ def constraint_holonomic_end(
     return controllers.model.holonomic_constraints(q)
 
 
+def stack_points(variable) -> MX:
+    """
+    The symbolic values of a variable at the node and at all its intermediate (collocation) points, one per column
+
+    Parameters
+    ----------
+    variable: OptimizationVariable
+        The variable of the controller, e.g. controllers.states["q_u"]
+    """
+    return horzcat(variable.cx, *variable.cx_intermediates_list)
+
+
+def map_over_points(function: Function, *points: MX) -> MX:
+    """
+    Evaluate a function of one point over all the columns of points with a single mapped call, and stack the outputs
+    of each point in one column (as a vertcat of the outputs point after point would)
+
+    Parameters
+    ----------
+    function: Function
+        The function of one point
+    points: MX
+        The inputs of the function, one point per column (see stack_points)
+    """
+    return reshape(function.map(points[0].shape[1])(*points), -1, 1)
+
+
 def constraint_holonomic(
     controllers: PenaltyController,
 ):
     """
     Minimize the distance between two markers
     By default this function is quadratic, meaning that it minimizes distance between them.
+    The constraints of the node and of all the collocation points are evaluated with one mapped Function
 
     Parameters
     ----------
@@ -389,19 +471,13 @@ def constraint_holonomic(
     """
 
     q_u = controllers.states["q_u"]
-    q_u_complete = q_u.mapping.to_second.map(q_u.cx)
-
     q_v = controllers.algebraic_states["q_v"]
-    q_v_complete = q_v.mapping.to_second.map(q_v.cx)
 
-    q = controllers.model.state_from_partition(q_u_complete, q_v_complete)
-
-    holonomic_constraints = controllers.model.holonomic_constraints(q)
-
-    for q_u_cx, q_v_cx in zip(q_u.cx_intermediates_list, q_v.cx_intermediates_list):
-        q_u_complete = q_u.mapping.to_second.map(q_u_cx)
-        q_v_complete = q_v.mapping.to_second.map(q_v_cx)
-        q = controllers.model.state_from_partition(q_u_complete, q_v_complete)
-        holonomic_constraints = vertcat(holonomic_constraints, controllers.model.holonomic_constraints(q))
+    q_u_sym = type(q_u.cx).sym("q_u", q_u.cx.shape[0], 1)
+    q_v_sym = type(q_v.cx).sym("q_v", q_v.cx.shape[0], 1)
+    q = controllers.model.state_from_partition(q_u.mapping.to_second.map(q_u_sym), q_v.mapping.to_second.map(q_v_sym))
+    point_function = Function(
+        "holonomic_constraints_at_point", [q_u_sym, q_v_sym], [controllers.model.holonomic_constraints(q)]
+    )
 
-    return holonomic_constraints
+    return map_over_points(point_function, stack_points(q_u), stack_points(q_v))
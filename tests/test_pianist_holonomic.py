@@ -0,0 +1,78 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from pianoptim.models.constant import FINGER_TIP_ON_KEY_PREPUSHED, FINGER_TIP_ON_KEY_RELAXED
+from pianoptim.models.pianist_holonomic import SHOULDER_ROTATION_Z_INDEX, HolonomicPianist
+from pianoptim.ocp.spec import PIANIST_AND_KEY_MODEL_PATH
+from pianoptim.utils.cache import CACHE_FOLDER_ENV
+from pianoptim.utils.codegen import DEFAULT_COMPILER
+from pianoptim.utils.collision import collision_impact_function
+
+
+@pytest.fixture(scope="module")
+def model():
+    return HolonomicPianist(PIANIST_AND_KEY_MODEL_PATH)
+
+
+def consistent_pose(model: HolonomicPianist, pose: np.ndarray, shoulder_rotation_z: float | None) -> tuple:
+    """
+    q_u of the pose (with another shoulder rotation about z if given) and the q_v that puts the finger on the key,
+    solved by Newton from the q_v of the pose
+    """
+    q_u = np.array(pose[model.independent_joint_index], dtype=float)
+    if shoulder_rotation_z is not None:
+        q_u[list(model.independent_joint_index).index(SHOULDER_ROTATION_Z_INDEX)] = shoulder_rotation_z
+    q_v = np.array(model.compute_q_v()(q_u, pose[model.dependent_joint_index])).reshape(-1)
+    return q_u, q_v
+
+
+@pytest.mark.parametrize("shoulder_rotation_z", [None, 0.1, -0.1])
+@pytest.mark.parametrize("pose", [FINGER_TIP_ON_KEY_RELAXED, FINGER_TIP_ON_KEY_PREPUSHED])
+def test_q_v_closed_form_satisfies_constraints(model, pose, shoulder_rotation_z):
+    # The shoulder rotation about z (q7) of the poses is not zero, e.g. -0.0135 when prepushed
+    q_u, q_v_newton = consistent_pose(model, pose, shoulder_rotation_z)
+
+    q_v = model.compute_q_v_closed_form()(q_u, pose[model.dependent_joint_index])
+    residual = model.holonomic_constraints(model.state_from_partition(q_u, q_v))
+    np.testing.assert_allclose(np.array(residual).reshape(-1), 0, atol=1e-10)
+    # The arm, not the arm flipped about the shoulder-finger axis (which satisfies the constraints as well)
+    np.testing.assert_allclose(np.array(q_v).reshape(-1), q_v_newton, atol=1e-8)
+
+
+@pytest.mark.parametrize("pose", [FINGER_TIP_ON_KEY_RELAXED, FINGER_TIP_ON_KEY_PREPUSHED])
+def test_q_v_closed_form_matches_pose(model, pose):
+    q_u, q_v_newton = consistent_pose(model, pose, None)
+    np.testing.assert_allclose(q_v_newton, pose[model.dependent_joint_index], atol=1e-3)
+
+    # Started from the zero pose, as compute_v_from_u_explicit_symbolic does
+    q_v = model.compute_q_v_explicit()(q_u, np.zeros(model.nb_dependent_joints))
+    np.testing.assert_allclose(np.array(q_v).reshape(-1), q_v_newton, atol=1e-8)
+    np.testing.assert_allclose(np.array(q_v).reshape(-1), pose[model.dependent_joint_index], atol=1e-3)
+
+
+@pytest.mark.skipif(shutil.which(DEFAULT_COMPILER) is None, reason=f"{DEFAULT_COMPILER} is not available")
+@pytest.mark.parametrize("closed_form_q_v", [False, True])
+def test_compiled_functions_match_symbolic(model, tmp_path, monkeypatch, closed_form_q_v):
+    monkeypatch.setenv(CACHE_FOLDER_ENV, str(tmp_path))
+    symbolic = HolonomicPianist(PIANIST_AND_KEY_MODEL_PATH, closed_form_q_v=closed_form_q_v)
+    compiled = HolonomicPianist(PIANIST_AND_KEY_MODEL_PATH, compiled=True, closed_form_q_v=closed_form_q_v)
+
+    q_u = FINGER_TIP_ON_KEY_PREPUSHED[model.independent_joint_index]
+    q_v_init = FINGER_TIP_ON_KEY_PREPUSHED[model.dependent_joint_index]
+    qdot_u = np.linspace(-0.5, 0.5, model.nb_independent_joints)
+    tau = np.linspace(-1, 1, model.nb_tau)
+    for name in ("partitioned_forward_dynamics", "compute_the_lagrangian_multipliers"):
+        arguments = (q_u, qdot_u, q_v_init, tau)
+        expected = np.array(getattr(symbolic, name)()(*arguments))
+        np.testing.assert_allclose(np.array(getattr(compiled, name)()(*arguments)), expected, atol=1e-8)
+
+
+@pytest.mark.parametrize("method", ["closed_form", "cholesky"])
+def test_collision_impact_methods_match(model, method):
+    q = FINGER_TIP_ON_KEY_PREPUSHED
+    qdot_minus = np.linspace(-1, 1, model.nb_q)
+    expected = np.array(collision_impact_function(model, "symbolicqr")(q, qdot_minus, 0.5))
+    qdot_plus = collision_impact_function(model, method)(q, qdot_minus, 0.5)
+    np.testing.assert_allclose(np.array(qdot_plus), expected, atol=1e-8)
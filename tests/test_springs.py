@@ -0,0 +1,41 @@
+from casadi import DM, vertcat
+import numpy as np
+import pytest
+
+from pianoptim.logistic_springs.springs import SPRING_FUNCTIONS
+from pianoptim.models.constant import FINGER_TIP_ON_KEY_PREPUSHED, MAX_BED_DEPTH
+from pianoptim.ocp.builder import build_ocp
+from pianoptim.ocp.spec import PhaseSpec, ProblemSpec
+
+
+@pytest.mark.parametrize("spring", ["cubic_increase", "spline_pressing", "spline_release"])
+def test_spring_force_reaches_the_phase_dynamics(spring):
+    spec = ProblemSpec(
+        phases=(PhaseSpec("descend", n_shooting=2, min_time=0.04, max_time=0.05, polynomial_degree=3, spring=spring),),
+        boundary_qdot_max=None,
+        n_threads=1,
+    )
+    nlp = build_ocp(spec).nlp[0]
+    model = nlp.model
+    dynamics = nlp.dynamics_func[0] if isinstance(nlp.dynamics_func, list) else nlp.dynamics_func
+
+    # The key halfway down to the bed
+    q_u = FINGER_TIP_ON_KEY_PREPUSHED[model.independent_joint_index]
+    q_v = np.array(FINGER_TIP_ON_KEY_PREPUSHED[model.dependent_joint_index], dtype=float)
+    q_v[-1] = MAX_BED_DEPTH / 2
+    qdot_u = np.linspace(-0.5, 0.5, model.nb_independent_joints)
+    tau = np.linspace(-1, 1, model.nb_tau - 1)
+
+    x = vertcat(q_u, qdot_u, tau)
+    n_u, n_p, n_d = (dynamics.size1_in(i) for i in (2, 3, 5))
+    xdot = np.array(dynamics(DM([0, 0.01]), x, DM.zeros(n_u), DM.zeros(n_p), q_v, DM.zeros(n_d))).reshape(-1)
+    qddot_u = xdot[model.nb_independent_joints : 2 * model.nb_independent_joints]
+
+    # The spring pushes on the key, the last generalized force
+    force = float(SPRING_FUNCTIONS[spring](q_v[-1]))
+    assert force != 0
+    forward_dynamics = model.partitioned_forward_dynamics_with_qv()
+    expected = np.array(forward_dynamics(q_u, q_v, qdot_u, np.concatenate((tau, [force])))).reshape(-1)
+    without_spring = np.array(forward_dynamics(q_u, q_v, qdot_u, np.concatenate((tau, [0])))).reshape(-1)
+    np.testing.assert_allclose(qddot_u, expected, rtol=1e-8, atol=1e-8)
+    assert not np.allclose(qddot_u, without_spring)